@@ -0,0 +1,151 @@
+from typing import Any, Dict, List, Optional, Union
+import numpy as np
+import pandas as pd
+
+HOURS_PER_WEEK = 7 * 24
+
+# Unix epoch starts on Thursday 00:00; shifting by three days makes hour 0 Monday 00:00
+WEEK_START_SHIFT_HOURS = 3 * 24
+
+DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+def _to_frame(rows: Union[List[Dict[str, Any]], pd.DataFrame]) -> pd.DataFrame:
+    return rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows)
+
+def _pool_ids(df: pd.DataFrame) -> Optional[np.ndarray]:
+    if 'pool' not in df:
+        return None
+    pools = df['pool']
+    if len(pools) and isinstance(pools.iloc[0], dict):
+        pools = pd.Series([pool.get('id') if isinstance(pool, dict) else pool for pool in pools], dtype=object)
+    return pools.fillna('Unknown').astype(str).to_numpy()
+
+class HourOfWeekGrid:
+    """
+    Dense pool x hour-of-week activity grid.
+
+    Rows are pools in first-seen order, columns are the 168 hours of a week starting
+    Monday 00:00 UTC. Each add() bins a batch with one bincount and accumulates it,
+    so the grid can be fed page by page or from a live tail.
+    """
+
+    def __init__(self, value: str = 'count'):
+        if value not in ('count', 'volumeUSD'):
+            raise ValueError(f"Unsupported heatmap value: {value}")
+        self.value = value
+        self.row_labels: List[str] = []
+        self.row_index: Dict[str, int] = {}
+        self.grid = np.zeros((0, HOURS_PER_WEEK))
+
+    @property
+    def col_labels(self) -> List[str]:
+        return [f"{DAY_NAMES[hour // 24]} {hour % 24:02d}" for hour in range(HOURS_PER_WEEK)]
+
+    def _rows_for(self, pools: np.ndarray) -> np.ndarray:
+        inverse, unique = pd.factorize(pools)
+        mapping = np.empty(len(unique), dtype=np.int64)
+        for position, pool in enumerate(unique):
+            if pool not in self.row_index:
+                self.row_index[pool] = len(self.row_labels)
+                self.row_labels.append(pool)
+            mapping[position] = self.row_index[pool]
+        if len(self.row_labels) > self.grid.shape[0]:
+            self.grid = np.vstack([self.grid, np.zeros((len(self.row_labels) - self.grid.shape[0], HOURS_PER_WEEK))])
+        return mapping[inverse]
+
+    def add(self, timestamps, pools=None, weights=None) -> 'HourOfWeekGrid':
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if len(timestamps) == 0:
+            return self
+        if pools is None:
+            pools = np.full(len(timestamps), 'All', dtype=object)
+        rows = self._rows_for(np.asarray(pools, dtype=object))
+        columns = (timestamps // 3600 + WEEK_START_SHIFT_HOURS) % HOURS_PER_WEEK
+
+        flat = rows * HOURS_PER_WEEK + columns
+        counts = np.bincount(flat, weights=weights, minlength=self.grid.size)
+        self.grid += counts.reshape(self.grid.shape)
+        return self
+
+    def add_swaps(self, swaps: Union[List[Dict[str, Any]], pd.DataFrame]) -> 'HourOfWeekGrid':
+        df = _to_frame(swaps)
+        if df.empty:
+            return self
+        weights = None
+        if self.value == 'volumeUSD' and 'amountUSD' in df:
+            weights = pd.to_numeric(df['amountUSD'], errors='coerce').fillna(0).abs().to_numpy()
+        return self.add(df['timestamp'].astype(np.int64).to_numpy(), _pool_ids(df), weights)
+
+    def add_pool_hours(self, pool_hours: Union[List[Dict[str, Any]], pd.DataFrame]) -> 'HourOfWeekGrid':
+        """Accumulate PoolHourData rows, weighting each hour by its txCount or volumeUSD."""
+        df = _to_frame(pool_hours)
+        if df.empty:
+            return self
+        column = 'volumeUSD' if self.value == 'volumeUSD' else 'txCount'
+        weights = pd.to_numeric(df[column], errors='coerce').fillna(0).to_numpy() if column in df else None
+        return self.add(df['periodStartUnix'].astype(np.int64).to_numpy(), _pool_ids(df), weights)
+
+class TickTimeGrid:
+    """
+    Dense tick x time activity grid for one pool.
+
+    Ticks are grouped into bins of `tick_bin` ticks and time into buckets of
+    `time_bucket` seconds. The grid grows in either direction as new batches arrive.
+    """
+
+    def __init__(self, tick_bin: int = 60, time_bucket: int = 3600, value: str = 'count'):
+        if value not in ('count', 'volumeUSD'):
+            raise ValueError(f"Unsupported heatmap value: {value}")
+        self.tick_bin = tick_bin
+        self.time_bucket = time_bucket
+        self.value = value
+        self.tick_origin = None
+        self.time_origin = None
+        self.grid = np.zeros((0, 0))
+
+    @property
+    def row_labels(self) -> List[str]:
+        return [str((self.tick_origin + row) * self.tick_bin) for row in range(self.grid.shape[0])]
+
+    @property
+    def col_labels(self) -> List[str]:
+        starts = (self.time_origin + np.arange(self.grid.shape[1])) * self.time_bucket if self.grid.shape[1] else []
+        return [pd.Timestamp(int(start), unit='s').strftime('%Y-%m-%d %H:%M') for start in starts]
+
+    def _grow(self, tick_low, tick_high, time_low, time_high):
+        if self.tick_origin is None:
+            self.tick_origin, self.time_origin = tick_low, time_low
+            self.grid = np.zeros((tick_high - tick_low + 1, time_high - time_low + 1))
+            return
+        new_tick_origin = min(self.tick_origin, tick_low)
+        new_time_origin = min(self.time_origin, time_low)
+        rows = max(self.tick_origin + self.grid.shape[0] - 1, tick_high) - new_tick_origin + 1
+        cols = max(self.time_origin + self.grid.shape[1] - 1, time_high) - new_time_origin + 1
+        if (rows, cols) != self.grid.shape:
+            grown = np.zeros((rows, cols))
+            row_start = self.tick_origin - new_tick_origin
+            col_start = self.time_origin - new_time_origin
+            grown[row_start:row_start + self.grid.shape[0], col_start:col_start + self.grid.shape[1]] = self.grid
+            self.grid = grown
+            self.tick_origin, self.time_origin = new_tick_origin, new_time_origin
+
+    def add_swaps(self, swaps: Union[List[Dict[str, Any]], pd.DataFrame]) -> 'TickTimeGrid':
+        df = _to_frame(swaps)
+        if df.empty:
+            return self
+        ticks = pd.to_numeric(df['tick'], errors='coerce').to_numpy()
+        keep = ~np.isnan(ticks)
+        tick_rows = np.floor(ticks[keep] / self.tick_bin).astype(np.int64)
+        time_cols = df['timestamp'].astype(np.int64).to_numpy()[keep] // self.time_bucket
+        if len(tick_rows) == 0:
+            return self
+
+        weights = None
+        if self.value == 'volumeUSD' and 'amountUSD' in df:
+            weights = pd.to_numeric(df['amountUSD'], errors='coerce').fillna(0).abs().to_numpy()[keep]
+
+        self._grow(tick_rows.min(), tick_rows.max(), time_cols.min(), time_cols.max())
+        flat = (tick_rows - self.tick_origin) * self.grid.shape[1] + (time_cols - self.time_origin)
+        counts = np.bincount(flat, weights=weights, minlength=self.grid.size)
+        self.grid += counts.reshape(self.grid.shape)
+        return self
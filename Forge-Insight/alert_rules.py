@@ -0,0 +1,355 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from config import (ALERT_BUCKET_SECONDS, ALERT_HISTORY_BUCKETS, ALERT_MIN_HISTORY, ALERT_VOLUME_SPIKE_FACTOR,
+                    ALERT_VOLUME_MIN_USD, ALERT_TRADER_SURGE_FACTOR, ALERT_TRADER_MIN_COUNT, ALERT_TVL_DROP,
+                    ALERT_DEDUPE_WINDOW, ALERT_DIGEST_INTERVAL)
+
+def _pool_id(row: Dict[str, Any]) -> Optional[str]:
+    pool = row.get('pool')
+    if isinstance(pool, dict):
+        pool = pool.get('id')
+    return pool.lower() if isinstance(pool, str) else None
+
+class PoolActivity:
+    """
+    Rolling per-pool state: the open bucket, the closed buckets before it and the
+    recent TVL readings as (time, value). Each swap is added once; closing a bucket is O(1).
+
+    The ids of the swaps counted within the history window are kept, so the same swap
+    fetched again (a query run twice while its bucket is open) is not counted twice.
+    """
+
+    def __init__(self, bucket_seconds: int, history: int):
+        self.bucket_seconds = bucket_seconds
+        self.bucket = None
+        self.history = deque(maxlen=history)
+        self.traders = set()
+        self.tvl = deque(maxlen=history)  # (time of the reading, TVL), oldest first
+        self.seen_ids = set()
+        self.seen_order = deque()  # (bucket start, id), to forget ids once they leave the window
+
+    def bucket_start(self, row: Dict[str, Any]) -> int:
+        timestamp = int(row['timestamp'])
+        return timestamp - timestamp % self.bucket_seconds
+
+    def roll(self, start: int):
+        """Close the open bucket (if any) and open the one starting at `start`."""
+        if self.bucket is not None:
+            self.history.append(self.bucket)
+            # Intervals without swaps count as empty buckets in the baseline
+            first_gap = max(self.bucket['start'] + self.bucket_seconds, start - self.history.maxlen * self.bucket_seconds)
+            for gap_start in range(first_gap, start, self.bucket_seconds):
+                self.history.append({'start': gap_start, 'volumeUSD': 0.0, 'swaps': 0, 'new_traders': 0})
+        self.bucket = {'start': start, 'volumeUSD': 0.0, 'swaps': 0, 'new_traders': 0}
+        cutoff = start - self.history.maxlen * self.bucket_seconds
+        while self.seen_order and self.seen_order[0][0] < cutoff:
+            self.seen_ids.discard(self.seen_order.popleft()[1])
+
+    def add(self, row: Dict[str, Any]) -> bool:
+        """
+        Count a swap into the open bucket; swaps of closed buckets only register their trader.
+
+        :return: False if the swap was already counted (rows without an id always count)
+        """
+        swap_id = row.get('id')
+        if swap_id is not None:
+            if swap_id in self.seen_ids:
+                return False
+            self.seen_ids.add(swap_id)
+            self.seen_order.append((self.bucket_start(row), swap_id))
+        trader = row.get('origin')
+        new_trader = trader is not None and trader not in self.traders
+        if new_trader:
+            self.traders.add(trader)
+        if self.bucket_start(row) < self.bucket['start']:
+            return True
+        self.bucket['volumeUSD'] += abs(float(row.get('amountUSD') or 0))
+        self.bucket['swaps'] += 1
+        self.bucket['new_traders'] += new_trader
+        return True
+
+    def add_tvl(self, timestamp: float, value: float) -> bool:
+        """
+        Record a TVL reading. A reading of the same time replaces the last one.
+
+        :return: False if it is older than the newest reading, which is then kept
+        """
+        if self.tvl and timestamp <= self.tvl[-1][0]:
+            if timestamp < self.tvl[-1][0]:
+                return False
+            self.tvl.pop()
+        self.tvl.append((timestamp, value))
+        return True
+
+    def baseline(self, metric: str) -> Optional[float]:
+        if len(self.history) < ALERT_MIN_HISTORY:
+            return None
+        return sum(bucket[metric] for bucket in self.history) / len(self.history)
+
+class AlertRule(ABC):
+    """
+    A condition evaluated per pool. Bucket rules look at one bucket of swaps against
+    the pool's recent buckets, TVL rules at a new TVL reading against the recent ones.
+    check() returns (value, baseline, message) when the condition holds, else None.
+    """
+
+    name = 'rule'
+    kind = 'bucket'
+
+    @abstractmethod
+    def check(self, pool: str, activity: PoolActivity, bucket: Optional[Dict[str, Any]]):
+        """:param bucket: The bucket to judge; None for TVL rules"""
+
+class VolumeSpikeRule(AlertRule):
+    """USD volume of a bucket at least `factor` times the average bucket."""
+
+    name = 'volume_spike'
+
+    def __init__(self, factor: float = ALERT_VOLUME_SPIKE_FACTOR, min_volume: float = ALERT_VOLUME_MIN_USD):
+        self.factor = factor
+        self.min_volume = min_volume
+
+    def check(self, pool, activity, bucket):
+        baseline = activity.baseline('volumeUSD')
+        volume = bucket['volumeUSD']
+        if baseline is None or volume < self.min_volume or volume < self.factor * baseline:
+            return None
+        ratio = f"{volume / baseline:.1f}x" if baseline else "from zero"
+        return volume, baseline, f"Volume spike in pool {pool}: ${volume:,.0f} ({ratio} the average of ${baseline:,.0f})"
+
+class NewTraderSurgeRule(AlertRule):
+    """First-time traders in a bucket at least `factor` times the average bucket."""
+
+    name = 'new_trader_surge'
+
+    def __init__(self, factor: float = ALERT_TRADER_SURGE_FACTOR, min_traders: int = ALERT_TRADER_MIN_COUNT):
+        self.factor = factor
+        self.min_traders = min_traders
+
+    def check(self, pool, activity, bucket):
+        baseline = activity.baseline('new_traders')
+        count = bucket['new_traders']
+        if baseline is None or count < self.min_traders or count < self.factor * baseline:
+            return None
+        return count, baseline, f"New trader surge in pool {pool}: {count} new traders (average {baseline:.1f})"
+
+class TvlDropRule(AlertRule):
+    """TVL more than `drop` (a fraction) below its highest recent reading."""
+
+    name = 'tvl_drop'
+    kind = 'tvl'
+
+    def __init__(self, drop: float = ALERT_TVL_DROP):
+        self.drop = drop
+
+    def check(self, pool, activity, bucket):
+        if len(activity.tvl) < 2:
+            return None
+        tvl = activity.tvl[-1][1]
+        peak = max(value for _, value in activity.tvl)
+        if peak <= 0 or tvl > peak * (1 - self.drop):
+            return None
+        return tvl, peak, f"TVL drop in pool {pool}: ${tvl:,.0f}, {1 - tvl / peak:.0%} below the recent ${peak:,.0f}"
+
+def default_rules() -> List[AlertRule]:
+    return [VolumeSpikeRule(), NewTraderSurgeRule(), TvlDropRule()]
+
+class AlertEngine:
+    """
+    Evaluates alert rules over fetched data as it arrives.
+
+    process_swaps() and process_pools() only fold the new rows into per-pool state and
+    evaluate the rules for the buckets those rows touched, so calling them after every
+    poll costs O(new rows). Swaps are counted once per id, so rows fetched again add
+    nothing. Buckets that ended more than a bucket ago (e.g. a backfill)
+    only warm up the baselines and never alert.
+
+    An alert is suppressed while the same rule already fired for the same pool within
+    `dedupe_window` seconds. The rest are collected into a digest that is emailed
+    through the notifier's background queue `digest_interval` seconds after its first
+    alert, so a burst of alerts becomes one email.
+    """
+
+    def __init__(self, rules: Optional[List[AlertRule]] = None, notifier=None, recipient: Optional[str] = None,
+                 bucket_seconds: int = ALERT_BUCKET_SECONDS, history: int = ALERT_HISTORY_BUCKETS,
+                 dedupe_window: float = ALERT_DEDUPE_WINDOW, digest_interval: float = ALERT_DIGEST_INTERVAL,
+                 on_alert: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        self.rules = default_rules() if rules is None else rules
+        self.notifier = notifier
+        self.recipient = recipient
+        self.bucket_seconds = bucket_seconds
+        self.history = history
+        self.dedupe_window = dedupe_window
+        self.digest_interval = digest_interval
+        self.on_alert = on_alert
+        self.pools: Dict[str, PoolActivity] = {}
+        self.last_fired: Dict[tuple, float] = {}
+        self.pending: List[Dict[str, Any]] = []
+        self.timer = None
+        self.suppressed = 0
+        self.digests = 0
+        self.lock = threading.RLock()
+
+    def activity(self, pool: str) -> PoolActivity:
+        if pool not in self.pools:
+            self.pools[pool] = PoolActivity(self.bucket_seconds, self.history)
+        return self.pools[pool]
+
+    def process_swaps(self, rows: Iterable[Dict[str, Any]], pool: Optional[str] = None,
+                      now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        :param pool: Pool of every row, for rows fetched per pool without a pool field
+        :return: The alerts raised (after deduplication)
+        """
+        now = now or time.time()
+        alerts = []
+        with self.lock:
+            touched = set()
+            for row in sorted(rows, key=lambda row: int(row['timestamp'])):
+                pool_id = pool.lower() if pool else _pool_id(row)
+                if pool_id is None:
+                    continue
+                activity = self.activity(pool_id)
+                start = activity.bucket_start(row)
+                if activity.bucket is None or start > activity.bucket['start']:
+                    if activity.bucket is not None and pool_id in touched:
+                        # A bucket these rows added to is complete; judge it before it joins the baseline
+                        alerts.extend(self.evaluate(pool_id, activity, activity.bucket, now))
+                    activity.roll(start)
+                if activity.add(row):
+                    touched.add(pool_id)
+            for pool_id in touched:
+                activity = self.pools[pool_id]
+                alerts.extend(self.evaluate(pool_id, activity, activity.bucket, now))
+            self.raise_alerts(alerts)
+        return alerts
+
+    def process_pools(self, rows: Iterable[Dict[str, Any]], now: Optional[float] = None,
+                      read_at: Optional[float] = None, block: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Feed pool rows carrying totalValueLockedUSD (or tvlUSD) to the TVL rules. A reading
+        is timed by the end of its hour or day for PoolHourData/PoolDayData rows, else by
+        when it was read; readings older than the pool's newest one are ignored, so a
+        late rerun cannot pass for a drop.
+
+        :param read_at: When the rows were fetched; defaults to now
+        :param block: Block the rows were pinned to. Those describe the past and are skipped.
+        """
+        now = now or time.time()
+        if block is not None:
+            return []
+        read_at = read_at or now
+        readings = []
+        for row in rows:
+            pool_id = _pool_id(row) or (row.get('id') or '').lower()
+            value = row.get('totalValueLockedUSD', row.get('tvlUSD'))
+            if not pool_id or value is None:
+                continue
+            timestamp = read_at
+            if row.get('periodStartUnix') is not None:
+                timestamp = min(read_at, int(row['periodStartUnix']) + 60 * 60)
+            elif row.get('date') is not None:
+                timestamp = min(read_at, int(row['date']) + 24 * 60 * 60)
+            readings.append((timestamp, pool_id, float(value)))
+        alerts = []
+        with self.lock:
+            for timestamp, pool_id, value in sorted(readings, key=lambda reading: reading[0]):
+                activity = self.activity(pool_id)
+                if not activity.add_tvl(timestamp, value):
+                    continue
+                for rule in self.rules:
+                    if rule.kind == 'tvl':
+                        alerts.extend(self.fire(rule, pool_id, rule.check(pool_id, activity, None), now))
+            self.raise_alerts(alerts)
+        return alerts
+
+    def process_results(self, results: Dict[str, Any], now: Optional[float] = None,
+                        read_at: Optional[float] = None, block: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Run the rules over the swap and pool lists of a {collection: rows} query result.
+
+        :param read_at: When the results were fetched, to order TVL readings; defaults to now
+        :param block: Block the results were pinned to; their TVL is not taken as a new reading
+        """
+        alerts = []
+        for key, value in results.items():
+            if not isinstance(value, list) or not value or not isinstance(value[0], dict):
+                continue
+            if 'timestamp' in value[0] and 'amountUSD' in value[0] and 'pool' in value[0]:
+                alerts.extend(self.process_swaps(value, now=now))
+            elif 'totalValueLockedUSD' in value[0] or ('tvlUSD' in value[0] and 'pool' in value[0]):
+                alerts.extend(self.process_pools(value, now=now, read_at=read_at, block=block))
+        return alerts
+
+    def evaluate(self, pool: str, activity: PoolActivity, bucket: Dict[str, Any], now: float) -> List[Dict[str, Any]]:
+        if bucket['start'] + 2 * self.bucket_seconds < now:
+            return []
+        alerts = []
+        for rule in self.rules:
+            if rule.kind == 'bucket':
+                alerts.extend(self.fire(rule, pool, rule.check(pool, activity, bucket), bucket['start']))
+        return alerts
+
+    def fire(self, rule: AlertRule, pool: str, result, timestamp: float) -> List[Dict[str, Any]]:
+        if result is None:
+            return []
+        key = (rule.name, pool)
+        last = self.last_fired.get(key)
+        if last is not None and timestamp - last < self.dedupe_window:
+            self.suppressed += 1
+            return []
+        self.last_fired[key] = timestamp
+        value, baseline, message = result
+        return [{'rule': rule.name, 'pool': pool, 'timestamp': int(timestamp),
+                 'value': value, 'baseline': baseline, 'message': message}]
+
+    def report(self, alerts: List[Dict[str, Any]]):
+        """Send alerts raised elsewhere (e.g. by the anomaly detector) through the same digests."""
+        with self.lock:
+            self.raise_alerts(alerts)
+
+    def raise_alerts(self, alerts: List[Dict[str, Any]]):
+        if not alerts:
+            return
+        for alert in alerts:
+            print(f"Alert: {alert['message']}")
+        if self.on_alert:
+            self.on_alert(alerts)
+        if self.notifier is None or not self.recipient:
+            return
+        self.pending.extend(alerts)
+        if self.timer is None:
+            self.timer = threading.Timer(self.digest_interval, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self) -> bool:
+        """Queue the pending alerts as one digest email now; False if there was nothing to send."""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            alerts, self.pending = self.pending, []
+        if not alerts:
+            return False
+        lines = []
+        for alert in alerts:
+            when = datetime.fromtimestamp(alert['timestamp'], tz=timezone.utc).strftime('%Y-%m-%d %H:%M UTC')
+            lines.append(f"{when}  {alert['message']}")
+        subject = f"Forge Insight: {len(alerts)} alert{'s' if len(alerts) != 1 else ''}"
+        self.notifier.queue_email(self.recipient, subject, "\n".join(lines))
+        self.digests += 1
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                'pools': len(self.pools),
+                'pending': len(self.pending),
+                'suppressed': self.suppressed,
+                'digests': self.digests,
+            }
@@ -0,0 +1,271 @@
+import json
+import math
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+from config import ANOMALY_STATE_FILE, ANOMALY_WINDOW, ANOMALY_EWMA_ALPHA, ANOMALY_Z_THRESHOLD, ANOMALY_MIN_POINTS
+
+HOUR = 60 * 60
+
+# PoolHourData fields scored
+POOL_HOUR_METRICS = ['volumeUSD', 'tvlUSD', 'txCount']
+
+# Hours folded from swaps are series of their own: a swap query may not hold every swap of
+# an hour, and its hour must not stand in for (and then block) the PoolHourData value
+SWAP_HOUR_METRICS = {'volumeUSD': 'swapVolumeUSD', 'txCount': 'swapCount', 'traders': 'traders'}
+
+def _pool_id(row: Dict[str, Any]) -> Optional[str]:
+    pool = row.get('pool')
+    if isinstance(pool, dict):
+        pool = pool.get('id')
+    return pool.lower() if isinstance(pool, str) else None
+
+class MetricState:
+    """
+    Rolling mean/variance over the last `window` points (Welford, with removal of the
+    point leaving the window) and an exponentially weighted mean/variance of one series.
+    Adding a point is O(1).
+    """
+
+    def __init__(self, window: int = ANOMALY_WINDOW, alpha: float = ANOMALY_EWMA_ALPHA):
+        self.values = deque(maxlen=window)
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.alpha = alpha
+        self.ewma = None
+        self.ewm_var = 0.0
+        self.points = 0
+        self.last_timestamp = None
+
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (len(self.values) - 1)) if len(self.values) > 1 else 0.0
+
+    @staticmethod
+    def zscore(value: float, mean: float, std: float) -> float:
+        # A flat series still has some tolerance: 5% of its level
+        std = max(std, abs(mean) * 0.05)
+        return (value - mean) / std if std > 0 else 0.0
+
+    def score(self, value: float):
+        """(rolling z-score, EWMA z-score) of a value against the state before it is added."""
+        rolling = self.zscore(value, self.mean, self.std())
+        ewma = self.zscore(value, self.ewma, math.sqrt(self.ewm_var)) if self.ewma is not None else 0.0
+        return rolling, ewma
+
+    def add(self, value: float, timestamp: int):
+        if len(self.values) == self.values.maxlen:
+            old = self.values.popleft()
+            count = len(self.values)
+            if count:
+                delta = old - self.mean
+                self.mean -= delta / count
+                self.m2 = max(0.0, self.m2 - delta * (old - self.mean))
+            else:
+                self.mean, self.m2 = 0.0, 0.0
+        self.values.append(value)
+        delta = value - self.mean
+        self.mean += delta / len(self.values)
+        self.m2 += delta * (value - self.mean)
+
+        if self.ewma is None:
+            self.ewma = value
+        else:
+            delta = value - self.ewma
+            self.ewma += self.alpha * delta
+            self.ewm_var = (1 - self.alpha) * (self.ewm_var + self.alpha * delta * delta)
+        self.points += 1
+        self.last_timestamp = timestamp
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'values': list(self.values), 'mean': self.mean, 'm2': self.m2, 'ewma': self.ewma,
+                'ewm_var': self.ewm_var, 'points': self.points, 'last_timestamp': self.last_timestamp}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], window: int = ANOMALY_WINDOW, alpha: float = ANOMALY_EWMA_ALPHA):
+        state = cls(window, alpha)
+        state.values.extend(data['values'][-window:])
+        if len(state.values) == len(data['values']):
+            state.mean, state.m2 = data['mean'], data['m2']
+        else:
+            # The window was shortened since the state was saved; recompute from the kept values
+            values = list(state.values)
+            state.mean = sum(values) / len(values) if values else 0.0
+            state.m2 = sum((value - state.mean) ** 2 for value in values)
+        state.ewma = data['ewma']
+        state.ewm_var = data['ewm_var']
+        state.points = data['points']
+        state.last_timestamp = data['last_timestamp']
+        return state
+
+class AnomalyDetector:
+    """
+    Scores hourly pool metrics against their own recent history.
+
+    Every (pool, metric) series keeps a MetricState. A new hourly point is scored against
+    the state before it is added, so each point costs O(1) and history is never
+    rescanned. A point is an anomaly once the series has ANOMALY_MIN_POINTS points and
+    the point is ANOMALY_Z_THRESHOLD standard deviations away from the rolling or the
+    EWMA mean. Points at or before the last hour scored are skipped, so fetching the
+    same hours again does not count them twice. The state is saved to
+    ANOMALY_STATE_FILE, so a restart continues where the last run stopped.
+
+    Anomalies are returned in the alert format of alert_rules (rule 'anomaly'), so they
+    can be reported through AlertEngine.report().
+    """
+
+    def __init__(self, path: str = ANOMALY_STATE_FILE, window: int = ANOMALY_WINDOW, alpha: float = ANOMALY_EWMA_ALPHA,
+                 threshold: float = ANOMALY_Z_THRESHOLD, min_points: int = ANOMALY_MIN_POINTS):
+        self.path = path
+        self.window = window
+        self.alpha = alpha
+        self.threshold = threshold
+        self.min_points = min_points
+        self.states: Dict[str, MetricState] = {}
+        # Swap-derived hour of a live stream still filling up, per pool; scored once a later hour starts
+        self.open_hours: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.RLock()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                for key, data in json.load(f).items():
+                    self.states[key] = MetricState.from_dict(data, self.window, self.alpha)
+        except (OSError, ValueError, KeyError):
+            print(f"Anomaly state at {self.path} is unreadable; starting empty")
+            self.states = {}
+
+    def save(self):
+        with self.lock:
+            data = {key: state.to_dict() for key, state in self.states.items()}
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(temp_path, self.path)
+
+    def observe(self, pool: str, metric: str, timestamp: int, value: float) -> Optional[Dict[str, Any]]:
+        """Score one point and add it to its series; returns the anomaly, if it is one."""
+        with self.lock:
+            key = f"{pool}:{metric}"
+            state = self.states.get(key)
+            if state is None:
+                state = self.states[key] = MetricState(self.window, self.alpha)
+            if state.last_timestamp is not None and timestamp <= state.last_timestamp:
+                return None
+            anomaly = None
+            if state.points >= self.min_points:
+                rolling, ewma = state.score(value)
+                zscore = rolling if abs(rolling) >= abs(ewma) else ewma
+                if abs(zscore) >= self.threshold:
+                    direction = 'above' if zscore > 0 else 'below'
+                    anomaly = {
+                        'rule': 'anomaly', 'pool': pool, 'metric': metric, 'timestamp': int(timestamp),
+                        'value': value, 'baseline': state.mean, 'zscore': round(rolling, 2),
+                        'ewma_zscore': round(ewma, 2),
+                        'message': f"Unusual {metric} in pool {pool}: {value:,.2f} is {abs(zscore):.1f} "
+                                   f"standard deviations {direction} normal ({state.mean:,.2f})"
+                    }
+            state.add(value, timestamp)
+            return anomaly
+
+    def process_pool_hours(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        anomalies = []
+        with self.lock:
+            for row in sorted(rows, key=lambda row: int(row.get('periodStartUnix') or 0)):
+                pool = _pool_id(row)
+                if pool is None or row.get('periodStartUnix') is None:
+                    continue
+                for metric in POOL_HOUR_METRICS:
+                    if row.get(metric) is not None:
+                        anomaly = self.observe(pool, metric, int(row['periodStartUnix']), float(row[metric]))
+                        if anomaly:
+                            anomalies.append(anomaly)
+        return anomalies
+
+    def process_swaps(self, rows: Iterable[Dict[str, Any]], pool: Optional[str] = None,
+                      stream: bool = False) -> List[Dict[str, Any]]:
+        """
+        Fold swaps into hourly volume, swap count and trader count per pool, counting each
+        swap id once. Only hours seen from start to end are scored: one starts being seen
+        fully when the swaps before it were seen too, and is scored when a swap of a later
+        hour arrives. The rows of a query (first: N) may begin partway through an hour, so
+        of those only the hours after their first one count, and their last hour is left.
+        Hours without swaps between two seen hours score as zero, so a pool going quiet
+        shows up as a drop.
+
+        :param pool: Pool of every row, for rows fetched per pool without a pool field
+        :param stream: The rows continue those of the previous call (live polls), so an hour
+                       still open at the end of one call is completed by the next
+        """
+        anomalies = []
+        with self.lock:
+            open_hours = self.open_hours if stream else {}
+            for row in sorted(rows, key=lambda row: int(row['timestamp'])):
+                pool_id = pool.lower() if pool else _pool_id(row)
+                if pool_id is None:
+                    continue
+                timestamp = int(row['timestamp'])
+                hour_start = timestamp - timestamp % HOUR
+                hour = open_hours.get(pool_id)
+                if hour is None or hour_start > hour['start']:
+                    if hour is not None:
+                        if hour['whole']:
+                            anomalies.extend(self.close_hour(pool_id, hour))
+                        anomalies.extend(self.close_empty_hours(pool_id, hour, hour_start))
+                    hour = open_hours[pool_id] = {'start': hour_start, 'volumeUSD': 0.0, 'txCount': 0,
+                                                  'traders': set(), 'ids': set(), 'whole': hour is not None}
+                elif hour_start < hour['start']:
+                    continue
+                if row.get('id') is not None:
+                    if row['id'] in hour['ids']:
+                        continue
+                    hour['ids'].add(row['id'])
+                hour['volumeUSD'] += abs(float(row.get('amountUSD') or 0))
+                hour['txCount'] += 1
+                if row.get('origin'):
+                    hour['traders'].add(row['origin'])
+        return anomalies
+
+    def close_hour(self, pool: str, hour: Dict[str, Any]) -> List[Dict[str, Any]]:
+        points = {'volumeUSD': hour['volumeUSD'], 'txCount': hour['txCount']}
+        if hour['traders']:
+            points['traders'] = len(hour['traders'])
+        anomalies = []
+        for metric, value in points.items():
+            anomaly = self.observe(pool, SWAP_HOUR_METRICS[metric], hour['start'], float(value))
+            if anomaly:
+                anomalies.append(anomaly)
+        return anomalies
+
+    def close_empty_hours(self, pool: str, hour: Dict[str, Any], end: int) -> List[Dict[str, Any]]:
+        """Score zero activity for the hours after `hour` and before `end`; only the last `window` matter."""
+        metrics = ['volumeUSD', 'txCount'] + (['traders'] if hour['traders'] else [])
+        anomalies = []
+        for start in range(max(hour['start'] + HOUR, end - self.window * HOUR), end, HOUR):
+            for metric in metrics:
+                anomaly = self.observe(pool, SWAP_HOUR_METRICS[metric], start, 0.0)
+                if anomaly:
+                    anomalies.append(anomaly)
+        return anomalies
+
+    def process_results(self, results: Dict[str, Any], save: bool = True) -> List[Dict[str, Any]]:
+        """
+        Score the pool hour and swap lists of a {collection: rows} query result and add
+        the anomalies found to it under 'anomalies'.
+        """
+        anomalies = []
+        for key, value in list(results.items()):
+            if not isinstance(value, list) or not value or not isinstance(value[0], dict):
+                continue
+            if 'periodStartUnix' in value[0] and 'pool' in value[0]:
+                anomalies.extend(self.process_pool_hours(value))
+            elif 'timestamp' in value[0] and 'amountUSD' in value[0] and 'pool' in value[0]:
+                anomalies.extend(self.process_swaps(value))
+        if anomalies:
+            results['anomalies'] = anomalies
+        if save:
+            self.save()
+        return anomalies
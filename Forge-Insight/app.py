@@ -4,6 +4,9 @@ from subgraph_connector import SubgraphConnector
 from auth_manager import AuthManager
 from error_handler import ErrorHandler
 from notifier import Notifier
+from alert_rules import AlertEngine
+from anomaly_detector import AnomalyDetector
+from config import ALERT_EMAIL_RECIPIENT, SMTP_SERVER, SMTP_PORT, SMTP_SENDER, SMTP_PASSWORD, SMTP_USE_TLS
 from plugin_manager import PluginManager
 from scheduler import Scheduler
 
@@ -14,10 +17,16 @@ class ForgeInsight:
         self.auth_manager = AuthManager()
         self.error_handler = ErrorHandler()
         self.notifier = Notifier()
+        if SMTP_SERVER and SMTP_SENDER:
+            self.notifier.configure_email(SMTP_SERVER, SMTP_PORT, SMTP_SENDER, SMTP_PASSWORD, SMTP_USE_TLS)
+        self.alert_engine = AlertEngine(notifier=self.notifier,
+                                        recipient=ALERT_EMAIL_RECIPIENT if self.notifier.email_config else None)
+        self.anomaly_detector = AnomalyDetector()
         self.plugin_manager = PluginManager()
         self.scheduler = Scheduler()
         
-        self.ui_manager = UIManager(self.root)
+        self.ui_manager = UIManager(self.root, self.plugin_manager, self.alert_engine, self.anomaly_detector,
+                                    self.scheduler)
         
         self.setup_error_handling()
         self.load_plugins()
@@ -26,12 +35,19 @@ class ForgeInsight:
         self.error_handler.set_ui_callback(lambda msg: self.ui_manager.show_error(msg))
 
     def load_plugins(self):
-        self.plugin_manager.load_plugins()
-        for plugin in self.plugin_manager.get_plugins():
-            plugin.initialize(self)
+        # Plugins are initialized with the app when first used, see PluginManager
+        self.plugin_manager.load_plugins(self)
 
     def run(self):
+        self.scheduler.start()
         self.root.mainloop()
+        self.scheduler.stop()
+        self.plugin_manager.execute_hook('on_shutdown', self)
+        self.plugin_manager.shutdown()
+        # Send any alert digest still waiting before the process exits
+        self.alert_engine.flush()
+        self.anomaly_detector.save()
+        self.notifier.close()
 
 if __name__ == "__main__":
     app = ForgeInsight()
@@ -1,40 +1,21 @@
-import json
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import Flow
-from google.auth.transport.requests import Request
-from config import SCOPES, TOKEN_FILE, CLIENT_SECRET_FILE
+from config import CLIENT_SECRET_FILE
+from google_services import GoogleServicePool
 
 class AuthManager:
-    def __init__(self):
-        self.creds = None
+    def __init__(self, service_pool=None):
+        # Credentials live in the shared pool so every exporter sees the same token
+        self.service_pool = service_pool or GoogleServicePool.shared()
 
-    def authenticate(self):
-        if self.creds and self.creds.valid:
-            return True
-        
-        if self.creds and self.creds.expired and self.creds.refresh_token:
-            self.creds.refresh(Request())
-        else:
-            flow = Flow.from_client_secrets_file(CLIENT_SECRET_FILE, SCOPES)
-            self.creds = flow.run_local_server(port=0)
-
-        with open(TOKEN_FILE, 'w') as token:
-            token.write(self.creds.to_json())
+    @property
+    def creds(self):
+        return self.service_pool.creds
 
+    def authenticate(self):
+        self.service_pool.get_credentials(CLIENT_SECRET_FILE)
         return True
 
     def get_credentials(self):
-        if not self.creds:
-            try:
-                with open(TOKEN_FILE, 'r') as token:
-                    self.creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-            except FileNotFoundError:
-                return None
-        return self.creds
+        return self.service_pool.get_credentials()
 
     def clear_credentials(self):
-        self.creds = None
-        try:
-            os.remove(TOKEN_FILE)
-        except FileNotFoundError:
-            pass
\ No newline at end of file
+        self.service_pool.clear_credentials()
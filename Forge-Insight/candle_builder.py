@@ -0,0 +1,251 @@
+import json
+import os
+import time
+from typing import Dict, Any, List, Optional, Union
+import numpy as np
+import pandas as pd
+from config import CANDLE_CACHE_DIR, CANDLE_RESOLUTIONS, CANDLE_CLOSE_MARGIN
+
+CANDLE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'volumeUSD', 'trades']
+
+SWAP_FIELDS = ['id', 'timestamp', 'amount0', 'amount1', 'amountUSD', 'sqrtPriceX96',
+               'token0 { decimals }', 'token1 { decimals }']
+
+# Unix epoch starts on a Thursday; shift weekly buckets so they open on Monday
+WEEK_OFFSET = 4 * 86400
+
+class CandleBuilder:
+    """
+    Builds OHLCV candles for a single pool from its Swap stream.
+
+    Finished bars are written to the candle cache and never recomputed; the last
+    bar stays in memory while it is still open and is updated as new swaps arrive.
+
+    The cache holds one contiguous range of time, [covered[0], covered[1]), whose swaps
+    have all been seen; bars inside it are final. Empty buckets have no bar, so the
+    range is kept next to the CSV rather than derived from its first and last bar.
+    """
+
+    def __init__(self, pool_address: str, resolution: str = '1h', price_source: str = 'amounts',
+                 cache_dir: str = CANDLE_CACHE_DIR):
+        if resolution not in CANDLE_RESOLUTIONS:
+            raise ValueError(f"Unsupported resolution: {resolution}")
+        if price_source not in ('amounts', 'sqrtPriceX96'):
+            raise ValueError(f"Unsupported price source: {price_source}")
+
+        self.pool_address = pool_address.lower()
+        self.resolution = resolution
+        self.seconds = CANDLE_RESOLUTIONS[resolution]
+        self.offset = WEEK_OFFSET if resolution == '1w' else 0
+        self.price_source = price_source
+        self.cache_file = os.path.join(cache_dir, f"{self.pool_address}_{resolution}_{price_source}.csv")
+        self.range_file = self.cache_file[:-len('.csv')] + '.range.json'
+
+        self.covered = None
+        self.finished = self.load_cache()
+        self.partial = pd.DataFrame(columns=CANDLE_COLUMNS)
+
+    def load_cache(self) -> pd.DataFrame:
+        if not os.path.exists(self.cache_file):
+            return pd.DataFrame(columns=CANDLE_COLUMNS)
+        finished = pd.read_csv(self.cache_file)
+        try:
+            with open(self.range_file, 'r') as f:
+                covered = json.load(f)
+            self.covered = (int(covered['from']), int(covered['to']))
+        except (OSError, ValueError, KeyError):
+            # Caches written before the range was recorded: assume the span of their bars
+            if not finished.empty:
+                self.covered = (int(finished['timestamp'].iloc[0]), int(finished['timestamp'].iloc[-1]) + self.seconds)
+        return finished
+
+    def save_cache(self, new_bars: pd.DataFrame, rewrite: bool = False):
+        """
+        :param rewrite: Write every finished bar instead of appending `new_bars`, for
+                        bars that do not come after the cached ones
+        """
+        if rewrite:
+            self.finished[CANDLE_COLUMNS].to_csv(self.cache_file, index=False)
+        elif not new_bars.empty:
+            write_header = not os.path.exists(self.cache_file)
+            new_bars[CANDLE_COLUMNS].to_csv(self.cache_file, mode='a', header=write_header, index=False)
+        if self.covered is not None:
+            with open(self.range_file, 'w') as f:
+                json.dump({'from': self.covered[0], 'to': self.covered[1]}, f)
+
+    def next_uncached_timestamp(self) -> Optional[int]:
+        """First timestamp not covered by the cache."""
+        return self.covered[1] if self.covered else None
+
+    def build(self, connector, start_timestamp: int, end_timestamp: Optional[int] = None) -> pd.DataFrame:
+        """
+        Fetch the swaps not yet covered by the cache and return candles from start to end.
+
+        :param connector: SubgraphConnector used for the paginated Swap fetch
+        :param start_timestamp: Unix timestamp of the first candle
+        :param end_timestamp: Unix timestamp of the last swap, defaults to now
+        :return: DataFrame of candles
+        """
+        end_timestamp = end_timestamp or int(time.time())
+        first_bucket = int(self.bucket_start(start_timestamp))
+        # Swaps are indexed some time after they happen; bars this recent may still grow
+        close_before = min(end_timestamp + 1, int(time.time()) - CANDLE_CLOSE_MARGIN)
+
+        if self.covered and first_bucket < self.covered[0]:
+            # Earlier than anything cached: fetch up to the cached range, all of it finished
+            self.apply_frame(self.fetch_swaps(connector, first_bucket, self.covered[0] - 1),
+                             close_before=self.covered[0], covered_from=first_bucket)
+        fetch_from = self.covered[1] if self.covered else first_bucket
+        if fetch_from <= end_timestamp:
+            # Open bars all lie past the cached range and are fetched again in full
+            self.partial = pd.DataFrame(columns=CANDLE_COLUMNS)
+            self.apply_frame(self.fetch_swaps(connector, fetch_from, end_timestamp),
+                             close_before=close_before, covered_from=fetch_from)
+
+        candles = self.candles
+        return candles[(candles['timestamp'] >= first_bucket) &
+                       (candles['timestamp'] <= end_timestamp)].reset_index(drop=True)
+
+    def fetch_swaps(self, connector, start_timestamp: int, end_timestamp: int) -> pd.DataFrame:
+        where_conditions = [
+            f'pool: "{self.pool_address}"',
+            f'timestamp_gte: {start_timestamp}',
+            f'timestamp_lte: {end_timestamp}'
+        ]
+        # Pages are ordered by id, not time, so bars are only closed once every page is in
+        frames = [self.swaps_to_frame(page, self.price_source)
+                  for page in connector.iter_pages('Swap', SWAP_FIELDS, where_conditions)]
+        return pd.concat(frames, ignore_index=True) if frames else self.swaps_to_frame([])
+
+    def update(self, swaps: Union[List[Dict[str, Any]], pd.DataFrame], now: Optional[int] = None,
+               covered_from: Optional[int] = None) -> pd.DataFrame:
+        """
+        Fold new swaps into the candles.
+
+        Bars that closed before `now` are moved to the cache, the rest remain partial.
+
+        :param swaps: Swap rows as returned by the subgraph
+        :param now: Unix timestamp up to which every swap has been seen, e.g. that of the
+                    newest indexed swap; defaults to the wall clock minus CANDLE_CLOSE_MARGIN
+        :param covered_from: Bucket-aligned start of the stream these swaps belong to; only
+                             for its first update, later ones continue the covered range
+        :return: The bars touched by this update
+        """
+        close_before = now if now is not None else int(time.time()) - CANDLE_CLOSE_MARGIN
+        return self.apply_frame(self.swaps_to_frame(swaps, self.price_source), close_before, covered_from)
+
+    def apply_frame(self, frame: pd.DataFrame, close_before: int, covered_from: Optional[int] = None) -> pd.DataFrame:
+        """
+        :param close_before: Bars ending at or before this are finished
+        :param covered_from: Start of the time range `frame` holds every swap of
+        """
+        bars = self.resample(frame) if not frame.empty else pd.DataFrame(columns=CANDLE_COLUMNS)
+        if not self.partial.empty:
+            bars = self.merge_bars(self.partial, bars)
+        if self.covered:
+            # Swaps that fall into an already cached bar are ignored
+            bars = bars[(bars['timestamp'] < self.covered[0]) | (bars['timestamp'] >= self.covered[1])]
+
+        closed = bars['timestamp'] + self.seconds <= close_before
+        newly_finished = bars[closed].reset_index(drop=True)
+        self.partial = bars[~closed].reset_index(drop=True)
+        self.extend_cache(newly_finished, covered_from, int(self.bucket_start(close_before)))
+        return bars
+
+    def extend_cache(self, new_bars: pd.DataFrame, covered_from: Optional[int], covered_to: int):
+        """Add finished bars of [covered_from, covered_to) to the cache and its range."""
+        if covered_from is None:
+            covered_from = self.covered[1] if self.covered else (
+                int(new_bars['timestamp'].iloc[0]) if not new_bars.empty else None)
+        if covered_from is None or covered_to <= covered_from:
+            return
+        rewrite = False
+        if self.covered is None or covered_from > self.covered[1] or covered_to < self.covered[0]:
+            # Not adjacent to the cached range; the cache restarts with this one
+            rewrite = self.covered is not None
+            self.finished = new_bars
+            self.covered = (covered_from, covered_to)
+        else:
+            rewrite = covered_from < self.covered[0]
+            self.covered = (min(covered_from, self.covered[0]), max(covered_to, self.covered[1]))
+            frames = [frame for frame in (self.finished, new_bars) if not frame.empty]
+            if frames:
+                self.finished = pd.concat(frames, ignore_index=True).sort_values('timestamp', kind='stable') \
+                    .reset_index(drop=True)
+        self.save_cache(new_bars, rewrite)
+
+    @property
+    def candles(self) -> pd.DataFrame:
+        frames = [frame for frame in (self.finished, self.partial) if not frame.empty]
+        if not frames:
+            return pd.DataFrame(columns=CANDLE_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def bucket_start(self, timestamps):
+        return (timestamps - self.offset) // self.seconds * self.seconds + self.offset
+
+    def resample(self, frame: pd.DataFrame) -> pd.DataFrame:
+        frame = frame.sort_values(['timestamp', 'id'], kind='stable')
+        frame['bucket'] = self.bucket_start(frame['timestamp'].to_numpy())
+        grouped = frame.groupby('bucket', sort=True)
+        bars = grouped['price'].agg(['first', 'max', 'min', 'last'])
+        bars.columns = ['open', 'high', 'low', 'close']
+        bars['volume'] = grouped['volume'].sum()
+        bars['volumeUSD'] = grouped['volumeUSD'].sum()
+        bars['trades'] = grouped['price'].size()
+        bars.index.name = 'timestamp'
+        return bars.reset_index()[CANDLE_COLUMNS]
+
+    @staticmethod
+    def merge_bars(existing: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+        combined = pd.concat([existing, new], ignore_index=True)
+        merged = combined.groupby('timestamp', sort=True).agg({
+            'open': 'first',
+            'high': 'max',
+            'low': 'min',
+            'close': 'last',
+            'volume': 'sum',
+            'volumeUSD': 'sum',
+            'trades': 'sum'
+        })
+        return merged.reset_index()[CANDLE_COLUMNS]
+
+    @staticmethod
+    def swaps_to_frame(swaps: Union[List[Dict[str, Any]], pd.DataFrame], price_source: str = 'amounts') -> pd.DataFrame:
+        """
+        Convert raw swaps into a frame with a token0 price (in token1) and volume per swap.
+
+        With 'amounts' the price is |amount1 / amount0|; with 'sqrtPriceX96' it is the pool
+        price after the swap, adjusted for the token decimals.
+        """
+        df = swaps if isinstance(swaps, pd.DataFrame) else pd.DataFrame(swaps)
+        if df.empty:
+            return pd.DataFrame(columns=['id', 'timestamp', 'price', 'volume', 'volumeUSD'])
+
+        frame = pd.DataFrame({
+            'id': df['id'].to_numpy() if 'id' in df else np.arange(len(df)).astype(str),
+            'timestamp': df['timestamp'].astype(np.int64).to_numpy()
+        })
+        amount0 = df['amount0'].astype(float).to_numpy()
+        amount1 = df['amount1'].astype(float).to_numpy()
+
+        if price_source == 'sqrtPriceX96':
+            sqrt_price = df['sqrtPriceX96'].astype(float).to_numpy() / 2 ** 96
+            decimals0 = CandleBuilder._decimals(df, 'token0')
+            decimals1 = CandleBuilder._decimals(df, 'token1')
+            price = sqrt_price ** 2 * np.power(10.0, decimals0 - decimals1)
+        else:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                price = np.abs(amount1 / amount0)
+
+        frame['price'] = price
+        frame['volume'] = np.abs(amount0)
+        frame['volumeUSD'] = np.abs(df['amountUSD'].astype(float).to_numpy()) if 'amountUSD' in df else 0.0
+        return frame[np.isfinite(frame['price']) & (frame['price'] > 0)]
+
+    @staticmethod
+    def _decimals(df: pd.DataFrame, token_column: str) -> np.ndarray:
+        if token_column not in df:
+            return np.zeros(len(df))
+        return np.array([int(token['decimals']) if isinstance(token, dict) else 0
+                         for token in df[token_column]], dtype=float)
@@ -8,16 +8,53 @@ SUBGRAPH_URLS: Dict[str, str] = {
 }
 
 API_TIMEOUT = 30  # seconds
+ENDPOINT_MAX_CONCURRENCY = 8  # pooled connections and upper bound of the adaptive concurrency limit per subgraph endpoint
+ENDPOINT_MIN_CONCURRENCY = 1
+ENDPOINT_INITIAL_CONCURRENCY = 2
+ENDPOINT_RATE_LIMIT = 10  # requests per second per subgraph endpoint
+ENDPOINT_BURST = 20
+CIRCUIT_FAILURE_THRESHOLD = 5  # consecutive failed requests that open an endpoint's circuit
+CIRCUIT_RESET_TIMEOUT = 30  # seconds an open circuit rejects requests before letting a probe through
+RESULT_CACHE_SIZE = 256  # subgraph responses kept in memory
+RESULT_CACHE_TTL = 60  # seconds
+SNAPSHOT_CACHE_SIZE = 1024  # block-pinned responses kept in memory; they never expire
+FRESH_RESULTS_SIZE = 16  # full entity reads kept for refetching only what changed since their block
+FRESH_FULL_READ_INTERVAL = 30 * 60  # seconds after which a kept read is read in full again, dropping deleted entities
+FRESH_REFRESH_INTERVAL = 60  # seconds between Keep fresh checks for a newly indexed block
 
 # Google Sheets Configuration
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 TOKEN_FILE = 'token.json'
 CLIENT_SECRET_FILE = 'client_secret.json'
+TOKEN_REFRESH_MARGIN = 5 * 60  # seconds before expiry at which the access token is refreshed in the background
+SHEETS_API_ENDPOINT = None  # e.g. 'http://localhost:8080/' to run exports against a local fake Sheets server
+SHEETS_CHUNK_BYTES = 512 * 1024  # JSON size of the rows written by one range
+SHEETS_BATCH_BYTES = 2 * 1024 * 1024  # JSON size of one values:batchUpdate request
+SHEETS_MAX_RETRIES = 5
+SHEETS_RETRY_BACKOFF = 1.0  # seconds, doubled on every retry
+
+# Export Configuration
+EXPORT_BUFFER_BYTES = 4 * 1024 * 1024  # flush CSV output once this much is buffered
+EXPORT_CHUNK_ROWS = 50000  # rows formatted per batch when exporting in-memory results
+EXCEL_MAX_ROWS = 1048576  # rows per worksheet, including the header row
 
 # Local Storage
 DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 CACHE_DIR = os.path.join(DATA_DIR, 'cache')
 LOG_DIR = os.path.join(DATA_DIR, 'logs')
+LOCAL_DB_PATH = os.path.join(DATA_DIR, 'forge_insight.db')  # SQL store of fetched entities
+
+# Token address -> symbol/name/decimals/derivedETH, filled from the subgraph on demand
+TOKEN_CACHE_FILE = os.path.join(CACHE_DIR, 'token_metadata.json')
+TOKEN_PRICE_TTL = 5 * 60  # seconds a cached derivedETH price is used before it is fetched again
+
+# Rolling statistics of every pool metric scored for anomalies
+ANOMALY_STATE_FILE = os.path.join(CACHE_DIR, 'anomaly_state.json')
+
+# Resume checkpoints for interrupted Google Sheets uploads
+SHEETS_UPLOAD_DIR = os.path.join(CACHE_DIR, 'sheets_uploads')
+# Row digests of the last grid written to each synced sheet
+SHEETS_SYNC_DIR = os.path.join(CACHE_DIR, 'sheets_sync')
 
 # Paths for user dictionaries and favorites storage
 USER_DATA_DIR = os.path.join(DATA_DIR, 'user_data')
@@ -38,6 +75,59 @@ THEME = "default"
 # Query Configuration
 DEFAULT_QUERY_LIMIT = 100
 MAX_QUERY_LIMIT = 1000
+MIN_PAGE_SIZE = 50  # smallest page iter_pages shrinks to when the indexer times out
+PAGE_GROW_AFTER = 3  # successful pages before a shrunken page size doubles again
+
+# Candle Configuration
+CANDLE_CACHE_DIR = os.path.join(CACHE_DIR, 'candles')
+CANDLE_CLOSE_MARGIN = 5 * 60  # seconds a bar stays open past its end, for swaps indexed late
+CANDLE_RESOLUTIONS: Dict[str, int] = {
+    "1m": 60,
+    "5m": 5 * 60,
+    "15m": 15 * 60,
+    "1h": 60 * 60,
+    "4h": 4 * 60 * 60,
+    "1d": 24 * 60 * 60,
+    "1w": 7 * 24 * 60 * 60
+}
+
+# Plugin Configuration
+PLUGIN_HOOK_TIMEOUT = 5  # seconds execute_hook waits for a hook's handlers
+PLUGIN_WORKERS = 4  # threads running plugin hooks, and separately pipeline stage batches
+PIPELINE_BATCH_ROWS = 50000  # rows per batch when a frame is run through a pipeline stage
+
+# Live Tail Configuration
+LIVE_TAIL_INTERVAL = 15  # seconds between live tail polls
+LIVE_TAIL_BUFFER = 10000  # newest swaps kept by a live tail
+LIVE_TAIL_WINDOW = 24 * 60 * 60  # seconds covered by live tail aggregates; also the initial backfill
+
+# Alert Configuration
+ALERT_BUCKET_SECONDS = 5 * 60  # swaps are compared per bucket of this length
+ALERT_HISTORY_BUCKETS = 12  # buckets (and TVL readings) making up a pool's baseline
+ALERT_MIN_HISTORY = 3  # buckets needed before a pool can alert
+ALERT_VOLUME_SPIKE_FACTOR = 3.0
+ALERT_VOLUME_MIN_USD = 10000
+ALERT_TRADER_SURGE_FACTOR = 3.0
+ALERT_TRADER_MIN_COUNT = 5
+ALERT_TVL_DROP = 0.2  # fraction below the recent peak
+ALERT_DEDUPE_WINDOW = 60 * 60  # seconds the same alert for the same pool stays quiet
+ALERT_DIGEST_INTERVAL = 5 * 60  # seconds alerts are collected before a digest email is sent
+ALERT_EMAIL_RECIPIENT = os.environ.get('FORGE_ALERT_EMAIL')  # no alert emails when unset
+
+# Anomaly Configuration
+ANOMALY_WINDOW = 48  # hourly points in the rolling mean/variance of a pool metric
+ANOMALY_EWMA_ALPHA = 0.1  # weight of the newest point in the exponentially weighted mean/variance
+ANOMALY_Z_THRESHOLD = 4.0  # standard deviations from normal that make a point an anomaly
+ANOMALY_MIN_POINTS = 12  # points a series needs before it is scored
+
+# Email Configuration
+SMTP_SERVER = os.environ.get('FORGE_SMTP_SERVER')
+SMTP_PORT = int(os.environ.get('FORGE_SMTP_PORT', 587))
+SMTP_SENDER = os.environ.get('FORGE_SMTP_SENDER')
+SMTP_PASSWORD = os.environ.get('FORGE_SMTP_PASSWORD')  # unset skips the login, e.g. for a local relay
+SMTP_USE_TLS = os.environ.get('FORGE_SMTP_TLS', '1') != '0'
+SMTP_TIMEOUT = 30  # seconds
+SMTP_IDLE_TIMEOUT = 60  # seconds an unused SMTP connection is kept open
 
 # Schema Definition
 SCHEMA: Dict[str, Dict[str, Any]] = {
@@ -90,7 +180,8 @@ SCHEMA: Dict[str, Dict[str, Any]] = {
             "token1": "Address of the second token in the pair",
             "amount0": "Amount of token0 swapped",
             "amount1": "Amount of token1 swapped",
-            "amountUSD": "USD value of the swap"
+            "amountUSD": "USD value of the swap",
+            "tick": "Pool tick after the swap"
         }
     }
 }
@@ -109,6 +200,9 @@ ERROR_MESSAGES = {
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(CACHE_DIR, exist_ok=True)
 os.makedirs(LOG_DIR, exist_ok=True)
+os.makedirs(CANDLE_CACHE_DIR, exist_ok=True)
+os.makedirs(SHEETS_UPLOAD_DIR, exist_ok=True)
+os.makedirs(SHEETS_SYNC_DIR, exist_ok=True)
 os.makedirs(USER_DATA_DIR, exist_ok=True)
 os.makedirs(USER_DICTIONARIES_DIR, exist_ok=True)
 
@@ -1,9 +1,14 @@
 import csv
+import gzip
+import io
 import json
+import re
 import pandas as pd
+from openpyxl import Workbook
+from config import EXPORT_BUFFER_BYTES, EXPORT_CHUNK_ROWS, EXCEL_MAX_ROWS
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from sheets_uploader import SheetsUploader, SheetsUploadError, build_sheets_service, to_sheet_rows
 
 class DataExporter:
     def __init__(self, auth_manager):
@@ -20,16 +25,143 @@ class DataExporter:
                         writer.writerow(item.values())
                 writer.writerow([])
 
+    @staticmethod
+    def export_csv_stream(batches, filename, compress=None, buffer_bytes=EXPORT_BUFFER_BYTES):
+        """
+        Write row batches to a CSV file without holding the whole result in memory.
+
+        :param batches: Iterable of row lists or DataFrames, e.g. SubgraphConnector.iter_pages(...)
+        :param filename: Output path
+        :param compress: gzip the output; defaults to True when filename ends with .gz
+        :param buffer_bytes: Formatted CSV is flushed to disk once this much is buffered
+        :return: Number of rows written
+        """
+        if compress is None:
+            compress = filename.endswith('.gz')
+        if compress:
+            # Level 6 keeps compression close to disk speed; the default of 9 is several times slower
+            csvfile = gzip.open(filename, 'wt', newline='', compresslevel=6)
+        else:
+            csvfile = open(filename, 'w', newline='')
+        with csvfile:
+            return DataExporter.write_csv_batches(csvfile, batches, buffer_bytes=buffer_bytes)
+
+    @staticmethod
+    def write_csv_batches(handle, batches, header=True, columns=None, buffer_bytes=EXPORT_BUFFER_BYTES):
+        """
+        Format each batch with vectorized pandas CSV writing and append it to an open file.
+
+        The columns of the first batch fix the layout; later batches are aligned to it.
+        Rows end in \r\n like those of csv.writer, so both can share a file.
+
+        :return: Number of rows written
+        """
+        buffer = io.StringIO()
+        rows = 0
+        for batch in batches:
+            df = DataExporter.format_batch(batch)
+            if df.empty:
+                continue
+            if columns is None:
+                columns = list(df.columns)
+            df = df.reindex(columns=columns)
+            df.to_csv(buffer, header=header, index=False, lineterminator='\r\n')
+            header = False
+            rows += len(df)
+            if buffer.tell() >= buffer_bytes:
+                handle.write(buffer.getvalue())
+                buffer.seek(0)
+                buffer.truncate()
+        handle.write(buffer.getvalue())
+        return rows
+
+    @staticmethod
+    def format_batch(batch):
+        """
+        Turn a row batch into a flat frame ready for export.
+
+        Nested entity references such as pool { id } are reduced to their id, and a
+        human_readable_time column is added next to any unix 'timestamp' column. A
+        DataFrame passed in is left unchanged.
+        """
+        df = batch.copy(deep=False) if isinstance(batch, pd.DataFrame) else pd.DataFrame(batch)
+        if df.empty:
+            return df
+        for column in df.columns:
+            if df[column].dtype == object and isinstance(df[column].iloc[0], dict):
+                df[column] = df[column].str.get('id')
+        if 'timestamp' in df.columns and 'human_readable_time' not in df.columns:
+            timestamps = pd.to_numeric(df['timestamp'], errors='coerce')
+            df['human_readable_time'] = pd.to_datetime(timestamps, unit='s').dt.strftime('%Y-%m-%d %H:%M:%S')
+        return df
+
+    @staticmethod
+    def iter_chunks(rows, chunk_size=EXPORT_CHUNK_ROWS):
+        for start in range(0, len(rows), chunk_size):
+            yield rows[start:start + chunk_size]
+
     def export_to_json(self, data, filename):
         with open(filename, 'w') as jsonfile:
             json.dump(data, jsonfile, indent=2)
 
     def export_to_excel(self, data, filename):
-        with pd.ExcelWriter(filename) as writer:
-            for key, value in data.items():
-                if isinstance(value, list) and value:
-                    df = pd.DataFrame(value)
-                    df.to_excel(writer, sheet_name=key, index=False)
+        sheets = {key: self.iter_chunks(value) for key, value in data.items() if isinstance(value, list) and value}
+        self.export_excel_stream(sheets, filename)
+
+    @staticmethod
+    def export_excel_stream(sheets, filename, max_rows=EXCEL_MAX_ROWS):
+        """
+        Write sheets of row batches to an .xlsx file with a write-only workbook.
+
+        Rows are streamed to disk as they are appended, so memory stays flat. A sheet
+        that would pass Excel's row limit continues on "<name> (2)", "<name> (3)", ...
+
+        :param sheets: Dict of sheet name to an iterable of row lists or DataFrames
+        :param filename: Output path
+        :param max_rows: Rows per worksheet including the header
+        :return: Dict of sheet name to number of data rows written
+        """
+        workbook = Workbook(write_only=True)
+        written = {}
+        for name, batches in sheets.items():
+            written[name] = DataExporter.write_excel_sheet(workbook, name, batches, max_rows)
+        if not workbook.worksheets:
+            workbook.create_sheet('Sheet')
+        workbook.save(filename)
+        return written
+
+    @staticmethod
+    def write_excel_sheet(workbook, name, batches, max_rows=EXCEL_MAX_ROWS):
+        worksheet = None
+        columns = None
+        part = 0
+        sheet_rows = 0
+        rows = 0
+        for batch in batches:
+            df = DataExporter.format_batch(batch)
+            if df.empty:
+                continue
+            if columns is None:
+                columns = list(df.columns)
+            df = df.reindex(columns=columns)
+            df = df.astype(object).where(df.notna(), None)
+            for row in df.itertuples(index=False, name=None):
+                if worksheet is None or sheet_rows >= max_rows:
+                    part += 1
+                    worksheet = workbook.create_sheet(DataExporter.excel_sheet_title(name, part))
+                    worksheet.append(columns)
+                    sheet_rows = 1
+                worksheet.append(row)
+                sheet_rows += 1
+                rows += 1
+        return rows
+
+    @staticmethod
+    def excel_sheet_title(name, part=1):
+        # Excel sheet titles are limited to 31 characters and may not contain []:*?/\
+        name = re.sub(r'[\[\]:*?/\\]', '_', str(name)) or 'Sheet'
+        suffix = f" ({part})" if part > 1 else ''
+        return name[:31 - len(suffix)] + suffix
 
     def export_to_google_sheets(self, data, spreadsheet_name):
         creds = self.auth_manager.get_credentials()
@@ -37,29 +169,21 @@ class DataExporter:
             raise ValueError("Not authenticated for Google Sheets")
 
         try:
-            service = build('sheets', 'v4', credentials=creds)
+            service = build_sheets_service(creds)
+            grids = {key: to_sheet_rows(self.format_batch(value))
+                     for key, value in data.items() if isinstance(value, list) and value}
+            # Create every tab up front so all of them are filled by the same batched uploads
             spreadsheet = {
                 'properties': {
                     'title': spreadsheet_name
-                }
+                },
+                'sheets': [{'properties': {'title': key}} for key in grids]
             }
             spreadsheet = service.spreadsheets().create(body=spreadsheet, fields='spreadsheetId').execute()
             spreadsheet_id = spreadsheet.get('spreadsheetId')
 
-            for key, value in data.items():
-                if isinstance(value, list) and value:
-                    df = pd.DataFrame(value)
-                    values = [df.columns.tolist()] + df.values.tolist()
-                    body = {
-                        'values': values
-                    }
-                    service.spreadsheets().values().update(
-                        spreadsheetId=spreadsheet_id,
-                        range=f'{key}!A1',
-                        valueInputOption='RAW',
-                        body=body
-                    ).execute()
+            SheetsUploader(service, spreadsheet_id, value_input_option='RAW').upload(grids, clear=False)
 
             return f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}"
-        except HttpError as error:
+        except (HttpError, SheetsUploadError) as error:
             raise Exception(f"An error occurred: {error}")
\ No newline at end of file
@@ -1,36 +1,142 @@
+import warnings
+import numpy as np
 import pandas as pd
 
+class ProcessedResult:
+    """
+    A processed result list. Summary and stats are computed on first access and
+    memoized until the underlying frame is replaced or invalidate() is called.
+    """
+
+    def __init__(self, df):
+        self._dataframe = df
+        self._reductions = None
+
+    @property
+    def dataframe(self):
+        return self._dataframe
+
+    @dataframe.setter
+    def dataframe(self, df):
+        self._dataframe = df
+        self.invalidate()
+
+    def invalidate(self):
+        self._reductions = None
+
+    @property
+    def summary(self):
+        reductions = self._get_reductions()
+        if reductions is None:
+            return self._dataframe.describe()
+        return pd.DataFrame({
+            'count': reductions['count'],
+            'mean': reductions['mean'],
+            'std': reductions['std'],
+            'min': reductions['min'],
+            '25%': reductions['25%'],
+            '50%': reductions['median'],
+            '75%': reductions['75%'],
+            'max': reductions['max']
+        }).T
+
+    @property
+    def stats(self):
+        reductions = self._get_reductions()
+        if reductions is None:
+            return {name: {} for name in ('mean', 'median', 'std', 'min', 'max')}
+        return {name: reductions[name].to_dict() for name in ('mean', 'median', 'std', 'min', 'max')}
+
+    def _get_reductions(self):
+        if self._reductions is None:
+            self._reductions = DataProcessor.compute_reductions(self._dataframe)
+        return self._reductions if self._reductions else None
+
+    # Dict-style access keeps callers of the old {'dataframe', 'summary', 'stats'} layout working
+    def __getitem__(self, key):
+        if key in ('dataframe', 'summary', 'stats'):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in ('dataframe', 'summary', 'stats')
+
+    def keys(self):
+        return ['dataframe', 'summary', 'stats']
+
 class DataProcessor:
     @staticmethod
-    def process_data(data):
+    def process_data(data, pipeline=None):
+        """
+        :param pipeline: Optional PluginManager; its post_process stage runs on each frame
+        """
         processed_data = {}
         for key, value in data.items():
             if isinstance(value, list) and value:
                 df = pd.DataFrame(value)
-                processed_data[key] = {
-                    'dataframe': df,
-                    'summary': DataProcessor.generate_summary(df),
-                    'stats': DataProcessor.calculate_stats(df)
-                }
+                if pipeline is not None:
+                    df = pipeline.transform_frame('post_process', df, {'collection': key})
+                processed_data[key] = ProcessedResult(df)
             else:
                 processed_data[key] = value
         return processed_data
 
     @staticmethod
     def generate_summary(df):
-        return df.describe()
+        return ProcessedResult(df).summary
 
     @staticmethod
     def calculate_stats(df):
+        return ProcessedResult(df).stats
+
+    @staticmethod
+    def compute_reductions(df):
+        """
+        Compute every summary statistic for the numeric columns of df.
+
+        The numeric columns are copied once into a single float block; the order
+        statistics come from one percentile call and the moments from one pass over
+        the same block, instead of a separate pandas reduction per statistic.
+
+        :param df: The frame to summarize
+        :return: Dict of statistic name to Series indexed by column, or {} if df has no numeric columns
+        """
         numeric_columns = df.select_dtypes(include=['int64', 'float64']).columns
-        stats = {
-            'mean': df[numeric_columns].mean().to_dict(),
-            'median': df[numeric_columns].median().to_dict(),
-            'std': df[numeric_columns].std().to_dict(),
-            'min': df[numeric_columns].min().to_dict(),
-            'max': df[numeric_columns].max().to_dict()
+        if len(numeric_columns) == 0:
+            return {}
+
+        values = df[numeric_columns].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            total = np.where(valid, values, 0.0).sum(axis=0)
+            mean = total / count
+            deviations = np.where(valid, values - mean, 0.0)
+            std = np.sqrt((deviations * deviations).sum(axis=0) / (count - 1))
+            std = np.where(count > 1, std, np.nan)
+
+        if len(values):
+            with warnings.catch_warnings():
+                # All-NaN columns yield NaN, as describe() does
+                warnings.simplefilter('ignore', RuntimeWarning)
+                minimum, q25, median, q75, maximum = np.nanpercentile(values, [0, 25, 50, 75, 100], axis=0)
+        else:
+            minimum = q25 = median = q75 = maximum = np.full(len(numeric_columns), np.nan)
+
+        def series(array):
+            return pd.Series(array, index=numeric_columns)
+
+        return {
+            'count': series(count.astype(float)),
+            'mean': series(mean),
+            'std': series(std),
+            'min': series(minimum),
+            '25%': series(q25),
+            'median': series(median),
+            '75%': series(q75),
+            'max': series(maximum)
         }
-        return stats
 
     @staticmethod
     def filter_data(df, filters):
@@ -39,14 +145,67 @@ class DataProcessor:
                 df = df[df[column] == value]
         return df
 
+    @staticmethod
+    def apply_filter(df, column, op, value):
+        """
+        Keep rows where `column op value` holds. `op` uses the operator names of
+        lazy_frame.FILTER_SUFFIXES, or is a callable returning a boolean mask.
+
+        :raises KeyError: df has no such column, so the filter cannot be evaluated
+        """
+        if column not in df.columns:
+            raise KeyError(f"Cannot filter on missing column {column}")
+        series = df[column]
+        if callable(op):
+            return df[op(series)]
+
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            series = DataProcessor.numeric_view(series)
+        if op == 'eq':
+            mask = series == value
+        elif op == 'ne':
+            mask = series != value
+        elif op == 'gt':
+            mask = series > value
+        elif op == 'gte':
+            mask = series >= value
+        elif op == 'lt':
+            mask = series < value
+        elif op == 'lte':
+            mask = series <= value
+        elif op == 'in':
+            mask = series.isin(value)
+        elif op == 'not_in':
+            mask = ~series.isin(value)
+        elif op == 'contains':
+            mask = series.astype(str).str.contains(str(value), regex=False)
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        return df[mask]
+
+    @staticmethod
+    def numeric_view(series):
+        # Subgraph BigInt/BigDecimal values arrive as strings
+        if not pd.api.types.is_numeric_dtype(series):
+            return pd.to_numeric(series, errors='coerce')
+        return series
+
     @staticmethod
     def sort_data(df, sort_by, ascending=True):
         if sort_by in df.columns:
+            numeric = DataProcessor.numeric_view(df[sort_by])
+            if numeric.notna().sum() == df[sort_by].notna().sum():
+                return df.sort_values(by=sort_by, ascending=ascending, key=DataProcessor.numeric_view)
             return df.sort_values(by=sort_by, ascending=ascending)
         return df
 
+    @staticmethod
+    def lazy(connector, entity, where_conditions=None, endpoint=None, block=None, use_cache=True):
+        from lazy_frame import LazyFrame
+        return LazyFrame(connector, entity, where_conditions, endpoint, block, use_cache)
+
     @staticmethod
     def aggregate_data(df, group_by, agg_func):
         if group_by in df.columns:
             return df.groupby(group_by).agg(agg_func)
-        return df
\ No newline at end of file
+        return df
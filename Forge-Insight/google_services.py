@@ -0,0 +1,153 @@
+import datetime
+import json
+import os
+import threading
+from google.auth.exceptions import RefreshError, TransportError
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build, build_from_document
+from config import SCOPES, TOKEN_FILE, SHEETS_API_ENDPOINT, TOKEN_REFRESH_MARGIN
+
+class GoogleServicePool:
+    """
+    Process-wide Google credentials and Sheets clients.
+
+    Credentials are loaded from the token file once and shared by AuthManager and the
+    Sheets exporters. A background timer refreshes the access token shortly before it
+    expires, so exports never wait on a refresh. Sheets clients are built from the
+    discovery document bundled with googleapiclient, parsed once, and cached per thread
+    because the underlying httplib2 connections are not thread-safe.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, token_file=TOKEN_FILE, scopes=SCOPES, refresh_margin=TOKEN_REFRESH_MARGIN):
+        self.token_file = token_file
+        self.scopes = scopes
+        self.refresh_margin = refresh_margin
+        self.creds = None
+        self.lock = threading.RLock()
+        self.refresh_timer = None
+        self.discovery_document = None
+        self.local = threading.local()
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def get_credentials(self, client_secret_path=None):
+        """
+        Return valid credentials, refreshing or loading them as needed.
+
+        :param client_secret_path: If given and no usable token exists, run the browser
+                                   consent flow with this client secret
+        :return: Credentials, or None when not authenticated
+        """
+        with self.lock:
+            if self.creds is None and os.path.exists(self.token_file):
+                self.set_credentials(Credentials.from_authorized_user_file(self.token_file, self.scopes), save=False)
+            if self.creds and not self.creds.valid and self.creds.refresh_token:
+                try:
+                    self.refresh()
+                except RefreshError:
+                    self.creds = None
+                except TransportError:
+                    # Offline: keep the token; the next request retries the refresh itself
+                    self.schedule_refresh(delay=60)
+            if (self.creds is None or not self.creds.valid) and client_secret_path:
+                flow = InstalledAppFlow.from_client_secrets_file(client_secret_path, self.scopes)
+                self.set_credentials(flow.run_local_server(port=0))
+            return self.creds
+
+    def set_credentials(self, creds, save=True):
+        with self.lock:
+            self.creds = creds
+            if save:
+                self.save_token()
+            self.schedule_refresh()
+
+    def clear_credentials(self):
+        with self.lock:
+            self.cancel_refresh()
+            self.creds = None
+            self.local = threading.local()
+            try:
+                os.remove(self.token_file)
+            except FileNotFoundError:
+                pass
+
+    def refresh(self):
+        with self.lock:
+            self.creds.refresh(Request())
+            self.save_token()
+            self.schedule_refresh()
+
+    def save_token(self):
+        with open(self.token_file, 'w') as token:
+            token.write(self.creds.to_json())
+
+    def schedule_refresh(self, delay=None):
+        self.cancel_refresh()
+        if self.creds is None or not self.creds.refresh_token:
+            return
+        if delay is None:
+            if self.creds.expiry is None:
+                return
+            # google-auth keeps expiry as a naive UTC datetime
+            remaining = (self.creds.expiry - datetime.datetime.utcnow()).total_seconds()
+            delay = max(0, remaining - self.refresh_margin)
+        self.refresh_timer = threading.Timer(delay, self.background_refresh)
+        self.refresh_timer.daemon = True
+        self.refresh_timer.start()
+
+    def cancel_refresh(self):
+        if self.refresh_timer is not None:
+            self.refresh_timer.cancel()
+            self.refresh_timer = None
+
+    def background_refresh(self):
+        try:
+            self.refresh()
+        except TransportError:
+            # Offline for now; try again in a minute
+            self.schedule_refresh(delay=60)
+        except RefreshError as e:
+            print(f"Google token refresh failed: {e}")
+
+    def get_discovery_document(self):
+        if self.discovery_document is None:
+            document = discovery_cache.get_static_doc('sheets', 'v4')
+            self.discovery_document = json.loads(document) if document else None
+        return self.discovery_document
+
+    def sheets_service(self, creds=None):
+        """
+        Return this thread's Sheets client for `creds` (the shared credentials by default).
+
+        Clients are reused until the credentials object changes; token refreshes happen in
+        place on the same object, so they do not invalidate a client.
+        """
+        creds = creds or self.get_credentials()
+        services = getattr(self.local, 'services', None)
+        if services is None:
+            services = self.local.services = {}
+        key = id(creds)
+        cached = services.get(key)
+        if cached is not None and cached[0] is creds:
+            return cached[1]
+
+        client_options = {'api_endpoint': SHEETS_API_ENDPOINT} if SHEETS_API_ENDPOINT else None
+        with self.lock:
+            document = self.get_discovery_document()
+        if document is not None:
+            service = build_from_document(document, credentials=creds, client_options=client_options)
+        else:
+            service = build('sheets', 'v4', credentials=creds, client_options=client_options)
+        services[key] = (creds, service)
+        return service
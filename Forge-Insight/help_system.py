@@ -86,6 +86,7 @@ class HelpSystem(tk.Toplevel):
         - Box plot
         - Violin plot
         - Heatmap
+        - Tick Heatmap (swaps of one pool with the tick field)
 
         Experiment with different combinations to find the best way to represent your data!
         """
\ No newline at end of file
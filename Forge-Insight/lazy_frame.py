@@ -0,0 +1,191 @@
+from typing import Any, Callable, Dict, List, Optional, Union
+import pandas as pd
+from config import SCHEMA, MAX_QUERY_LIMIT
+from data_processor import DataProcessor
+
+# GraphQL where-suffix for each filter operator the subgraph understands
+FILTER_SUFFIXES: Dict[str, str] = {
+    'eq': '',
+    'ne': '_not',
+    'gt': '_gt',
+    'gte': '_gte',
+    'lt': '_lt',
+    'lte': '_lte',
+    'in': '_in',
+    'not_in': '_not_in',
+    'contains': '_contains'
+}
+
+class LazyFrame:
+    """
+    A deferred query over one subgraph entity.
+
+    Filters, column selection, sort and top-N are only recorded; collect() splits them into
+    the part the subgraph can evaluate (where, orderBy, first and the field list) and the
+    part that has to run locally on the fetched frame. With use_cache=False limited reads skip
+    the result cache, so a rerun after the subgraph has moved sees the new block.
+    """
+
+    def __init__(self, connector, entity: str, where_conditions: Optional[List[str]] = None,
+                 endpoint: Optional[str] = None, block: Optional[int] = None, use_cache: bool = True):
+        self.connector = connector
+        self.entity = entity
+        self.endpoint = endpoint
+        self.block = block
+        self.use_cache = use_cache
+        self.where_conditions = list(where_conditions or [])
+        self.filters = []
+        self.columns = None
+        self.sort_by = None
+        self.ascending = True
+        self.limit = None
+
+    def _copy(self) -> 'LazyFrame':
+        frame = LazyFrame(self.connector, self.entity, self.where_conditions, self.endpoint, self.block,
+                          self.use_cache)
+        frame.filters = list(self.filters)
+        frame.columns = None if self.columns is None else list(self.columns)
+        frame.sort_by = self.sort_by
+        frame.ascending = self.ascending
+        frame.limit = self.limit
+        return frame
+
+    def filter(self, column: str, value: Any, op: Union[str, Callable] = 'eq') -> 'LazyFrame':
+        """
+        Keep rows where `column op value` holds. `op` is one of FILTER_SUFFIXES or a
+        callable taking the column Series and returning a boolean mask.
+        """
+        if self.limit is not None:
+            raise ValueError("Filters must be applied before head()")
+        if not callable(op) and op not in FILTER_SUFFIXES:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        frame = self._copy()
+        frame.filters.append((column, op, value))
+        return frame
+
+    def select(self, *columns: str) -> 'LazyFrame':
+        frame = self._copy()
+        frame.columns = list(columns)
+        return frame
+
+    def sort(self, column: str, ascending: bool = True) -> 'LazyFrame':
+        if self.limit is not None:
+            raise ValueError("Sort must be applied before head()")
+        frame = self._copy()
+        frame.sort_by = column
+        frame.ascending = ascending
+        return frame
+
+    def head(self, n: int) -> 'LazyFrame':
+        frame = self._copy()
+        frame.limit = n if frame.limit is None else min(frame.limit, n)
+        return frame
+
+    def is_pushable_column(self, column: str) -> bool:
+        if self.entity in SCHEMA:
+            return column in SCHEMA[self.entity]['fields']
+        return True
+
+    def plan(self) -> Dict[str, Any]:
+        """
+        Split the recorded operations into remote and local parts.
+
+        :return: Dict with the pushed down 'where', 'fields', 'order_by' and 'first', and the
+                 'local_filters', 'local_sort' and 'local_limit' left for collect()
+        """
+        where = list(self.where_conditions)
+        pushed = {}
+        local_filters = []
+        for column, op, value in self.filters:
+            key = None if callable(op) else f"{column}{FILTER_SUFFIXES[op]}"
+            # A where key can appear only once; repeats of a column and operator run locally
+            if key is not None and key not in pushed and self.is_pushable_column(column):
+                pushed[key] = value
+            else:
+                local_filters.append((column, op, value))
+        if pushed:
+            filter_string = self.connector.query_builder._build_filter_string(pushed)
+            if filter_string:
+                where.append(filter_string)
+
+        order_by = self.sort_by if self.sort_by and self.is_pushable_column(self.sort_by) else None
+        local_sort = self.sort_by if self.sort_by and not order_by else None
+
+        # A limit is only exact remotely when nothing is left to filter or sort locally
+        first = None
+        local_limit = self.limit
+        if self.limit is not None and not local_filters and not local_sort:
+            if order_by is None or self.limit <= MAX_QUERY_LIMIT:
+                first = self.limit
+                local_limit = None
+
+        if self.columns is not None:
+            fields = list(self.columns)
+        elif self.entity in SCHEMA:
+            fields = list(SCHEMA[self.entity]['fields'].keys())
+        else:
+            raise ValueError(f"Select the columns to fetch for {self.entity}")
+        for column in [column for column, _, _ in local_filters] + ([local_sort] if local_sort else []):
+            if column in fields:
+                continue
+            if not self.is_pushable_column(column):
+                raise ValueError(f"{self.entity} has no field {column} to filter or sort on")
+            fields.append(column)
+
+        return {
+            'where': where,
+            'fields': fields,
+            'order_by': order_by,
+            'order_direction': 'asc' if self.ascending else 'desc',
+            'first': first,
+            'local_filters': local_filters,
+            'local_sort': local_sort,
+            'local_limit': local_limit
+        }
+
+    def to_query(self) -> str:
+        """The GraphQL for the first request collect() would send."""
+        plan = self.plan()
+        collection = self.connector.get_collection_name(self.entity)
+        first = plan['first'] or MAX_QUERY_LIMIT
+        if plan['order_by']:
+            return self.connector.query_builder.build_page_query(
+                collection, plan['fields'], plan['where'], first,
+                order_by=plan['order_by'], order_direction=plan['order_direction'])
+        return self.connector.query_builder.build_page_query(collection, plan['fields'], plan['where'], first)
+
+    def collect(self) -> pd.DataFrame:
+        plan = self.plan()
+        collection = self.connector.get_collection_name(self.entity)
+
+        if plan['order_by'] and plan['first'] is not None:
+            # Sorted top-N fits in one request
+            rows = self.connector.query_subgraph(self.to_query(), self.endpoint, use_cache=self.use_cache,
+                                                 block=self.block).get(collection, [])
+        elif plan['first'] is None and self.block is None:
+            # Full reads are kept and only refetched when the subgraph has indexed new blocks
+            rows = self.connector.fetch_fresh(self.entity, plan['fields'], plan['where'], self.endpoint)
+        else:
+            rows = []
+            for page in self.connector.iter_pages(self.entity, plan['fields'], plan['where'],
+                                                  max_rows=plan['first'], endpoint=self.endpoint,
+                                                  block=self.block, use_cache=self.use_cache):
+                rows.extend(page)
+        df = pd.DataFrame(rows)
+
+        if not df.empty:
+            for column, op, value in plan['local_filters']:
+                df = DataProcessor.apply_filter(df, column, op, value)
+        if plan['order_by'] and plan['first'] is None:
+            df = DataProcessor.sort_data(df, plan['order_by'], self.ascending)
+        if plan['local_sort']:
+            df = DataProcessor.sort_data(df, plan['local_sort'], self.ascending)
+        if plan['local_limit'] is not None:
+            df = df.head(plan['local_limit'])
+        if self.columns is not None:
+            df = df[[column for column in self.columns if column in df.columns]]
+        return df.reset_index(drop=True)
+
+    def to_results(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Collect in the {collection: rows} layout returned by SubgraphConnector.query_subgraph."""
+        return {self.connector.get_collection_name(self.entity): self.collect().to_dict('records')}
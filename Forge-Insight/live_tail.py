@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Dict, List, Optional
+import pandas as pd
+from candle_builder import CandleBuilder, SWAP_FIELDS
+from config import LIVE_TAIL_INTERVAL, LIVE_TAIL_BUFFER, LIVE_TAIL_WINDOW, MAX_QUERY_LIMIT
+
+LIVE_SWAP_FIELDS = SWAP_FIELDS + ['origin']
+
+class LiveTail:
+    """
+    Follows the swaps of one pool as they are indexed.
+
+    A background thread asks every `interval` seconds for swaps at or after the newest
+    timestamp seen so far and keeps the newest `buffer_size` of them in a ring buffer.
+    Unique traders, swap count and USD volume over the last `window` seconds, and the
+    candles, are updated from the new rows only: each swap is added once when it
+    arrives and subtracted once when it leaves the window or the buffer. The backfill
+    starts at a candle boundary, and a candle is finished once a swap of a later candle
+    has been indexed, so bars do not close before their swaps are in.
+
+    `on_update(new_rows, bars, stats)` is called from the polling thread after every poll
+    that found swaps or aged some out of the window; UI callers have to hand it over to
+    their own thread.
+    """
+
+    def __init__(self, connector, pool_address: str, resolution: str = '1m', interval: float = LIVE_TAIL_INTERVAL,
+                 buffer_size: int = LIVE_TAIL_BUFFER, window: int = LIVE_TAIL_WINDOW,
+                 endpoint: Optional[str] = None,
+                 on_update: Optional[Callable[[List[Dict[str, Any]], pd.DataFrame, Dict[str, Any]], None]] = None,
+                 on_error: Optional[Callable[[Exception], None]] = None):
+        self.connector = connector
+        self.pool_address = pool_address.lower()
+        self.interval = interval
+        self.buffer_size = buffer_size
+        self.window = window
+        self.endpoint = endpoint
+        self.on_update = on_update
+        self.on_error = on_error
+        self.candles = CandleBuilder(self.pool_address, resolution)
+
+        self.swaps = deque()
+        self.window_start = 0  # swaps[:window_start] are in the buffer but older than the window
+        self.traders = Counter()
+        self.volume_usd = 0.0
+        self.lock = threading.Lock()
+
+        self.last_timestamp = int(self.candles.bucket_start(int(time.time()) - window))
+        self.ids_at_last_timestamp = set()
+        # Start of the swaps seen so far, for the first candle update; None afterwards
+        self.candles_from = self.last_timestamp
+        self.running = False
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self, wait: bool = True):
+        """:param wait: Block until a poll in progress has finished"""
+        self.running = False
+        self.stop_event.set()
+        if wait and self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=self.interval + 1)
+
+    def _run(self):
+        while self.running:
+            try:
+                new_rows, bars, expired = self.poll()
+                if (new_rows or expired) and self.on_update:
+                    self.on_update(new_rows, bars, self.stats())
+            except Exception as e:
+                print(f"Live tail poll failed: {str(e)}")
+                if self.on_error:
+                    self.on_error(e)
+            self.stop_event.wait(self.interval)
+
+    def fetch_new(self) -> List[Dict[str, Any]]:
+        """Swaps newer than the last one seen, oldest first."""
+        collection = self.connector.get_collection_name('Swap')
+        new_rows = []
+        while True:
+            where_conditions = [f'pool: "{self.pool_address}"', f'timestamp_gte: {self.last_timestamp}']
+            query = self.connector.query_builder.build_page_query(
+                collection, LIVE_SWAP_FIELDS, where_conditions, MAX_QUERY_LIMIT,
+                order_by='timestamp', order_direction='asc')
+            rows = self.connector.query_subgraph(query, self.endpoint, use_cache=False).get(collection, [])
+            # timestamp_gte returns the swaps of the last seen second again; skip those already kept
+            fresh = [row for row in rows if not (int(row['timestamp']) == self.last_timestamp
+                                                 and row['id'] in self.ids_at_last_timestamp)]
+            for row in fresh:
+                timestamp = int(row['timestamp'])
+                if timestamp > self.last_timestamp:
+                    self.last_timestamp = timestamp
+                    self.ids_at_last_timestamp = set()
+                self.ids_at_last_timestamp.add(row['id'])
+            new_rows.extend(fresh)
+            if len(rows) < MAX_QUERY_LIMIT or not fresh:
+                return new_rows
+
+    def poll(self):
+        """
+        :return: (new swap rows, candle bars they touched, number of swaps that left the window)
+        """
+        new_rows = self.fetch_new()
+        bars = pd.DataFrame()
+        if new_rows:
+            # Swaps arrive in timestamp order, so every swap before the newest one has been seen
+            bars = self.candles.update(new_rows, now=self.last_timestamp, covered_from=self.candles_from)
+            self.candles_from = None
+        expired = self.add(new_rows)
+        return new_rows, bars, expired
+
+    def add(self, rows: List[Dict[str, Any]], now: Optional[int] = None) -> int:
+        """Push rows into the buffer and aggregates; returns how many swaps left the window."""
+        with self.lock:
+            for row in rows:
+                if len(self.swaps) == self.buffer_size:
+                    dropped = self.swaps.popleft()
+                    if self.window_start:
+                        self.window_start -= 1
+                    else:
+                        self.leave_window(dropped)
+                self.swaps.append(row)
+                self.traders[row.get('origin')] += 1
+                self.volume_usd += abs(float(row.get('amountUSD') or 0))
+            return self.expire(now or int(time.time()))
+
+    def expire(self, now: int) -> int:
+        cutoff = now - self.window
+        start = self.window_start
+        while self.window_start < len(self.swaps) and int(self.swaps[self.window_start]['timestamp']) < cutoff:
+            self.leave_window(self.swaps[self.window_start])
+            self.window_start += 1
+        return self.window_start - start
+
+    def leave_window(self, row: Dict[str, Any]):
+        trader = row.get('origin')
+        self.traders[trader] -= 1
+        if self.traders[trader] <= 0:
+            del self.traders[trader]
+        self.volume_usd -= abs(float(row.get('amountUSD') or 0))
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'window_seconds': self.window,
+                'swaps_in_window': len(self.swaps) - self.window_start,
+                'unique_traders': len(self.traders),
+                'volumeUSD': max(self.volume_usd, 0.0),
+                'buffered_swaps': len(self.swaps),
+                'last_timestamp': self.last_timestamp,
+            }
+
+    def rows(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return list(self.swaps)
+
+    def results(self) -> Dict[str, Any]:
+        """The buffer, aggregates and candles in the {key: value} layout of query results."""
+        results = self.stats()
+        results['swaps'] = self.rows()
+        results['candles'] = self.candles.candles.to_dict('records')
+        results['resolution'] = self.candles.resolution
+        return results
@@ -0,0 +1,209 @@
+import argparse
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+import pandas as pd
+from config import LOCAL_DB_PATH
+
+# Columns indexed whenever a table has them; 'id' (with '_source' once present) is the primary key
+INDEXED_COLUMNS = ['pool', 'origin', 'timestamp']
+
+# Subgraph a federated row came from (see SubgraphConnector.federate)
+SOURCE_COLUMN = '_source'
+
+def _quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+class LocalStore:
+    """
+    On-disk SQL store for fetched subgraph entities.
+
+    Each collection ('swaps', 'pools', 'tokens', 'poolDayDatas', ...) is a table keyed on
+    the entity id, so loading the same rows again updates them instead of duplicating
+    them. Federated results carry a _source column; tables that receive one are keyed
+    on (_source, id) so the same id from different subgraphs is kept once per subgraph,
+    and rows loaded without a source get ''. Nested references such as pool { id } are stored as the referenced id, which
+    makes joins like swaps x tokens plain SQL. Columns whose values are all numeric get
+    NUMERIC affinity, so BigDecimal strings from the subgraph compare and aggregate as
+    numbers.
+    """
+
+    def __init__(self, path: str = LOCAL_DB_PATH):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def tables(self) -> List[str]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name").fetchall()
+        return [row[0] for row in rows]
+
+    def columns(self, table: str) -> List[str]:
+        with self.lock:
+            return [row[1] for row in self.conn.execute(f"PRAGMA table_info({_quote(table)})")]
+
+    def key_columns(self, table: str) -> List[str]:
+        with self.lock:
+            info = self.conn.execute(f"PRAGMA table_info({_quote(table)})").fetchall()
+        return [row[1] for row in sorted((row for row in info if row[5]), key=lambda row: row[5])]
+
+    def add_source_key(self, table: str):
+        """Rebuild a table keyed on id alone with a (_source, id) key; its rows get source ''."""
+        with self.lock:
+            info = self.conn.execute(f"PRAGMA table_info({_quote(table)})").fetchall()
+            old_table = f"{table}__rekey"
+            definitions = [f"{_quote(row[1])} {row[2]}" for row in info if row[1] != SOURCE_COLUMN]
+            columns = ', '.join(_quote(row[1]) for row in info if row[1] != SOURCE_COLUMN)
+            self.conn.execute(f"ALTER TABLE {_quote(table)} RENAME TO {_quote(old_table)}")
+            self.conn.execute(f"CREATE TABLE {_quote(table)} ({', '.join(definitions)}, "
+                              f"{_quote(SOURCE_COLUMN)} TEXT NOT NULL DEFAULT '', "
+                              f"PRIMARY KEY ({_quote(SOURCE_COLUMN)}, {_quote('id')}))")
+            self.conn.execute(f"INSERT INTO {_quote(table)} ({columns}) SELECT {columns} FROM {_quote(old_table)}")
+            # The old indexes went with the renamed table; load() creates them again
+            self.conn.execute(f"DROP TABLE {_quote(old_table)}")
+
+    @staticmethod
+    def flatten(rows: Union[List[Dict[str, Any]], pd.DataFrame]) -> pd.DataFrame:
+        df = rows.copy() if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows)
+        for column in df.columns:
+            present = df[column].dropna()
+            if len(present) and isinstance(present.iloc[0], dict):
+                df[column] = df[column].str.get('id')
+        return df
+
+    @staticmethod
+    def column_type(column: str, values: pd.Series, sourced: bool = False) -> str:
+        if column == 'id':
+            return 'TEXT' if sourced else 'TEXT PRIMARY KEY'
+        if column == SOURCE_COLUMN:
+            return "TEXT NOT NULL DEFAULT ''"
+        present = values.dropna()
+        if len(present) and pd.to_numeric(present, errors='coerce').notna().all():
+            return 'NUMERIC'
+        return 'TEXT'
+
+    def load(self, table: str, rows: Union[List[Dict[str, Any]], pd.DataFrame]) -> int:
+        """
+        Insert or update entity rows in `table`, creating the table, new columns and
+        indexes as needed.
+
+        :return: Number of rows written
+        """
+        if not re.match(r'^[A-Za-z_][A-Za-z0-9_]*$', table):
+            raise ValueError(f"Invalid table name: {table}")
+        df = self.flatten(rows)
+        if df.empty or 'id' not in df.columns:
+            return 0
+
+        with self.lock, self.conn:
+            existing = self.columns(table)
+            sourced = SOURCE_COLUMN in df.columns or SOURCE_COLUMN in existing
+            if sourced:
+                df[SOURCE_COLUMN] = df[SOURCE_COLUMN].fillna('') if SOURCE_COLUMN in df.columns else ''
+            keys = [SOURCE_COLUMN, 'id'] if sourced else ['id']
+            df = df.drop_duplicates(keys, keep='last')
+
+            if not existing:
+                definitions = [f"{_quote(column)} {self.column_type(column, df[column], sourced)}" for column in df.columns]
+                if sourced:
+                    definitions.append(f"PRIMARY KEY ({_quote(SOURCE_COLUMN)}, {_quote('id')})")
+                self.conn.execute(f"CREATE TABLE {_quote(table)} ({', '.join(definitions)})")
+            else:
+                if sourced and self.key_columns(table) != keys:
+                    self.add_source_key(table)
+                    existing = self.columns(table)
+                for column in df.columns:
+                    if column not in existing:
+                        self.conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)} "
+                                          f"{self.column_type(column, df[column])}")
+            for column in INDEXED_COLUMNS:
+                if column in df.columns:
+                    self.conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote(f'idx_{table}_{column}')} "
+                                      f"ON {_quote(table)} ({_quote(column)})")
+
+            columns = ', '.join(_quote(column) for column in df.columns)
+            placeholders = ', '.join('?' for _ in df.columns)
+            # Upsert so columns missing from this batch keep their stored values
+            updates = ', '.join(f"{_quote(column)}=excluded.{_quote(column)}" for column in df.columns if column not in keys)
+            conflict = ', '.join(_quote(column) for column in keys)
+            statement = f"INSERT INTO {_quote(table)} ({columns}) VALUES ({placeholders}) ON CONFLICT({conflict}) DO "
+            statement += f"UPDATE SET {updates}" if updates else "NOTHING"
+            values = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+            self.conn.executemany(statement, values)
+        return len(df)
+
+    def load_results(self, results: Dict[str, Any]) -> Dict[str, int]:
+        """
+        Load every entity list of a result dict ({collection: rows}) into its own table.
+        Derived lists without an 'id' column, such as interval_data, are skipped.
+        """
+        loaded = {}
+        for key, value in results.items():
+            if isinstance(value, list) and value and isinstance(value[0], dict) and 'id' in value[0]:
+                loaded[key] = self.load(key, value)
+        return loaded
+
+    def query(self, sql: str, params=()) -> pd.DataFrame:
+        with self.lock:
+            return pd.read_sql_query(sql, self.conn, params=params)
+
+    def execute(self, sql: str) -> Optional[pd.DataFrame]:
+        """Run one statement from the console; returns a frame for statements that yield rows."""
+        with self.lock, self.conn:
+            cursor = self.conn.execute(sql)
+            if cursor.description is None:
+                return None
+            columns = [column[0] for column in cursor.description]
+            return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the Forge Insight local store with SQL.")
+    parser.add_argument('sql', nargs='?', help="Statement to run; omit for an interactive prompt")
+    parser.add_argument('--db', default=LOCAL_DB_PATH, help="Database file")
+    parser.add_argument('--tables', action='store_true', help="List the tables and their columns")
+    args = parser.parse_args(argv)
+
+    store = LocalStore(args.db)
+    if args.tables:
+        for table in store.tables():
+            print(f"{table}: {', '.join(store.columns(table))}")
+        return
+
+    def run(sql):
+        start = time.perf_counter()
+        try:
+            df = store.execute(sql)
+        except sqlite3.Error as e:
+            print(f"Error: {e}")
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        if df is None:
+            print(f"OK ({elapsed:.1f} ms)")
+        else:
+            print(df.to_string(index=False, max_rows=100))
+            print(f"{len(df)} rows ({elapsed:.1f} ms)")
+
+    if args.sql:
+        run(args.sql)
+        return
+    while True:
+        try:
+            sql = input("sql> ").strip()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if sql in ('.quit', '.exit'):
+            break
+        if sql:
+            run(sql)
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,33 @@
+import queue
+import threading
+import time
 import tkinter as tk
 from tkinter import messagebox
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from config import SMTP_TIMEOUT, SMTP_IDLE_TIMEOUT
 
 class Notifier:
+    """
+    Popups and email.
+
+    Email goes over one SMTP connection that is kept open and reused: STARTTLS and login
+    happen once per connection, not per message. A connection the server has dropped is
+    replaced transparently, and an idle one is closed after SMTP_IDLE_TIMEOUT seconds.
+    queue_email() hands messages to a background thread so callers never wait on SMTP.
+    """
+
     def __init__(self):
         self.email_config = None
+        self.smtp = None
+        self.smtp_lock = threading.Lock()
+        self.last_used = 0.0
+        self.outbox = queue.Queue()
+        self.worker = None
+        self.connections = 0
+        self.sent = 0
+        self.failed = 0
 
     def show_popup(self, title, message):
         messagebox.showinfo(title, message)
@@ -17,14 +38,68 @@ class Notifier:
     def show_warning(self, title, message):
         messagebox.showwarning(title, message)
 
-    def configure_email(self, smtp_server, smtp_port, sender_email, sender_password):
+    def configure_email(self, smtp_server, smtp_port, sender_email, sender_password=None, use_tls=True):
+        """
+        :param sender_password: None skips the login, e.g. for a local relay or test sink
+        :param use_tls: Upgrade the connection with STARTTLS before logging in
+        """
+        self.close_connection()
         self.email_config = {
             'smtp_server': smtp_server,
             'smtp_port': smtp_port,
             'sender_email': sender_email,
-            'sender_password': sender_password
+            'sender_password': sender_password,
+            'use_tls': use_tls
         }
 
+    def connect(self):
+        config = self.email_config
+        server = smtplib.SMTP(config['smtp_server'], config['smtp_port'], timeout=SMTP_TIMEOUT)
+        try:
+            if config['use_tls']:
+                server.starttls()
+            if config['sender_password']:
+                server.login(config['sender_email'], config['sender_password'])
+        except Exception:
+            server.close()
+            raise
+        self.connections += 1
+        return server
+
+    def get_connection(self):
+        # Called with smtp_lock held
+        if self.smtp is not None and time.monotonic() - self.last_used > SMTP_IDLE_TIMEOUT:
+            # The server has most likely timed the session out by now
+            self._close()
+        if self.smtp is None:
+            self.smtp = self.connect()
+        return self.smtp
+
+    def _close(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except Exception:
+                self.smtp.close()
+            self.smtp = None
+
+    def close_connection(self):
+        with self.smtp_lock:
+            self._close()
+
+    def send_message(self, msg):
+        with self.smtp_lock:
+            for attempt in range(2):
+                try:
+                    self.get_connection().send_message(msg)
+                    self.last_used = time.monotonic()
+                    return
+                except (smtplib.SMTPServerDisconnected, ConnectionError):
+                    # A pooled connection the server dropped; retry once on a fresh one
+                    self._close()
+                    if attempt:
+                        raise
+
     def send_email(self, recipient, subject, body):
         if not self.email_config:
             raise ValueError("Email configuration not set")
@@ -36,11 +111,48 @@ class Notifier:
         msg.attach(MIMEText(body, 'plain'))
 
         try:
-            with smtplib.SMTP(self.email_config['smtp_server'], self.email_config['smtp_port']) as server:
-                server.starttls()
-                server.login(self.email_config['sender_email'], self.email_config['sender_password'])
-                server.send_message(msg)
+            self.send_message(msg)
+            self.sent += 1
             return True
         except Exception as e:
+            # send_message has already dropped a broken connection; after a rejected
+            # message (bad recipient, size limit) the pooled one stays usable
+            self.failed += 1
             print(f"Failed to send email: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+
+    def queue_email(self, recipient, subject, body):
+        """Send an email from the background thread; returns immediately."""
+        if not self.email_config:
+            raise ValueError("Email configuration not set")
+        with self.smtp_lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self._run, daemon=True, name='notifier')
+                self.worker.start()
+        self.outbox.put((recipient, subject, body))
+
+    def _run(self):
+        while True:
+            try:
+                item = self.outbox.get(timeout=SMTP_IDLE_TIMEOUT)
+            except queue.Empty:
+                self.close_connection()
+                continue
+            try:
+                if item is None:
+                    self.close_connection()
+                    return
+                self.send_email(*item)
+            finally:
+                self.outbox.task_done()
+
+    def flush(self):
+        """Wait until every queued email has been sent (or has failed)."""
+        self.outbox.join()
+
+    def close(self):
+        """Send what is queued, stop the background thread and close the connection."""
+        if self.worker is not None and self.worker.is_alive():
+            self.outbox.put(None)
+            self.worker.join()
+        self.close_connection()
@@ -1,34 +1,370 @@
 import os
+import ast
+import asyncio
 import importlib
 import inspect
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import pandas as pd
+from config import PLUGIN_HOOK_TIMEOUT, PLUGIN_WORKERS, PIPELINE_BATCH_ROWS
+
+# Points where plugins can transform data: after a query returns, when a result list is
+# turned into a frame for display/processing, and just before rows are written out
+PIPELINE_STAGES = ('post_fetch', 'post_process', 'pre_export')
+
+class PluginHandle:
+    """
+    A plugin class found by scanning its source. The module is imported, the class
+    instantiated and initialize(app) called the first time one of its hooks runs
+    (see PluginManager.load for the thread this happens on).
+    """
+
+    def __init__(self, module_name, class_name, hooks, lazy=True):
+        self.module_name = module_name
+        self.class_name = class_name
+        self.hooks = hooks
+        self.lazy = lazy
+        self.instance = None
+        self.failed = False
+        self.lock = threading.Lock()
+
+    def get(self, app):
+        if self.instance is not None or self.failed:
+            return self.instance
+        with self.lock:
+            if self.instance is None and not self.failed:
+                try:
+                    module = importlib.import_module(f'plugins.{self.module_name}')
+                    instance = getattr(module, self.class_name)()
+                    instance.initialize(app)
+                    self.instance = instance
+                except Exception as e:
+                    self.failed = True
+                    print(f"Error loading plugin {self.module_name}.{self.class_name}: {str(e)}")
+        return self.instance
 
 class PluginManager:
+    """
+    Finds plugins without importing them and dispatches hooks through a registry.
+
+    load_plugins() parses every module in plugins/ and registers each top-level class
+    that defines initialize() for the public methods defined in its body. A class with
+    base classes may inherit them, so its module is imported and the class inspected
+    instead. Plugins with hooks are imported on the first call of one of them, unless the
+    class sets LAZY = False; plugins with only initialize() are loaded right away.
+    initialize(app) always runs on the Tk thread.
+
+    Hooks run on a worker pool: execute_hook() waits up to the hook's timeout for their
+    results, dispatch_hook() returns immediately. `async def` hooks run on the manager's
+    event loop. Hooks therefore must not touch Tk widgets directly.
+
+    Methods named after a PIPELINE_STAGES entry are pipeline stages rather than hooks:
+    `post_fetch(self, batch, context)` receives a DataFrame batch and returns the
+    transformed batch (or None to keep it). Transforms can also be added with
+    register_stage(). All transforms of a stage are fused into one pass per batch, and
+    batches are transformed in parallel on a worker pool, keeping their order.
+    """
+
     def __init__(self):
         self.plugins = []
+        self.hooks = defaultdict(list)
+        self.stage_handles = defaultdict(list)
+        self.stage_transforms = defaultdict(list)
+        self.fused_stages = {}
+        self.hook_timeouts = {}
+        self.stats = defaultdict(lambda: {'calls': 0, 'errors': 0, 'timeouts': 0,
+                                          'total_seconds': 0.0, 'max_seconds': 0.0})
+        self.stats_lock = threading.Lock()
+        self.app = None
+        self.executor = None
+        self.stage_executor = None
+        self.loop = None
+        self.loop_lock = threading.Lock()
 
-    def load_plugins(self):
+    def load_plugins(self, app=None):
+        self.app = app
         plugin_dir = os.path.join(os.path.dirname(__file__), 'plugins')
         if not os.path.exists(plugin_dir):
             return
 
-        for filename in os.listdir(plugin_dir):
+        for filename in sorted(os.listdir(plugin_dir)):
             if filename.endswith('.py') and not filename.startswith('__'):
                 module_name = filename[:-3]
                 try:
-                    module = importlib.import_module(f'plugins.{module_name}')
-                    for name, obj in inspect.getmembers(module):
-                        if inspect.isclass(obj) and hasattr(obj, 'initialize'):
-                            self.plugins.append(obj())
-                except ImportError as e:
+                    with open(os.path.join(plugin_dir, filename), 'r', encoding='utf-8') as f:
+                        tree = ast.parse(f.read(), filename=filename)
+                except (OSError, SyntaxError, ValueError) as e:
                     print(f"Error loading plugin {module_name}: {str(e)}")
+                    continue
+                for handle in self.scan_module(module_name, tree):
+                    self.plugins.append(handle)
+                    for hook_name in handle.hooks:
+                        if hook_name in PIPELINE_STAGES:
+                            self.stage_handles[hook_name].append(handle)
+                        else:
+                            self.hooks[hook_name].append(handle)
+                    self.fused_stages.clear()
+                    if not handle.lazy:
+                        self.load(handle)
+
+    @staticmethod
+    def scan_module(module_name, tree):
+        handles = []
+        for node in tree.body:
+            if not isinstance(node, ast.ClassDef):
+                continue
+            methods = {item.name for item in node.body if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))}
+            if any(not (isinstance(base, ast.Name) and base.id == 'object') for base in node.bases):
+                # Hooks and initialize() may come from a base class, which the source does not show
+                methods = PluginManager.class_methods(module_name, node.name)
+            if 'initialize' not in methods:
+                continue
+            hooks = sorted(name for name in methods if not name.startswith('_') and name != 'initialize')
+            lazy = bool(hooks)
+            for item in node.body:
+                if isinstance(item, ast.Assign) and any(isinstance(target, ast.Name) and target.id == 'LAZY'
+                                                        for target in item.targets):
+                    try:
+                        lazy = lazy and bool(ast.literal_eval(item.value))
+                    except ValueError:
+                        pass
+            handles.append(PluginHandle(module_name, node.name, hooks, lazy))
+        return handles
+
+    @staticmethod
+    def class_methods(module_name, class_name):
+        """Names of every method of a plugin class, inherited ones included; imports its module."""
+        try:
+            module = importlib.import_module(f'plugins.{module_name}')
+            plugin_class = getattr(module, class_name)
+        except Exception as e:
+            print(f"Error loading plugin {module_name}.{class_name}: {str(e)}")
+            return set()
+        return {name for name, value in inspect.getmembers(plugin_class)
+                if inspect.isfunction(value) or inspect.ismethod(value)}
+
+    def load(self, handle):
+        """
+        The plugin instance of a handle. A plugin not loaded yet is initialized on the Tk
+        thread: directly when called there, otherwise through root.after(), waiting up to
+        PLUGIN_HOOK_TIMEOUT; None if it failed or did not get loaded in time.
+        """
+        if handle.instance is not None or handle.failed:
+            return handle.instance
+        root = getattr(self.app, 'root', None)
+        if root is None or threading.current_thread() is threading.main_thread():
+            return handle.get(self.app)
+        loaded = threading.Event()
+
+        def run():
+            try:
+                handle.get(self.app)
+            finally:
+                loaded.set()
+
+        root.after(0, run)
+        if not loaded.wait(PLUGIN_HOOK_TIMEOUT):
+            print(f"Plugin {self.plugin_name(handle)} was not initialized in time; skipping this call")
+        return handle.instance
 
     def get_plugins(self):
-        return self.plugins
+        """Every plugin instance; imports the plugins not loaded yet."""
+        return [instance for instance in (self.load(handle) for handle in self.plugins) if instance is not None]
+
+    def has_hook(self, hook_name):
+        return bool(self.hooks.get(hook_name))
+
+    def set_hook_timeout(self, hook_name, seconds):
+        self.hook_timeouts[hook_name] = seconds
+
+    def get_executor(self):
+        if self.executor is None:
+            with self.loop_lock:
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(max_workers=PLUGIN_WORKERS, thread_name_prefix='plugin')
+        return self.executor
+
+    def get_stage_executor(self):
+        if self.stage_executor is None:
+            with self.loop_lock:
+                if self.stage_executor is None:
+                    self.stage_executor = ThreadPoolExecutor(max_workers=PLUGIN_WORKERS, thread_name_prefix='pipeline')
+        return self.stage_executor
+
+    def get_loop(self):
+        with self.loop_lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, daemon=True, name='plugin-loop').start()
+        return self.loop
+
+    def call(self, handle, hook_name, args, kwargs):
+        plugin = self.load(handle)
+        if plugin is None:
+            return None
+        start = time.perf_counter()
+        try:
+            result = getattr(plugin, hook_name)(*args, **kwargs)
+            if inspect.iscoroutine(result):
+                result = asyncio.run_coroutine_threadsafe(result, self.get_loop()).result()
+            return result
+        except Exception as e:
+            self.record(hook_name, self.plugin_name(handle), error=True)
+            print(f"Error executing hook {hook_name} in plugin {handle.class_name}: {str(e)}")
+            return None
+        finally:
+            self.record(hook_name, self.plugin_name(handle), seconds=time.perf_counter() - start)
+
+    @staticmethod
+    def plugin_name(handle):
+        return f"{handle.module_name}.{handle.class_name}"
+
+    def record(self, hook_name, plugin_name, seconds=None, error=False, timeout=False):
+        with self.stats_lock:
+            stats = self.stats[(hook_name, plugin_name)]
+            if seconds is not None:
+                stats['calls'] += 1
+                stats['total_seconds'] += seconds
+                stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            stats['errors'] += error
+            stats['timeouts'] += timeout
+
+    def dispatch_hook(self, hook_name, *args, **kwargs):
+        """Start every handler of a hook in the background and return their futures."""
+        handles = self.hooks.get(hook_name)
+        if not handles:
+            return []
+        if threading.current_thread() is threading.main_thread():
+            # Initialize here rather than have the workers wait for this thread
+            for handle in handles:
+                self.load(handle)
+        executor = self.get_executor()
+        return [executor.submit(self.call, handle, hook_name, args, kwargs) for handle in handles]
 
     def execute_hook(self, hook_name, *args, **kwargs):
-        for plugin in self.plugins:
-            if hasattr(plugin, hook_name):
+        """
+        Run every handler of a hook concurrently and wait for them.
+
+        Waits at most the hook's timeout (set_hook_timeout, default PLUGIN_HOOK_TIMEOUT)
+        overall; handlers still running then are left to finish in the background and
+        their results are dropped.
+
+        :return: Results of the handlers that finished in time, in registration order
+        """
+        handles = self.hooks.get(hook_name)
+        if not handles:
+            return []
+        futures = self.dispatch_hook(hook_name, *args, **kwargs)
+        deadline = time.monotonic() + self.hook_timeouts.get(hook_name, PLUGIN_HOOK_TIMEOUT)
+        results = []
+        for handle, future in zip(handles, futures):
+            try:
+                results.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            except FutureTimeoutError:
+                self.record(hook_name, self.plugin_name(handle), timeout=True)
+                print(f"Hook {hook_name} in plugin {handle.class_name} timed out")
+        return results
+
+    def register_stage(self, stage, transform, name=None):
+        """
+        Add a transform to a pipeline stage.
+
+        :param transform: Called as transform(batch, context) with a DataFrame batch; returns
+                          the transformed DataFrame, or None to keep the batch as it is
+        """
+        if stage not in PIPELINE_STAGES:
+            raise ValueError(f"Unknown pipeline stage: {stage}")
+        self.stage_transforms[stage].append((name or getattr(transform, '__qualname__', repr(transform)), transform))
+        self.fused_stages.pop(stage, None)
+
+    def has_stage(self, stage):
+        return bool(self.stage_handles.get(stage) or self.stage_transforms.get(stage))
+
+    def fused(self, stage):
+        """One function applying every transform of a stage in turn; None if the stage is empty."""
+        if stage in self.fused_stages:
+            return self.fused_stages[stage]
+        transforms = []
+        for handle in self.stage_handles.get(stage, []):
+            plugin = self.load(handle)
+            if plugin is not None:
+                transforms.append((self.plugin_name(handle), getattr(plugin, stage)))
+        transforms.extend(self.stage_transforms.get(stage, []))
+
+        def run(batch, context):
+            if not isinstance(batch, pd.DataFrame):
+                batch = pd.DataFrame(batch)
+            for name, transform in transforms:
+                start = time.perf_counter()
                 try:
-                    getattr(plugin, hook_name)(*args, **kwargs)
+                    result = transform(batch, context)
+                    if result is not None:
+                        batch = result
                 except Exception as e:
-                    print(f"Error executing hook {hook_name} in plugin {plugin.__class__.__name__}: {str(e)}")
\ No newline at end of file
+                    # A failing transform is skipped; the batch continues unchanged
+                    self.record(stage, name, error=True)
+                    print(f"Error in pipeline stage {stage} of {name}: {str(e)}")
+                finally:
+                    self.record(stage, name, seconds=time.perf_counter() - start)
+            return batch
+
+        self.fused_stages[stage] = run if transforms else None
+        return self.fused_stages[stage]
+
+    def run_stage(self, stage, batches, context=None):
+        """
+        Transform batches through a stage, yielding them in their original order.
+
+        Up to twice PLUGIN_WORKERS batches are in flight at a time, so a generator of
+        batches is consumed as the output is. Without transforms the batches are passed
+        through untouched.
+
+        :param batches: Iterable of DataFrames or row lists, or a single DataFrame
+        :param context: Passed to the transforms along with 'stage' (e.g. entity, collection)
+        """
+        if isinstance(batches, pd.DataFrame):
+            batches = [batches]
+        run = self.fused(stage)
+        if run is None:
+            yield from batches
+            return
+        context = dict(context or {}, stage=stage)
+        executor = self.get_stage_executor()
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(run, batch, context))
+            if len(pending) >= PLUGIN_WORKERS * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def transform_frame(self, stage, df, context=None, batch_rows=PIPELINE_BATCH_ROWS):
+        """Run a whole frame through a stage in batches of `batch_rows` rows."""
+        if not self.has_stage(stage):
+            return df
+        batches = [df] if df.empty else (df.iloc[start:start + batch_rows] for start in range(0, len(df), batch_rows))
+        return pd.concat(list(self.run_stage(stage, batches, context)), ignore_index=True)
+
+    def transform_results(self, stage, results, context=None):
+        """Run every row list of a {key: rows} result through a stage, in place."""
+        if not isinstance(results, dict) or not self.has_stage(stage):
+            return results
+        for key, value in results.items():
+            if isinstance(value, list) and value and isinstance(value[0], dict):
+                df = self.transform_frame(stage, pd.DataFrame(value), dict(context or {}, collection=key))
+                results[key] = df.to_dict('records')
+        return results
+
+    def hook_stats(self):
+        """{(hook, plugin): calls, errors, timeouts, total and max seconds} for every hook called so far."""
+        with self.stats_lock:
+            return {key: dict(value) for key, value in self.stats.items()}
+
+    def shutdown(self):
+        for executor in (self.executor, self.stage_executor):
+            if executor is not None:
+                executor.shutdown(wait=False)
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
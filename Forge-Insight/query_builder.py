@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from config import SCHEMA, MAX_QUERY_LIMIT
 import time
 import re
@@ -117,8 +117,9 @@ class QueryBuilder:
             raise ValueError(f"Invalid entity or field: {entity}.{field}")
         return self.schema[entity]['fields'][field]
 
-    def build_custom_unique_traders_query(self, pool_address: str, days: int = 180, interval: int = 30):
-        current_timestamp = int(time.time())
+    def build_custom_unique_traders_query(self, pool_address: str, days: int = 180, interval: int = 30,
+                                          now: Optional[int] = None):
+        current_timestamp = int(time.time()) if now is None else now
         start_timestamp = current_timestamp - (days * 86400)  # 86400 seconds in a day
         
         query = f"""
@@ -139,4 +140,110 @@ class QueryBuilder:
         }}
         """
         print(f"Debug: Generated query: {query}")
-        return query
\ No newline at end of file
+        return query
+
+    def build_page_query(self, collection: str, fields: List[str], where_conditions: List[str] = None,
+                         first: int = MAX_QUERY_LIMIT, last_id: str = None, order_by: str = 'id',
+                         order_direction: str = 'asc') -> str:
+        """
+        Builds one page of an id-cursor paginated query.
+
+        Pages are ordered by id and continue after the last id of the previous page,
+        which avoids the skip limits of the subgraph.
+
+        :param collection: Plural collection name (e.g. 'swaps')
+        :param fields: Field selections, nested selections are passed through as-is
+        :param where_conditions: GraphQL where conditions (e.g. 'pool: "0x..."')
+        :param first: Page size
+        :param last_id: Id of the last row of the previous page
+        :param order_by: Sort field; anything other than 'id' only makes sense for a single page
+        :param order_direction: 'asc' or 'desc'
+        :return: The query string
+        """
+        conditions = list(where_conditions or [])
+        if last_id:
+            conditions.append(f'id_gt: "{last_id}"')
+        where_clause = f'where: {{ {", ".join(conditions)} }}' if conditions else ''
+
+        query = f"""
+        query {{
+          {collection}(
+            first: {min(first, MAX_QUERY_LIMIT)}
+            orderBy: {order_by}
+            orderDirection: {order_direction}
+            {where_clause}
+          ) {{
+            {' '.join(fields)}
+          }}
+        }}
+        """
+        return query
+
+    @staticmethod
+    def pin_to_block(query: str, block_number: int) -> str:
+        """
+        Pins every top-level field of a query to a block, so all of them (and every page
+        of a paginated read) see the same snapshot of the subgraph.
+
+        Adds block: { number: N } to the arguments of each root selection, keeping
+        aliases and existing arguments; fields that already have a block argument are
+        left alone. Only the first operation of the document is rewritten.
+
+        :param query: GraphQL query
+        :param block_number: Block to read at
+        :return: The pinned query
+        """
+        pin = f"block: {{ number: {int(block_number)} }}"
+        out = []
+        depth = 0
+        i = 0
+        length = len(query)
+        while i < length:
+            char = query[i]
+            if char == '"':
+                end = i + 1
+                while end < length and query[end] != '"':
+                    end += 2 if query[end] == '\\' else 1
+                out.append(query[i:end + 1])
+                i = end + 1
+                continue
+            if char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+                if depth == 0:
+                    out.append(query[i:])
+                    break
+            if depth == 1 and (char.isalpha() or char == '_'):
+                end = i
+                while end < length and (query[end].isalnum() or query[end] == '_'):
+                    end += 1
+                out.append(query[i:end])
+                gap = end
+                while gap < length and query[gap].isspace():
+                    gap += 1
+                if gap < length and query[gap] == ':':
+                    # Alias; the field name follows
+                    i = end
+                    continue
+                if gap < length and query[gap] == '(':
+                    close = gap + 1
+                    while query[close] != ')':
+                        if query[close] == '"':
+                            close += 1
+                            while query[close] != '"':
+                                close += 2 if query[close] == '\\' else 1
+                        close += 1
+                    arguments = query[gap + 1:close]
+                    out.append(query[end:gap + 1])
+                    if not re.search(r'\bblock\s*:', arguments):
+                        out.append(pin + ' ')
+                    out.append(arguments)
+                    i = close
+                else:
+                    out.append(f"({pin})")
+                    i = end
+                continue
+            out.append(char)
+            i += 1
+        return ''.join(out)
@@ -0,0 +1,159 @@
+import re
+import threading
+from typing import Any, Callable, Dict, Hashable
+from cachetools import LRUCache, TTLCache
+from config import RESULT_CACHE_SIZE, RESULT_CACHE_TTL, SNAPSHOT_CACHE_SIZE
+
+_QUERY_TOKENS = re.compile(r'"(?:\\.|[^"\\])*"|\s+')
+_PUNCTUATION = set('{}()[]:,')
+
+def normalize_query(query: str) -> str:
+    """
+    Collapse insignificant whitespace so differently formatted copies of the same
+    GraphQL query share a key. String literals are left untouched.
+    """
+    parts = []
+    position = 0
+    for match in _QUERY_TOKENS.finditer(query):
+        parts.append(query[position:match.start()])
+        token = match.group()
+        parts.append(token if token.startswith('"') else ' ')
+        position = match.end()
+    parts.append(query[position:])
+    text = ''.join(parts).strip()
+    # Drop the spaces next to punctuation: "{ swaps (first: 5) }" -> "{swaps(first:5)}"
+    out = []
+    for index, char in enumerate(text):
+        if char == ' ' and ((out and out[-1] in _PUNCTUATION) or
+                            (index + 1 < len(text) and text[index + 1] in _PUNCTUATION)):
+            continue
+        out.append(char)
+    return ''.join(out)
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Runs one call per key at a time. Callers that ask for a key whose call is still
+    running wait for it and get its result (or its exception) instead of starting
+    their own.
+    """
+
+    def __init__(self):
+        self.calls: Dict[Hashable, _Call] = {}
+        self.lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+class ResultCache:
+    """
+    In-memory cache of subgraph query results with single-flight fetching.
+
+    fetch() answers from the cache when it can; otherwise concurrent callers asking for
+    the same key share one call of the fetch function, and its result is cached for
+    RESULT_CACHE_TTL seconds. Results of block-pinned queries never change, so they are
+    kept without a TTL in a separate LRU store. Every caller gets its own result dict and
+    row lists, so it may add, drop or replace them; the rows themselves are shared with
+    the cache and must be treated as read-only.
+    """
+
+    def __init__(self, maxsize: int = RESULT_CACHE_SIZE, ttl: float = RESULT_CACHE_TTL,
+                 pinned_maxsize: int = SNAPSHOT_CACHE_SIZE):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.pinned = LRUCache(maxsize=pinned_maxsize)
+        self.lock = threading.Lock()
+        self.flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(query: str, endpoint: str) -> tuple:
+        return endpoint, normalize_query(query)
+
+    def get(self, key: Hashable):
+        with self.lock:
+            value = self.pinned.get(key)
+            return value if value is not None else self.entries.get(key)
+
+    def set(self, key: Hashable, value: Any, permanent: bool = False):
+        with self.lock:
+            if permanent:
+                self.pinned[key] = value
+            else:
+                self.entries[key] = value
+
+    @staticmethod
+    def _copy(value: Any) -> Any:
+        # Copying the containers is O(rows); a deep copy would also copy every row
+        if isinstance(value, dict):
+            return {key: list(item) if isinstance(item, list) else item for key, item in value.items()}
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.pinned.clear()
+
+    def fetch(self, key: Hashable, fn: Callable[[], Any], use_cache: bool = True, permanent: bool = False,
+              store: bool = True) -> Any:
+        """
+        :param use_cache: False skips the cached value (the call is still shared with
+                          identical in-flight calls) and refreshes the cache with the result
+        :param permanent: Keep the result in the pinned store; only for immutable (block-pinned) results
+        :param store: False leaves the cache as it is, for callers that keep the result themselves
+        """
+        if use_cache:
+            value = self.get(key)
+            if value is not None:
+                with self.lock:
+                    self.hits += 1
+                return self._copy(value)
+        with self.lock:
+            self.misses += 1
+
+        def load():
+            value = fn()
+            if store:
+                self.set(key, value, permanent)
+            return value
+
+        return self._copy(self.flight.do(key, load))
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'pinned_entries': len(self.pinned),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.flight.coalesced,
+            }
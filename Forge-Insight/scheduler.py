@@ -8,7 +8,36 @@ class Scheduler:
         self.thread = None
 
     def add_job(self, job, interval):
-        schedule.every(interval).seconds.do(job)
+        return schedule.every(interval).seconds.do(job)
+
+    def add_refresh_job(self, job, interval, connector, endpoint=None, endpoints=None):
+        """
+        Like add_job, but the job only runs when the subgraph has indexed a new block since
+        its last run; idle runs cost one small _meta request per subgraph.
+
+        :param endpoints: Watch several subgraphs instead of one (a federated query); the job
+                          runs when any of them has moved
+        """
+        watched = endpoints or [endpoint]
+        last_heads = {}
+
+        def run_if_new_block():
+            try:
+                heads = {name: connector.probe_block(name) for name in watched}
+            except Exception as e:
+                print(f"Block probe failed, running job anyway: {str(e)}")
+                return job()
+            if heads == last_heads:
+                return
+            result = job()
+            last_heads.clear()
+            last_heads.update(heads)
+            return result
+
+        return schedule.every(interval).seconds.do(run_if_new_block)
+
+    def cancel_job(self, job):
+        schedule.cancel_job(job)
 
     def start(self):
         self.running = True
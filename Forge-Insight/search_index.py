@@ -0,0 +1,95 @@
+import heapq
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Fields searched, in ranking priority; an entry matched on its symbol outranks one matched on its address
+SEARCH_FIELDS = ('symbol', 'name', 'address')
+
+# Matches shown in the pool and token dropdowns
+SEARCH_RESULT_LIMIT = 200
+
+class SearchIndex:
+    """
+    Substring search over pool or token dictionary entries.
+
+    Every searched field value is broken into n-grams once when an entry is added.
+    Queries of n or more characters intersect the posting sets of their n-grams and
+    match anywhere; shorter queries only match at the start of a value or of a word
+    in it, through a table of short word prefixes. The candidates are then checked and
+    ranked: exact matches first, then prefix matches, then matches at a word start,
+    then any other substring.
+    """
+
+    def __init__(self, entries: Optional[Iterable[Dict[str, Any]]] = None, n: int = 3, fields=SEARCH_FIELDS):
+        self.n = n
+        self.fields = fields
+        self.entries: List[Dict[str, Any]] = []
+        self.keys: List[Tuple[str, ...]] = []
+        self.grams: Dict[str, set] = defaultdict(set)
+        self.prefixes: Dict[str, set] = defaultdict(set)
+        if entries:
+            self.add(entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, entries: Iterable[Dict[str, Any]]):
+        for entry in entries:
+            entry_id = len(self.entries)
+            keys = tuple(str(entry.get(field) or '').lower() for field in self.fields)
+            self.entries.append(entry)
+            self.keys.append(keys)
+            for key in keys:
+                for gram in {key[start:start + self.n] for start in range(len(key) - self.n + 1)}:
+                    self.grams[gram].add(entry_id)
+                words = {key} | set(re.split(r'[^0-9a-z]+', key))
+                for prefix in {word[:length] for word in words for length in range(1, min(len(word), self.n - 1) + 1)}:
+                    self.prefixes[prefix].add(entry_id)
+
+    def candidates(self, query: str) -> set:
+        if len(query) < self.n:
+            return self.prefixes.get(query, set())
+        postings = []
+        for start in range(len(query) - self.n + 1):
+            posting = self.grams.get(query[start:start + self.n])
+            if not posting:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+        return set.intersection(*postings) if len(postings) > 1 else set(postings[0])
+
+    def rank(self, entry_id: int, query: str) -> Optional[Tuple[int, int, int, int]]:
+        best = None
+        for field_rank, key in enumerate(self.keys[entry_id]):
+            position = key.find(query)
+            if position < 0:
+                continue
+            if key == query:
+                match_rank = 0
+            elif position == 0:
+                match_rank = 1
+            elif not key[position - 1].isalnum():
+                match_rank = 2
+            else:
+                match_rank = 3
+            score = (match_rank, field_rank, len(key), entry_id)
+            if best is None or score < best:
+                best = score
+        return best
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Return the entries matching `query` (case-insensitive), best first.
+        An empty query returns every entry in insertion order.
+        """
+        query = query.strip().lower()
+        if not query:
+            return list(self.entries)
+        scored = []
+        for entry_id in self.candidates(query):
+            score = self.rank(entry_id, query)
+            if score is not None:
+                scored.append(score)
+        scored = heapq.nsmallest(limit, scored) if limit else sorted(scored)
+        return [self.entries[score[-1]] for score in scored]
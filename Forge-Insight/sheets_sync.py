@@ -0,0 +1,158 @@
+import difflib
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+from config import SHEETS_SYNC_DIR
+from sheets_uploader import SheetsUploader, quote_sheet_name
+
+# Past this share of changed rows a clear-and-rewrite is cheaper than patching
+FULL_REWRITE_RATIO = 0.5
+
+def row_digest(row: List[Any]) -> str:
+    return hashlib.md5(json.dumps(row, default=str).encode('utf-8')).hexdigest()[:16]
+
+class SheetsSync:
+    """
+    Keeps a tab in step with a row grid by sending only what changed.
+
+    The digest and width of every row last written to a tab are kept under
+    SHEETS_SYNC_DIR. On the next sync the old and new digests are aligned, rows that
+    were inserted or removed in the middle become insertDimension/deleteDimension
+    requests (so the rows below them are not rewritten), and only inserted, changed
+    and appended rows are uploaded. Edits made by hand in the sheet are not detected;
+    use full=True to rewrite the tab from scratch.
+    """
+
+    def __init__(self, uploader: SheetsUploader, state_dir: str = SHEETS_SYNC_DIR):
+        self.uploader = uploader
+        self.service = uploader.service
+        self.spreadsheet_id = uploader.spreadsheet_id
+        self.state_dir = state_dir
+
+    def sync(self, sheet_name: str, rows: List[List[Any]], full: bool = False) -> int:
+        """
+        Make the tab match `rows`.
+
+        :return: Number of cells written
+        """
+        digests = [row_digest(row) for row in rows]
+        state_path = self.state_path(sheet_name)
+        previous = None if full else self.load_state(state_path)
+
+        if previous is None:
+            return self.rewrite(sheet_name, rows, digests, state_path)
+
+        old_digests = [digest for digest, _ in previous]
+        old_widths = [width for _, width in previous]
+        matcher = difflib.SequenceMatcher(None, old_digests, digests)
+        structure, segments, clear_ranges, changed = self.plan(sheet_name, matcher.get_opcodes(), rows, old_widths)
+
+        if not structure and not segments and not clear_ranges:
+            return 0
+        if changed > len(rows) * FULL_REWRITE_RATIO:
+            return self.rewrite(sheet_name, rows, digests, state_path)
+
+        # Until the patch lands the stored digests no longer describe the tab
+        os.remove(state_path)
+        if structure:
+            sheet_id = self.get_sheet_id(sheet_name)
+            if sheet_id is None:
+                return self.rewrite(sheet_name, rows, digests, state_path)
+            for request in structure:
+                request[next(iter(request))]['range']['sheetId'] = sheet_id
+            self.uploader.execute(self.service.spreadsheets().batchUpdate(
+                spreadsheetId=self.spreadsheet_id, body={'requests': structure}))
+        if clear_ranges:
+            self.uploader.execute(self.service.spreadsheets().values().batchClear(
+                spreadsheetId=self.spreadsheet_id, body={'ranges': clear_ranges}))
+        updated_cells = self.uploader.write_segments(segments)
+        self.save_state(state_path, digests, rows)
+        return updated_cells
+
+    def plan(self, sheet_name: str, opcodes, rows: List[List[Any]], old_widths: List[int]
+             ) -> Tuple[List[Dict[str, Any]], List[Tuple[str, int, List[List[Any]]]], List[str], int]:
+        """
+        Turn difflib opcodes into sheet operations.
+
+        Opcodes are applied top to bottom, so by the time one is reached every row above it
+        already matches the new grid and its position in the sheet is its new index j1.
+
+        :return: (insert/delete dimension requests, row segments to write, ranges to clear,
+                 number of rows touched)
+        """
+        structure = []
+        segments = []
+        clear_ranges = []
+        changed = 0
+        quoted = quote_sheet_name(sheet_name)
+
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == 'equal':
+                continue
+            old_count, new_count = i2 - i1, j2 - j1
+            changed += max(old_count, new_count)
+
+            # Rows removed from the end are cleared rather than deleted, so the tab never runs out of rows
+            if j1 == len(rows):
+                clear_ranges.append(f"{quoted}!{j1 + 1}:{j1 + old_count}")
+                continue
+
+            overlap = min(old_count, new_count)
+            if old_count > new_count and j2 == len(rows):
+                clear_ranges.append(f"{quoted}!{j2 + 1}:{j1 + old_count}")
+            elif old_count > new_count:
+                structure.append(self.dimension_request('deleteDimension', j1 + overlap, j1 + old_count))
+            elif new_count > old_count:
+                structure.append(self.dimension_request('insertDimension', j1 + overlap, j2))
+
+            if new_count:
+                block = [list(row) for row in rows[j1:j2]]
+                for offset in range(overlap):
+                    # A shorter row written over a longer one must blank the cells it no longer covers
+                    padding = old_widths[i1 + offset] - len(block[offset])
+                    if padding > 0:
+                        block[offset].extend([''] * padding)
+                segments.append((sheet_name, j1 + 1, block))
+
+        return structure, segments, clear_ranges, changed
+
+    @staticmethod
+    def dimension_request(kind: str, start: int, end: int) -> Dict[str, Any]:
+        return {kind: {'range': {'dimension': 'ROWS', 'startIndex': start, 'endIndex': end}}}
+
+    def rewrite(self, sheet_name: str, rows: List[List[Any]], digests: List[str], state_path: str) -> int:
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        updated_cells = self.uploader.upload({sheet_name: rows})
+        self.save_state(state_path, digests, rows)
+        return updated_cells
+
+    def get_sheet_id(self, sheet_name: str) -> Optional[int]:
+        spreadsheet = self.uploader.execute(self.service.spreadsheets().get(
+            spreadsheetId=self.spreadsheet_id, fields='sheets.properties(sheetId,title)'))
+        for sheet in spreadsheet.get('sheets', []):
+            if sheet['properties']['title'] == sheet_name:
+                return sheet['properties']['sheetId']
+        return None
+
+    def state_path(self, sheet_name: str) -> str:
+        key = hashlib.sha1(f"{self.spreadsheet_id}/{sheet_name}".encode('utf-8')).hexdigest()
+        return os.path.join(self.state_dir, f"{key}.json")
+
+    @staticmethod
+    def load_state(path: str) -> Optional[List[List[Any]]]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)['rows']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @staticmethod
+    def save_state(path: str, digests: List[str], rows: List[List[Any]]):
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'rows': [[digest, len(row)] for digest, row in zip(digests, rows)]}, f)
+        os.replace(temp_path, path)
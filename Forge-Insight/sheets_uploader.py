@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import random
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import httplib2
+import pandas as pd
+from googleapiclient.errors import HttpError
+from google_services import GoogleServicePool
+from config import (SHEETS_UPLOAD_DIR, SHEETS_CHUNK_BYTES, SHEETS_BATCH_BYTES,
+                    SHEETS_MAX_RETRIES, SHEETS_RETRY_BACKOFF)
+
+# Statuses worth retrying: timeouts, rate limits and transient server errors
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+def build_sheets_service(creds):
+    """Return the calling thread's cached Sheets v4 client for these credentials."""
+    return GoogleServicePool.shared().sheets_service(creds)
+
+def quote_sheet_name(sheet_name: str) -> str:
+    return "'" + str(sheet_name).replace("'", "''") + "'"
+
+def to_sheet_rows(df: pd.DataFrame, header: bool = True) -> List[List[Any]]:
+    """Convert a frame into JSON-safe rows; missing values become empty cells."""
+    values = df.astype(object).where(df.notna(), '').values.tolist()
+    return [df.columns.tolist()] + values if header else values
+
+class SheetsUploadError(Exception):
+    """Raised when a batch still fails after every retry. The checkpoint is kept for resume."""
+
+class SheetsUploader:
+    """
+    Uploads row grids to one spreadsheet in size-bounded pieces.
+
+    Each tab's rows are split into chunks of at most `chunk_bytes` of JSON, and chunks
+    from any tab are grouped into values:batchUpdate calls of at most `batch_bytes`.
+    Every batch is retried on its own with exponential backoff. Finished batches are
+    recorded in a checkpoint file, so running the same upload again after a failure
+    skips what already reached the sheet.
+    """
+
+    def __init__(self, service, spreadsheet_id: str,
+                 chunk_bytes: int = SHEETS_CHUNK_BYTES,
+                 batch_bytes: int = SHEETS_BATCH_BYTES,
+                 max_retries: int = SHEETS_MAX_RETRIES,
+                 backoff: float = SHEETS_RETRY_BACKOFF,
+                 value_input_option: str = 'USER_ENTERED',
+                 checkpoint_dir: str = SHEETS_UPLOAD_DIR):
+        self.service = service
+        self.spreadsheet_id = spreadsheet_id
+        self.chunk_bytes = chunk_bytes
+        self.batch_bytes = batch_bytes
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.value_input_option = value_input_option
+        self.checkpoint_dir = checkpoint_dir
+
+    def split_chunks(self, sheet_name: str, rows: List[List[Any]], start_row: int = 1) -> Iterable[Tuple[str, int, List[List[Any]], int]]:
+        """Yield (sheet_name, first_row, rows, size) chunks of at most chunk_bytes each."""
+        chunk = []
+        chunk_start = start_row
+        size = 0
+        for offset, row in enumerate(rows):
+            row_size = len(json.dumps(row, default=str)) + 1
+            if chunk and size + row_size > self.chunk_bytes:
+                yield sheet_name, chunk_start, chunk, size
+                chunk, chunk_start, size = [], start_row + offset, 0
+            chunk.append(row)
+            size += row_size
+        if chunk:
+            yield sheet_name, chunk_start, chunk, size
+
+    def plan_batches(self, segments: List[Tuple[str, int, List[List[Any]]]]) -> List[List[Dict[str, Any]]]:
+        """Group the chunks of (sheet_name, first_row, rows) segments into batchUpdate payloads."""
+        batches = []
+        batch = []
+        size = 0
+        for sheet_name, start_row, rows in segments:
+            for name, first_row, chunk, chunk_size in self.split_chunks(sheet_name, rows, start_row):
+                if batch and size + chunk_size > self.batch_bytes:
+                    batches.append(batch)
+                    batch, size = [], 0
+                batch.append({'range': f"{quote_sheet_name(name)}!A{first_row}", 'values': chunk})
+                size += chunk_size
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def upload(self, grids: Dict[str, List[List[Any]]], clear: bool = True,
+               start_rows: Optional[Dict[str, int]] = None) -> int:
+        """
+        Write each grid to its tab, creating missing tabs first.
+
+        :param grids: Dict of tab name to rows (lists of cell values)
+        :param clear: Clear the tabs before the first batch of a fresh upload
+        :param start_rows: Optional 1-based row each tab's grid starts at
+        :return: Number of cells updated
+        """
+        start_rows = start_rows or {}
+        segments = [(name, start_rows.get(name, 1), rows) for name, rows in grids.items()]
+        return self.write_segments(segments, list(grids.keys()), clear)
+
+    def write_segments(self, segments: List[Tuple[str, int, List[List[Any]]]],
+                       sheet_names: Optional[List[str]] = None, clear: bool = False) -> int:
+        """
+        Write row segments, resuming from the checkpoint of an identical earlier attempt.
+
+        :param segments: List of (tab name, 1-based first row, rows)
+        :param sheet_names: Tabs to create if missing (and clear, if `clear` is set) before a fresh run
+        :return: Number of cells updated
+        """
+        batches = self.plan_batches(segments)
+        digests = [self.batch_digest(batch) for batch in batches]
+        checkpoint_path = self.checkpoint_path(digests)
+        done = self.load_checkpoint(checkpoint_path)
+
+        if not done and sheet_names:
+            self.ensure_sheets(sheet_names)
+            if clear:
+                ranges = [quote_sheet_name(name) for name in sheet_names]
+                self.execute(self.service.spreadsheets().values().batchClear(
+                    spreadsheetId=self.spreadsheet_id, body={'ranges': ranges}))
+
+        updated_cells = 0
+        for batch, digest in zip(batches, digests):
+            if digest in done:
+                updated_cells += sum(len(row) for item in batch for row in item['values'])
+                continue
+            body = {'valueInputOption': self.value_input_option, 'data': batch}
+            result = self.execute(self.service.spreadsheets().values().batchUpdate(
+                spreadsheetId=self.spreadsheet_id, body=body), checkpoint_path)
+            updated_cells += result.get('totalUpdatedCells', 0)
+            done.add(digest)
+            self.save_checkpoint(checkpoint_path, done)
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        return updated_cells
+
+    def ensure_sheets(self, sheet_names: List[str]):
+        spreadsheet = self.execute(self.service.spreadsheets().get(
+            spreadsheetId=self.spreadsheet_id, fields='sheets.properties.title'))
+        existing = {sheet['properties']['title'] for sheet in spreadsheet.get('sheets', [])}
+        requests = [{'addSheet': {'properties': {'title': name}}} for name in sheet_names if name not in existing]
+        if requests:
+            self.execute(self.service.spreadsheets().batchUpdate(
+                spreadsheetId=self.spreadsheet_id, body={'requests': requests}))
+
+    def execute(self, request, checkpoint_path: Optional[str] = None):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return request.execute()
+            except HttpError as error:
+                if error.resp.status not in RETRYABLE_STATUSES or attempt == self.max_retries:
+                    raise SheetsUploadError(self.failure_message(error, checkpoint_path)) from error
+            except (OSError, httplib2.HttpLib2Error) as error:
+                if attempt == self.max_retries:
+                    raise SheetsUploadError(self.failure_message(error, checkpoint_path)) from error
+            # Full jitter keeps parallel exports from retrying in lockstep
+            time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    @staticmethod
+    def failure_message(error, checkpoint_path):
+        message = f"Google Sheets request failed: {error}"
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            message += ". Run the export again to resume from the last uploaded chunk."
+        return message
+
+    @staticmethod
+    def batch_digest(batch: List[Dict[str, Any]]) -> str:
+        return hashlib.sha1(json.dumps(batch, default=str, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def checkpoint_path(self, digests: List[str]) -> str:
+        # Keyed on the spreadsheet and the exact batches, so a changed export starts fresh
+        upload_key = hashlib.sha1((self.spreadsheet_id + ''.join(digests)).encode('utf-8')).hexdigest()
+        return os.path.join(self.checkpoint_dir, f"{upload_key}.json")
+
+    @staticmethod
+    def load_checkpoint(path: str) -> set:
+        if not os.path.exists(path):
+            return set()
+        try:
+            with open(path, 'r') as f:
+                return set(json.load(f).get('done', []))
+        except (OSError, ValueError):
+            return set()
+
+    @staticmethod
+    def save_checkpoint(path: str, done: set):
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'done': sorted(done)}, f)
+        os.replace(temp_path, path)
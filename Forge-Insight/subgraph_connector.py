@@ -1,25 +1,68 @@
 import requests
-from requests.exceptions import RequestException
-from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException, HTTPError, Timeout, ConnectionError as RequestsConnectionError
+from typing import Dict, Any, Optional, Iterator, List, Callable, Tuple
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
 import time
-from config import API_TIMEOUT, ERROR_MESSAGES, SUBGRAPH_URLS, SCHEMA
+from cachetools import LRUCache
+from config import (API_TIMEOUT, ERROR_MESSAGES, SUBGRAPH_URLS, SCHEMA, MAX_QUERY_LIMIT, ENDPOINT_MAX_CONCURRENCY,
+                    MIN_PAGE_SIZE, PAGE_GROW_AFTER, FRESH_RESULTS_SIZE, FRESH_FULL_READ_INTERVAL)
+from traffic_control import TrafficControl, CircuitOpenError
+from result_cache import ResultCache
 from subgraph_schemas.forge_subgraph_schema import SUBGRAPH_SCHEMA as FORGE_SUBGRAPH_SCHEMA
 from collections import defaultdict
 from query_builder import QueryBuilder
+from candle_builder import CandleBuilder
 
 SUBGRAPH_SCHEMAS = {
     "Forge": FORGE_SUBGRAPH_SCHEMA,
     # Add other subgraphs here as they are supported
 }
 
+# Responses that mean the indexer is shedding load; they shrink the endpoint's concurrency limit
+OVERLOAD_STATUSES = {429, 502, 503, 504}
+
+PROBE_QUERY = "{ _meta { block { number hash timestamp } } }"
+# For graph-node versions whose _meta has no block timestamp
+PROBE_QUERY_NO_TIME = "{ _meta { block { number hash } } }"
+
+# GraphQL error messages (lowercased substrings) that mean the indexer could not answer in
+# time or is busy, as opposed to a query that will never succeed
+RETRYABLE_ERROR_PATTERNS = (
+    'timeout', 'timed out', 'canceling statement', 'too many', 'overloaded', 'unavailable',
+    'try again', 'rate limit', 'bad indexers', 'has only indexed up to', 'connection',
+)
+
+class RetryableQueryError(ValueError):
+    """The endpoint was overloaded or timed out; the same query, or a smaller one, may succeed later."""
+
+class PermanentQueryError(ValueError):
+    """The query itself was rejected (syntax, unknown field, bad filter); retrying will not help."""
+
+def classify_graphql_error(message: str) -> ValueError:
+    error_class = RetryableQueryError if any(pattern in message.lower() for pattern in RETRYABLE_ERROR_PATTERNS) \
+        else PermanentQueryError
+    return error_class(ERROR_MESSAGES['api_error'].format(message))
+
 class SubgraphConnector:
     def __init__(self):
-        self.session = requests.Session()
         self.current_subgraph = list(SUBGRAPH_URLS.keys())[0]  # Set default subgraph
         self.schema = SCHEMA
         self.subgraph_schemas = SUBGRAPH_SCHEMAS
         self.query_builder = QueryBuilder()
+        # One connection pool per endpoint URL, created on first use
+        self.sessions: Dict[str, requests.Session] = {}
+        self.endpoint_lock = threading.Lock()
+        self.traffic = TrafficControl()
+        self.result_cache = ResultCache()
+        # Last head block seen per endpoint URL, and full entity reads kept current by fetch_fresh
+        self.last_blocks: Dict[str, Dict[str, Any]] = {}
+        self.fresh_results = LRUCache(maxsize=FRESH_RESULTS_SIZE)
+        self.no_change_block = set()
+        self.no_block_time = set()
 
     def get_current_subgraph_schema(self):
         return self.subgraph_schemas.get(self.current_subgraph, {})
@@ -33,6 +76,39 @@ class SubgraphConnector:
     def get_active_subgraph_url(self):
         return SUBGRAPH_URLS.get(self.current_subgraph, "")
 
+    def resolve_endpoint(self, endpoint: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Map a request's endpoint to (name, url).
+
+        :param endpoint: A SUBGRAPH_URLS name or a URL; None means the current subgraph
+        """
+        if endpoint is None:
+            endpoint = self.current_subgraph
+        if endpoint in SUBGRAPH_URLS:
+            return endpoint, SUBGRAPH_URLS[endpoint]
+        return endpoint, endpoint
+
+    def get_endpoint_session(self, url: str) -> requests.Session:
+        with self.endpoint_lock:
+            if url not in self.sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=ENDPOINT_MAX_CONCURRENCY)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self.sessions[url] = session
+            return self.sessions[url]
+
+    def get_traffic_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Current concurrency limit, queue depth and circuit state of every endpoint queried so far."""
+        return self.traffic.metrics()
+
+    def get_cache_stats(self) -> Dict[str, int]:
+        """Result cache entries, hits and misses, and how many requests shared another's in-flight fetch."""
+        return self.result_cache.stats()
+
+    def get_federation_endpoints(self) -> List[str]:
+        return [name for name, url in SUBGRAPH_URLS.items() if url]
+
     def get_entities(self):
         return list(self.schema.keys())
 
@@ -45,6 +121,28 @@ class SubgraphConnector:
     def build_query(self, entity: str, fields: list, address: Optional[str] = None, limit: int = 100, 
                     order_by: Optional[str] = None, order_direction: str = "asc", 
                     time_filter: Optional[str] = None, custom_filter: Optional[str] = None) -> str:
+        where_conditions = self.build_where_conditions(entity, address, time_filter, custom_filter)
+        where_clause = f'where: {{ {", ".join(where_conditions)} }}' if where_conditions else ''
+        order_condition = f'orderBy: {order_by}, orderDirection: {order_direction.lower()}' if order_by else ''
+
+        # Handle pluralization
+        if entity.lower() == 'factory':
+            entity_plural = 'factories'
+        else:
+            entity_plural = entity.lower() + ('ies' if entity.lower().endswith('y') else 's')
+
+        query = f"""
+          query {{
+            {entity_plural}(first: {limit}, {where_clause} {order_condition}) {{
+              {' '.join(fields)}
+            }}
+          }}
+        """
+        print(f"Generated query: {query}")  # Debug print
+        return query.strip()
+
+    def build_where_conditions(self, entity: str, address: Optional[str] = None, time_filter: Optional[str] = None,
+                               custom_filter: Optional[str] = None, now: Optional[int] = None) -> List[str]:
         where_conditions = []
         if address:
             if entity in ['Pool', 'Token']:
@@ -58,7 +156,7 @@ class SubgraphConnector:
 
         # Only apply time filter for entities that support it
         if time_filter and entity.lower() not in ['factory', 'factories']:
-            time_condition = self._get_common_filter_condition(time_filter)
+            time_condition = self._get_common_filter_condition(time_filter, now)
             if time_condition:
                 where_conditions.append(time_condition)
             print(f"Time filter condition: {time_condition}")  # Debug print
@@ -66,27 +164,12 @@ class SubgraphConnector:
         if custom_filter:
             where_conditions.append(custom_filter)
 
-        where_clause = f'where: {{ {", ".join(where_conditions)} }}' if where_conditions else ''
-        order_condition = f'orderBy: {order_by}, orderDirection: {order_direction.lower()}' if order_by else ''
-
-        # Handle pluralization
-        if entity.lower() == 'factory':
-            entity_plural = 'factories'
-        else:
-            entity_plural = entity.lower() + ('ies' if entity.lower().endswith('y') else 's')
-
-        query = f"""
-          query {{
-            {entity_plural}(first: {limit}, {where_clause} {order_condition}) {{
-              {' '.join(fields)}
-            }}
-          }}
-        """
-        print(f"Generated query: {query}")  # Debug print
-        return query.strip()
+        return where_conditions
 
-    def _get_common_filter_condition(self, common_filter: str) -> str:
-        now = int(datetime.utcnow().timestamp())  # Use seconds instead of milliseconds
+    def _get_common_filter_condition(self, common_filter: str, now: Optional[int] = None) -> str:
+        # A fixed `now` keeps the condition, and so the query's cache key, the same across reruns
+        if now is None:
+            now = int(datetime.utcnow().timestamp())  # Use seconds instead of milliseconds
         if common_filter == 'Last 24 hours':
             start_time = now - 24 * 60 * 60
         elif common_filter == 'Last 7 days':
@@ -125,25 +208,180 @@ class SubgraphConnector:
         print(f"Generated unique traders query: {query}")  # Debug print
         return query.strip()
 
-    def query_subgraph(self, query: str) -> Dict[str, Any]:
-        url = self.get_active_subgraph_url()
+    def query_subgraph(self, query: str, endpoint: Optional[str] = None, use_cache: bool = True,
+                       max_retries: int = 3, block: Optional[int] = None, store: bool = True) -> Dict[str, Any]:
+        """
+        Run a GraphQL query against an endpoint.
+
+        Identical queries already in flight for the same endpoint are not sent again; the
+        callers share that response. Results are cached for RESULT_CACHE_TTL seconds.
+
+        :param endpoint: Subgraph name or URL; defaults to the current subgraph
+        :param use_cache: False always asks the endpoint (polling for new data)
+        :param max_retries: Attempts for network errors and retryable GraphQL errors
+        :param block: Read at this block number (see get_indexed_block). Pinned results
+                      never change, so they are cached without a TTL.
+        :param store: False does not cache the result (the caller keeps it, as fetch_fresh does)
+        :raises RetryableQueryError: The endpoint stayed overloaded or unreachable for every attempt
+        :raises PermanentQueryError: The query was rejected
+        """
+        name, url = self.resolve_endpoint(endpoint)
+        if not url:
+            raise ValueError(f"No URL configured for subgraph {name}")
+        if block is not None:
+            query = self.query_builder.pin_to_block(query, block)
+        return self.result_cache.fetch(self.result_cache.key(query, url),
+                                       lambda: self.send_query(query, name, url, max_retries),
+                                       use_cache, permanent=block is not None, store=store)
+
+    def get_indexed_block(self, endpoint: Optional[str] = None) -> int:
+        """Latest block the endpoint has indexed; pass it as `block` to read a consistent snapshot."""
+        return self.probe_block(endpoint)['number']
+
+    def probe_block(self, endpoint: Optional[str] = None, number: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Ask the endpoint for its indexed head with a tiny _meta query.
+
+        :param number: Ask for this earlier block instead, e.g. to see whether its hash changed in a reorg
+        :return: {'number': int, 'hash': str, 'timestamp': int or None (older graph-node versions)};
+                 the head is also kept in last_blocks under the endpoint URL
+        """
+        _, url = self.resolve_endpoint(endpoint)
+        query = PROBE_QUERY_NO_TIME if url in self.no_block_time else PROBE_QUERY
+        try:
+            block = self.query_subgraph(query, endpoint, use_cache=False, block=number, store=False)['_meta']['block']
+        except PermanentQueryError:
+            if query == PROBE_QUERY_NO_TIME:
+                raise
+            self.no_block_time.add(url)
+            block = self.query_subgraph(PROBE_QUERY_NO_TIME, endpoint, use_cache=False, block=number,
+                                        store=False)['_meta']['block']
+        timestamp = block.get('timestamp')
+        block = {'number': int(block['number']), 'hash': block.get('hash'),
+                 'timestamp': int(timestamp) if timestamp is not None else None}
+        if number is None:
+            with self.endpoint_lock:
+                self.last_blocks[url] = block
+        return block
+
+    def fetch_fresh(self, entity: str, fields: List[str], where_conditions: Optional[List[str]] = None,
+                    endpoint: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Every row matching the conditions, refetching as little as possible.
+
+        The rows of the last FRESH_RESULTS_SIZE reads are kept with the block they were read
+        at. A repeat read first probes the endpoint's head: if it is the same block nothing
+        else is sent. If the head moved forward and the kept block still has its hash, only
+        entities changed since then are fetched and merged in by id (see fetch_changes).
+        Otherwise (a reorg, an endpoint without _change_block) the rows are read in full.
+        Entities removed from the subgraph never show up as changed, so a read is also done
+        in full once the kept one is FRESH_FULL_READ_INTERVAL seconds old.
+        """
+        _, url = self.resolve_endpoint(endpoint)
+        if 'id' not in fields:
+            fields = ['id'] + list(fields)
+        key = (url, entity, tuple(fields), tuple(where_conditions or []))
+        head = self.probe_block(endpoint)
+        with self.endpoint_lock:
+            entry = self.fresh_results.get(key)
+
+        if entry is not None and entry['block'] == head:
+            print(f"No new block on {url} since {head['number']}; reusing {len(entry['rows'])} rows")
+            return list(entry['rows'].values())
+
+        now = time.time()
+        rows = None
+        if (entry is not None and head['number'] > entry['block']['number'] and url not in self.no_change_block
+                and now - entry['full_read_at'] < FRESH_FULL_READ_INTERVAL):
+            try:
+                kept = self.probe_block(endpoint, entry['block']['number'])
+                if kept['hash'] != entry['block']['hash']:
+                    print(f"Block {kept['number']} on {url} was reorganized; reading all rows again")
+                else:
+                    rows = self.fetch_changes(entity, fields, where_conditions, endpoint, entry, head['number'])
+            except PermanentQueryError as e:
+                # Older graph-node versions do not know _change_block or _meta(block: ...)
+                print(f"Narrowed refetch failed on {url} ({str(e)}); falling back to full reads")
+                self.no_change_block.add(url)
+
+        if rows is None:
+            rows = {row['id']: row for page in self.iter_pages(entity, fields, where_conditions, endpoint=endpoint,
+                                                               block=head['number'], store=False)
+                    for row in page}
+            full_read_at = now
+        else:
+            full_read_at = entry['full_read_at']
+        with self.endpoint_lock:
+            self.fresh_results[key] = {'block': head, 'rows': rows, 'full_read_at': full_read_at}
+        return list(rows.values())
+
+    def fetch_changes(self, entity: str, fields: List[str], where_conditions: Optional[List[str]],
+                      endpoint: Optional[str], entry: Dict[str, Any], head_number: int) -> Dict[str, Dict[str, Any]]:
+        """
+        The rows of a fetch_fresh entry brought forward to head_number.
+
+        Rows changed since the entry's block that match the conditions are fetched with
+        _change_block: { number_gte: ... } and replace the kept ones. A kept row can also
+        change so that it no longer matches (an amount drops below a filter); those are found
+        by asking which kept ids changed, without the conditions, and dropped.
+
+        :return: {id: row}, ordered by id
+        """
+        since = f"_change_block: {{ number_gte: {entry['block']['number'] + 1} }}"
+        where = list(where_conditions or []) + [since]
+        changed = {row['id']: row for page in self.iter_pages(entity, fields, where, endpoint=endpoint,
+                                                              block=head_number, store=False)
+                   for row in page}
+        rows = dict(entry['rows'])
+        dropped = 0
+        if where_conditions:
+            kept_ids = list(rows)
+            for start in range(0, len(kept_ids), MAX_QUERY_LIMIT):
+                ids = ", ".join(json.dumps(row_id) for row_id in kept_ids[start:start + MAX_QUERY_LIMIT])
+                for page in self.iter_pages(entity, ['id'], [f"id_in: [{ids}]", since], endpoint=endpoint,
+                                            block=head_number, store=False):
+                    for row in page:
+                        if row['id'] not in changed:
+                            del rows[row['id']]
+                            dropped += 1
+        print(f"{len(changed)} rows changed and {dropped} stopped matching between blocks "
+              f"{entry['block']['number']} and {head_number}")
+        rows.update(changed)
+        return dict(sorted(rows.items())) if changed else rows
+
+    def send_query(self, query: str, name: str, url: str, max_retries: int = 3) -> Dict[str, Any]:
+        session = self.get_endpoint_session(url)
+        traffic = self.traffic.get(url, name)
         print(f"Querying subgraph URL: {url}")
 
-        max_retries = 3
         retry_delay = 1
 
         for attempt in range(max_retries):
             try:
-                response = self.session.post(url, json={'query': query}, timeout=API_TIMEOUT)
+                with traffic.request() as outcome:
+                    try:
+                        response = session.post(url, json={'query': query}, timeout=API_TIMEOUT)
+                    except (Timeout, RequestsConnectionError):
+                        outcome['overloaded'] = True
+                        raise
+                    if response.status_code in OVERLOAD_STATUSES:
+                        outcome['overloaded'] = True
+                    elif response.status_code >= 500:
+                        outcome['failed'] = True
+                    data = response.json() if response.ok else None
+                    error_message = None
+                    if data is not None and 'errors' in data:
+                        error_message = data['errors'][0]['message'] if data['errors'] else "Unknown error occurred"
+                        error = classify_graphql_error(error_message)
+                        # An indexer timeout counts against the endpoint like a 503 would
+                        outcome['overloaded'] = isinstance(error, RetryableQueryError)
                 response.raise_for_status()
-                data = response.json()
 
                 print(f"Raw response data: {data}")
 
-                if 'errors' in data:
-                    error_message = data['errors'][0]['message'] if data['errors'] else "Unknown error occurred"
+                if error_message is not None:
                     print(f"GraphQL error: {error_message}")
-                    raise ValueError(ERROR_MESSAGES['api_error'].format(error_message))
+                    raise error
                 
                 if 'data' not in data:
                     print("No data returned in the response")
@@ -151,18 +389,146 @@ class SubgraphConnector:
 
                 return self.process_query_results(data['data'])
 
-            except RequestException as e:
+            except CircuitOpenError:
+                raise
+            except (RequestException, RetryableQueryError) as e:
+                status = e.response.status_code if isinstance(e, HTTPError) and e.response is not None else None
+                if status is not None and status < 500 and status not in OVERLOAD_STATUSES:
+                    raise PermanentQueryError(ERROR_MESSAGES['api_error'].format(str(e))) from e
                 if attempt < max_retries - 1:
-                    print(f"Network error occurred. Retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
+                    delay = self.retry_after(e) or retry_delay
+                    print(f"{'Indexer' if isinstance(e, RetryableQueryError) else 'Network'} error occurred. "
+                          f"Retrying in {delay} seconds...")
+                    time.sleep(delay)
                     retry_delay *= 2
+                elif isinstance(e, RetryableQueryError):
+                    raise
                 else:
-                    raise Exception(f"Network error after {max_retries} attempts: {str(e)}")
+                    raise RetryableQueryError(f"Network error after {max_retries} attempts: {str(e)}") from e
             except Exception as e:
                 print(f"Error in query_subgraph: {str(e)}")
                 print(f"Query: {query}")
                 raise
 
+    @staticmethod
+    def retry_after(error: Exception) -> Optional[float]:
+        response = getattr(error, 'response', None)
+        if response is None:
+            return None
+        try:
+            return min(float(response.headers.get('Retry-After', '')), API_TIMEOUT)
+        except ValueError:
+            return None
+
+    def federate(self, fetch: Callable[[str], Dict[str, Any]], endpoints: Optional[List[str]] = None,
+                 max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Run one logical query against several endpoints concurrently and merge the results.
+
+        :param fetch: Called once per endpoint name with that endpoint; returns a result dict
+        :param endpoints: Endpoint names or URLs; defaults to every configured subgraph
+        :return: Lists from all endpoints concatenated with each row tagged with its '_source';
+                 other values as {source: value}; failed endpoints under '_errors'
+        """
+        endpoints = endpoints or self.get_federation_endpoints()
+        if not endpoints:
+            raise ValueError("No subgraph endpoints are configured")
+        with ThreadPoolExecutor(max_workers=max_workers or len(endpoints)) as executor:
+            futures = {endpoint: executor.submit(fetch, endpoint) for endpoint in endpoints}
+
+        merged = {}
+        errors = {}
+        for endpoint, future in futures.items():
+            try:
+                result = future.result()
+            except Exception as e:
+                errors[endpoint] = str(e)
+                continue
+            for key, value in result.items():
+                if isinstance(value, list):
+                    merged.setdefault(key, []).extend(
+                        {**row, '_source': endpoint} if isinstance(row, dict) else row for row in value)
+                else:
+                    merged.setdefault(key, {})[endpoint] = value
+        if errors:
+            if len(errors) == len(endpoints):
+                raise Exception("All endpoints failed: " + "; ".join(f"{name}: {error}" for name, error in errors.items()))
+            merged['_errors'] = errors
+        return merged
+
+    def query_federated(self, query: str, endpoints: Optional[List[str]] = None) -> Dict[str, Any]:
+        return self.federate(lambda endpoint: self.query_subgraph(query, endpoint), endpoints)
+
+    @staticmethod
+    def get_collection_name(entity: str) -> str:
+        collection = entity[0].lower() + entity[1:]
+        if collection.endswith('y'):
+            return collection[:-1] + 'ies'
+        return collection + 's'
+
+    def iter_pages(self, entity: str, fields: List[str], where_conditions: Optional[List[str]] = None,
+                   page_size: int = MAX_QUERY_LIMIT, max_rows: Optional[int] = None,
+                   endpoint: Optional[str] = None, block: Optional[int] = None,
+                   store: Optional[bool] = None, use_cache: bool = True) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Fetch every row matching the conditions, one page at a time.
+
+        :param entity: Entity name (e.g. 'Swap', 'PoolDayData')
+        :param fields: Fields to select; 'id' is always added since it is the cursor
+        :param where_conditions: GraphQL where conditions
+        :param page_size: Rows per request. When a page fails with a RetryableQueryError
+                          (indexer timeout or overload) it is retried at half the size, down
+                          to MIN_PAGE_SIZE; after PAGE_GROW_AFTER good pages the size doubles
+                          again, up to page_size.
+        :param max_rows: Stop after this many rows
+        :param endpoint: Subgraph name or URL to query; defaults to the current subgraph
+        :param block: Read every page at this block number so pages cannot straddle blocks
+        :param store: Whether pages go to the result cache. By default only a read that fits
+                      in one page (max_rows <= page_size) is cached; the pages of longer
+                      reads would only push out other entries.
+        :param use_cache: False skips cached pages and reads every page from the subgraph
+        :return: Iterator over lists of rows
+        """
+        collection = self.get_collection_name(entity)
+        if 'id' not in fields:
+            fields = ['id'] + list(fields)
+        if store is None:
+            store = max_rows is not None and max_rows <= page_size
+
+        last_id = None
+        fetched = 0
+        current_size = page_size
+        good_pages = 0
+        while True:
+            first = current_size if max_rows is None else min(current_size, max_rows - fetched)
+            if first <= 0:
+                return
+            query = self.query_builder.build_page_query(collection, fields, where_conditions, first, last_id)
+            # Above the minimum a failure is answered by shrinking the page, not by resending it
+            can_shrink = current_size > MIN_PAGE_SIZE
+            try:
+                rows = self.query_subgraph(query, endpoint, use_cache=use_cache,
+                                           max_retries=1 if can_shrink else 3,
+                                           block=block, store=store).get(collection, [])
+            except RetryableQueryError as e:
+                if not can_shrink:
+                    raise
+                current_size = max(MIN_PAGE_SIZE, current_size // 2)
+                good_pages = 0
+                print(f"Page of {first} {collection} failed ({str(e)}); retrying with {current_size}")
+                continue
+            if not rows:
+                return
+            fetched += len(rows)
+            yield rows
+            good_pages += 1
+            if current_size < page_size and good_pages >= PAGE_GROW_AFTER:
+                current_size = min(page_size, current_size * 2)
+                good_pages = 0
+            if len(rows) < first:
+                return
+            last_id = rows[-1]['id']
+
     def process_query_results(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Process the query results before returning them.
@@ -187,19 +553,22 @@ class SubgraphConnector:
         print(f"Combined query: {combined_query}")
         return self.query_subgraph(combined_query)
 
-    def query_unique_traders(self, pool_address: str, days: int = 180, interval: int = 30):
-        query = self.query_builder.build_custom_unique_traders_query(pool_address, days, interval)
-        raw_data = self.query_subgraph(query)
+    def query_unique_traders(self, pool_address: str, days: int = 180, interval: int = 30,
+                             endpoint: Optional[str] = None, block: Optional[int] = None, now: Optional[int] = None):
+        """
+        :param block: Read at this block number (see get_indexed_block)
+        :param now: End of the period; defaults to the current time. Pass a fixed value to rerun the same query.
+        """
+        query = self.query_builder.build_custom_unique_traders_query(pool_address, days, interval, now)
+        raw_data = self.query_subgraph(query, endpoint, block=block)
 
         swaps = raw_data.get('swaps', [])
         
         print(f"Debug: Received {len(swaps)} swaps")
         
-        total_unique_traders = set()
-        interval_traders = defaultdict(set)
         processed_swaps = []
         
-        end_timestamp = int(time.time())
+        end_timestamp = int(time.time()) if now is None else now
         start_timestamp = end_timestamp - (days * 86400)
         
         print(f"Debug: Start timestamp: {start_timestamp}, End timestamp: {end_timestamp}")
@@ -210,33 +579,82 @@ class SubgraphConnector:
             
             print(f"Debug: Processing swap - Trader: {trader}, Timestamp: {timestamp}")
             processed_swaps.append({'trader': trader, 'timestamp': timestamp})
-            
-            if timestamp < start_timestamp:
-                print(f"Debug: Skipping swap (timestamp too old)")
-                continue
-            
-            total_unique_traders.add(trader)
-            
-            interval_index = (timestamp - start_timestamp) // (interval * 86400)
-            interval_traders[interval_index].add(trader)
         
-        print(f"Debug: Total unique traders: {len(total_unique_traders)}")
-        print(f"Debug: Intervals: {dict(interval_traders)}")
+        total_unique_traders, interval_data = self.count_unique_traders(
+            processed_swaps, start_timestamp, end_timestamp, interval)
+        print(f"Debug: Total unique traders: {total_unique_traders}")
         
         results = {
-            'total_unique_traders': len(total_unique_traders),
-            'interval_data': [
-                {
-                    'start_date': datetime.fromtimestamp(start_timestamp + (i * interval * 86400)).strftime('%Y-%m-%d'),
-                    'end_date': datetime.fromtimestamp(min(start_timestamp + ((i+1) * interval * 86400), end_timestamp)).strftime('%Y-%m-%d'),
-                    'unique_traders': len(traders)
-                }
-                for i, traders in sorted(interval_traders.items())
-            ],
+            'total_unique_traders': total_unique_traders,
+            'interval_data': interval_data,
             'total_swaps': len(swaps),
             'start_timestamp': start_timestamp,
             'end_timestamp': end_timestamp,
             'processed_swaps': processed_swaps
         }
         
-        return results
\ No newline at end of file
+        return results
+
+    @staticmethod
+    def count_unique_traders(processed_swaps: List[Dict[str, Any]], start_timestamp: int, end_timestamp: int,
+                             interval: int):
+        """
+        Distinct traders over the whole period and per interval of `interval` days.
+
+        :param processed_swaps: {'trader', 'timestamp'} rows; those before start_timestamp are skipped
+        :return: (total unique traders, interval_data rows)
+        """
+        total_unique_traders = set()
+        interval_traders = defaultdict(set)
+        for swap in processed_swaps:
+            if swap['timestamp'] < start_timestamp:
+                continue
+            total_unique_traders.add(swap['trader'])
+            interval_index = (swap['timestamp'] - start_timestamp) // (interval * 86400)
+            interval_traders[interval_index].add(swap['trader'])
+        interval_data = [
+            {
+                'start_date': datetime.fromtimestamp(start_timestamp + (i * interval * 86400)).strftime('%Y-%m-%d'),
+                'end_date': datetime.fromtimestamp(min(start_timestamp + ((i+1) * interval * 86400), end_timestamp)).strftime('%Y-%m-%d'),
+                'unique_traders': len(traders)
+            }
+            for i, traders in sorted(interval_traders.items())
+        ]
+        return len(total_unique_traders), interval_data
+
+    def merge_unique_traders(self, results: Dict[str, Any], interval: int) -> Dict[str, Any]:
+        """
+        Combine federated query_unique_traders() results.
+
+        A trader active on several subgraphs is counted once: the totals and intervals are
+        recounted over the traders of all sources. The per-source figures stay available as
+        'total_unique_traders_by_source' and 'interval_data_by_source' (rows tagged '_source').
+        """
+        start_timestamp = min(results['start_timestamp'].values())
+        end_timestamp = max(results['end_timestamp'].values())
+        total, interval_data = self.count_unique_traders(
+            results.get('processed_swaps', []), start_timestamp, end_timestamp, interval)
+        results['total_unique_traders_by_source'] = results['total_unique_traders']
+        results['interval_data_by_source'] = results.get('interval_data', [])
+        results['total_unique_traders'] = total
+        results['interval_data'] = interval_data
+        return results
+
+    def query_price_candles(self, pool_address: str, resolution: str = '1h', days: int = 30,
+                            price_source: str = 'amounts'):
+        end_timestamp = int(time.time())
+        start_timestamp = end_timestamp - (days * 86400)
+
+        builder = CandleBuilder(pool_address, resolution, price_source)
+        candles = builder.build(self, start_timestamp, end_timestamp)
+
+        print(f"Debug: Built {len(candles)} {resolution} candles")
+
+        return {
+            'pool': pool_address,
+            'resolution': resolution,
+            'price_source': price_source,
+            'start_timestamp': start_timestamp,
+            'end_timestamp': end_timestamp,
+            'candles': candles.to_dict('records')
+        }
@@ -0,0 +1,192 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+import pandas as pd
+from config import TOKEN_CACHE_FILE, TOKEN_PRICE_TTL, EVMOS_DICTIONARY_PATH, MAX_QUERY_LIMIT
+
+# Static metadata, kept for good once fetched
+TOKEN_FIELDS = ['id', 'symbol', 'name', 'decimals']
+# Token price in ETH; changes with every swap, so it is refetched after TOKEN_PRICE_TTL
+PRICE_FIELDS = ['id', 'derivedETH']
+
+# Columns that reference a token in the entities this app fetches
+TOKEN_COLUMNS = ['token0', 'token1', 'token']
+
+def _token_ids(values: pd.Series) -> pd.Series:
+    # References arrive either as plain ids or as nested { id ... } objects
+    present = values.dropna()
+    if len(present) and isinstance(present.iloc[0], dict):
+        values = values.str.get('id')
+    return values.astype(object).str.lower()
+
+class TokenCache:
+    """
+    Persistent token address -> {symbol, name, decimals} map, plus derivedETH prices.
+
+    Starts from the tokens in the bundled dictionary and the cache file, and fills the
+    gaps lazily: resolve() sends every unknown address of a batch in one
+    tokens(where: {id_in: [...]}) query per MAX_QUERY_LIMIT addresses. enrich() then
+    labels whole frames with a single vectorized lookup per token column, including the
+    token's current derivedETH price.
+
+    Prices are kept apart from the metadata with the time they were fetched;
+    resolve_prices() refetches those older than TOKEN_PRICE_TTL, for dictionary tokens too.
+    """
+
+    def __init__(self, path: str = TOKEN_CACHE_FILE, price_ttl: float = TOKEN_PRICE_TTL):
+        self.path = path
+        self.price_ttl = price_ttl
+        self.lock = threading.RLock()
+        self.tokens: Dict[str, Dict[str, Any]] = {}
+        self.prices: Dict[str, Dict[str, Any]] = {}
+        self.missing = set()
+        self._frame = None
+        self.load()
+
+    def load(self):
+        try:
+            with open(EVMOS_DICTIONARY_PATH, 'r') as f:
+                for token in json.load(f).get('tokens', []):
+                    if token.get('address'):
+                        self.tokens[token['address'].lower()] = {
+                            'symbol': token.get('symbol'),
+                            'name': token.get('name'),
+                            'decimals': token.get('decimals')
+                        }
+        except (OSError, ValueError):
+            pass
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                if 'tokens' not in data:
+                    # Older caches held address -> metadata with a derivedETH of unknown age
+                    data = {'tokens': data, 'prices': {}}
+                for address, token in data['tokens'].items():
+                    self.tokens[address] = {field: token.get(field) for field in TOKEN_FIELDS if field != 'id'}
+                self.prices.update(data.get('prices', {}))
+            except (OSError, ValueError, AttributeError):
+                print(f"Token cache at {self.path} is unreadable; starting empty")
+
+    def save(self):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'tokens': self.tokens, 'prices': self.prices}, f)
+        os.replace(temp_path, self.path)
+
+    def get(self, address: str) -> Optional[Dict[str, Any]]:
+        return self.tokens.get(address.lower()) if address else None
+
+    def get_price(self, address: str) -> Optional[float]:
+        """Cached derivedETH of a token, or None if it is unknown or older than the TTL."""
+        price = self.prices.get(address.lower()) if address else None
+        if price is None or time.time() - price['fetched_at'] > self.price_ttl:
+            return None
+        return price['derivedETH']
+
+    def update(self, rows: Iterable[Dict[str, Any]]):
+        with self.lock:
+            for row in rows:
+                self.tokens[row['id'].lower()] = {field: row.get(field) for field in TOKEN_FIELDS if field != 'id'}
+            self._frame = None
+
+    def resolve(self, connector, addresses: Iterable[str]) -> int:
+        """
+        Fetch metadata for every address not cached yet.
+
+        :return: Number of tokens fetched
+        """
+        with self.lock:
+            unknown = sorted({address.lower() for address in addresses if isinstance(address, str)}
+                             - self.tokens.keys() - self.missing)
+        fetched = 0
+        for start in range(0, len(unknown), MAX_QUERY_LIMIT):
+            batch = unknown[start:start + MAX_QUERY_LIMIT]
+            rows = self.fetch(connector, batch, TOKEN_FIELDS)
+            self.update(rows)
+            fetched += len(rows)
+            with self.lock:
+                # Remember ids the subgraph does not know so they are not asked for again
+                self.missing.update(set(batch) - {row['id'].lower() for row in rows})
+        if fetched:
+            with self.lock:
+                self.save()
+        return fetched
+
+    def resolve_prices(self, connector, addresses: Iterable[str]) -> Dict[str, Optional[float]]:
+        """
+        derivedETH of each address, refetching the prices missing or older than the TTL.
+
+        :return: Dict of lowercased address to derivedETH (None when the subgraph has no price)
+        """
+        addresses = {address.lower() for address in addresses if isinstance(address, str)}
+        now = time.time()
+        with self.lock:
+            stale = sorted(address for address in addresses - self.missing
+                           if address not in self.prices or now - self.prices[address]['fetched_at'] > self.price_ttl)
+        for start in range(0, len(stale), MAX_QUERY_LIMIT):
+            rows = self.fetch(connector, stale[start:start + MAX_QUERY_LIMIT], PRICE_FIELDS)
+            with self.lock:
+                for row in rows:
+                    derived = row.get('derivedETH')
+                    self.prices[row['id'].lower()] = {'derivedETH': float(derived) if derived is not None else None,
+                                                      'fetched_at': now}
+        if stale:
+            with self.lock:
+                self.save()
+        with self.lock:
+            return {address: (self.prices.get(address) or {}).get('derivedETH') for address in addresses}
+
+    @staticmethod
+    def fetch(connector, addresses: List[str], fields: List[str]) -> List[Dict[str, Any]]:
+        where = connector.query_builder._build_filter_string({'id_in': addresses})
+        query = connector.query_builder.build_page_query('tokens', fields, [where], len(addresses))
+        # Prices go stale within seconds; only static metadata may come from the result cache
+        return connector.query_subgraph(query, use_cache='derivedETH' not in fields).get('tokens', [])
+
+    def frame(self) -> pd.DataFrame:
+        with self.lock:
+            if self._frame is None:
+                self._frame = pd.DataFrame.from_dict(self.tokens, orient='index',
+                                                     columns=[field for field in TOKEN_FIELDS if field != 'id'])
+            return self._frame
+
+    def enrich(self, df: pd.DataFrame, connector=None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Add <column>_symbol, <column>_decimals and <column>_derivedETH next to each token
+        reference column.
+
+        :param connector: If given, unknown tokens are resolved and stale prices refetched
+                          first; without it only prices younger than the TTL are filled in
+        :param columns: Token reference columns; defaults to those of TOKEN_COLUMNS present in df
+        """
+        columns = [column for column in (columns or TOKEN_COLUMNS)
+                   if column in df.columns and f"{column}_symbol" not in df.columns]
+        if not columns:
+            return df
+        ids = {column: _token_ids(df[column]) for column in columns}
+        addresses = pd.concat(list(ids.values())).dropna().unique()
+        if connector is not None:
+            self.resolve(connector, addresses)
+            prices = self.resolve_prices(connector, addresses)
+        else:
+            prices = {address: self.get_price(address) for address in addresses}
+
+        tokens = self.frame()
+        df = df.copy()
+        for column, column_ids in ids.items():
+            position = df.columns.get_loc(column) + 1
+            df.insert(position, f"{column}_symbol", column_ids.map(tokens['symbol']).to_numpy())
+            df.insert(position + 1, f"{column}_decimals", column_ids.map(tokens['decimals']).to_numpy())
+            df.insert(position + 2, f"{column}_derivedETH", column_ids.map(prices).to_numpy())
+        return df
+
+    def enrich_results(self, results: Dict[str, Any], connector=None) -> Dict[str, Any]:
+        """Enrich every entity list of a {collection: rows} result that references tokens."""
+        for key, value in results.items():
+            if isinstance(value, list) and value and isinstance(value[0], dict) \
+                    and any(column in value[0] for column in TOKEN_COLUMNS):
+                results[key] = self.enrich(pd.DataFrame(value), connector).to_dict('records')
+        return results
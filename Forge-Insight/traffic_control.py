@@ -0,0 +1,189 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from config import (ENDPOINT_MAX_CONCURRENCY, ENDPOINT_MIN_CONCURRENCY, ENDPOINT_INITIAL_CONCURRENCY,
+                    ENDPOINT_RATE_LIMIT, ENDPOINT_BURST, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while an endpoint's circuit is open."""
+
+class TokenBucket:
+    """Allows `rate` requests per second on average and bursts of up to `burst`."""
+
+    def __init__(self, rate: float = ENDPOINT_RATE_LIMIT, burst: int = ENDPOINT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.waiting = 0
+        self.lock = threading.Lock()
+
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        with self.lock:
+            self.waiting += 1
+        try:
+            while True:
+                with self.lock:
+                    self.refill(time.monotonic())
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    delay = (1 - self.tokens) / self.rate
+                time.sleep(delay)
+        finally:
+            with self.lock:
+                self.waiting -= 1
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit.
+
+    Every successful request grows the limit by 1/limit, so it rises by about one per
+    round of requests; a throttled or timed-out request halves it. Requests beyond the
+    limit wait in acquire().
+    """
+
+    def __init__(self, initial: int = ENDPOINT_INITIAL_CONCURRENCY, min_limit: int = ENDPOINT_MIN_CONCURRENCY,
+                 max_limit: int = ENDPOINT_MAX_CONCURRENCY, decrease: float = 0.5):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease = decrease
+        self.in_flight = 0
+        self.waiting = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            self.waiting += 1
+            try:
+                while self.in_flight >= int(self.limit):
+                    self.condition.wait()
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+
+    def release(self, overloaded: bool = False):
+        with self.condition:
+            self.in_flight -= 1
+            if overloaded:
+                self.limit = max(self.min_limit, self.limit * self.decrease)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects requests for
+    `reset_timeout` seconds. Then a single probe request is let through: success closes
+    the circuit, failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.lock = threading.Lock()
+
+    def allow(self, name: str = ''):
+        with self.lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+            raise CircuitOpenError(f"Subgraph {name} is failing; not retrying for {retry_in:.0f} more seconds")
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+class EndpointTraffic:
+    """Circuit breaker, rate limit and concurrency limit guarding one subgraph endpoint."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.breaker = CircuitBreaker()
+        self.bucket = TokenBucket()
+        self.limiter = AdaptiveLimiter()
+        self.requests = 0
+        self.overloads = 0
+
+    @contextmanager
+    def request(self):
+        """
+        Hold a request slot for the duration of the block. The block reports how the
+        request went by setting outcome['failed'] / outcome['overloaded']; an exception
+        escaping it counts as a failure.
+        """
+        self.breaker.allow(self.name)
+        self.bucket.acquire()
+        self.limiter.acquire()
+        outcome = {'failed': False, 'overloaded': False}
+        try:
+            yield outcome
+        except Exception:
+            outcome['failed'] = True
+            raise
+        finally:
+            self.requests += 1
+            if outcome['overloaded']:
+                self.overloads += 1
+            self.limiter.release(overloaded=outcome['overloaded'])
+            if outcome['failed'] or outcome['overloaded']:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'limit': int(self.limiter.limit),
+            'in_flight': self.limiter.in_flight,
+            'queue_depth': self.limiter.waiting + self.bucket.waiting,
+            'circuit': self.breaker.state,
+            'trips': self.breaker.trips,
+            'consecutive_failures': self.breaker.failures,
+            'requests': self.requests,
+            'overloads': self.overloads,
+        }
+
+class TrafficControl:
+    """Registry of EndpointTraffic by endpoint URL."""
+
+    def __init__(self):
+        self.endpoints: Dict[str, EndpointTraffic] = {}
+        self.lock = threading.Lock()
+
+    def get(self, url: str, name: Optional[str] = None) -> EndpointTraffic:
+        with self.lock:
+            if url not in self.endpoints:
+                self.endpoints[url] = EndpointTraffic(name or url)
+            return self.endpoints[url]
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            endpoints = dict(self.endpoints)
+        return {traffic.name: traffic.metrics() for traffic in endpoints.values()}
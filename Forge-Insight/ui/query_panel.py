@@ -1,22 +1,35 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from .ui_utils import CreateToolTip
-from config import SCHEMA, EVMOS_DICTIONARY_PATH, USER_DICTIONARIES_DIR, FAVORITES_FILE, MAX_QUERY_LIMIT
+from data_processor import DataProcessor
+from data_exporter import DataExporter
+from search_index import SearchIndex, SEARCH_RESULT_LIMIT
+from token_cache import TokenCache
+from config import SCHEMA, EVMOS_DICTIONARY_PATH, USER_DICTIONARIES_DIR, FAVORITES_FILE, MAX_QUERY_LIMIT, CANDLE_RESOLUTIONS, LIVE_TAIL_INTERVAL, FRESH_REFRESH_INTERVAL
 import json
 import os
+import threading
 import time
 from datetime import datetime, timedelta
 import re
 
 class QueryPanel(ttk.Frame):
-    def __init__(self, parent, subgraph_connector, query_callback):
+    def __init__(self, parent, subgraph_connector, query_callback, live_callback=None, stop_live_callback=None,
+                 scheduler=None):
         super().__init__(parent)
         self.subgraph_connector = subgraph_connector
+        self.scheduler = scheduler
+        self.refresh_job = None
         self.query_callback = query_callback
+        self.live_callback = live_callback
+        self.stop_live_callback = stop_live_callback
         self.blockchain_data = self.load_evmos_dictionary()
         self.user_dictionaries = self.load_user_dictionaries()
         self.favorites = self.load_favorites()
         self.schema = SCHEMA
+        self.search_indexes = {}
+        self.search_job = None
+        self.token_cache = TokenCache()
         self.setup_ui()
 
     def load_evmos_dictionary(self):
@@ -55,6 +68,27 @@ class QueryPanel(ttk.Frame):
         self.subgraph_combo.bind("<<ComboboxSelected>>", self.on_subgraph_selected)
         CreateToolTip(self.subgraph_combo, "Select the subgraph you want to query")
 
+        source_frame = ttk.Frame(self)
+        source_frame.grid(row=0, column=2, sticky="w", padx=5, pady=5)
+        self.federated_var = tk.BooleanVar(value=False)
+        federated_check = ttk.Checkbutton(source_frame, text="Query all subgraphs", variable=self.federated_var)
+        federated_check.pack(side="left")
+        CreateToolTip(federated_check, "Run Standard and Unique Traders queries against every configured subgraph at once and merge the rows, tagged with their source")
+        self.snapshot_var = tk.BooleanVar(value=False)
+        snapshot_check = ttk.Checkbutton(source_frame, text="Snapshot", variable=self.snapshot_var)
+        snapshot_check.pack(side="left", padx=(10, 0))
+        CreateToolTip(snapshot_check, "Read every page of Standard and Unique Traders queries at one block, so the results are consistent and can be rerun from cache")
+        ttk.Label(source_frame, text="Block:").pack(side="left", padx=(5, 0))
+        self.snapshot_block_var = tk.StringVar()
+        snapshot_block_entry = ttk.Entry(source_frame, textvariable=self.snapshot_block_var, width=12)
+        snapshot_block_entry.pack(side="left")
+        CreateToolTip(snapshot_block_entry, "Block number to read at; leave empty to pin the latest indexed block, which is then kept for reruns")
+        # Settings of the current snapshot, and the block and block time pinned for it per endpoint
+        self.snapshot_key = None
+        self.snapshot_pins = {}
+        self.snapshot_lock = threading.Lock()
+        self.snapshot_var.trace_add("write", lambda *args: setattr(self, "snapshot_key", None))
+
         # Blockchain selection
         ttk.Label(self, text="Select Blockchain:").grid(row=1, column=0, sticky="w", padx=5, pady=5)
         self.blockchain_var = tk.StringVar(value="Evmos")
@@ -121,7 +155,7 @@ class QueryPanel(ttk.Frame):
         # Query Type selection
         ttk.Label(self, text="Query Type:").grid(row=10, column=0, sticky="w", padx=5, pady=5)
         self.query_type = tk.StringVar(value="Standard")
-        self.query_types = ["Standard", "Wallet Overview", "Unique Traders Over Time"]
+        self.query_types = ["Standard", "Wallet Overview", "Unique Traders Over Time", "Price Candles", "Live Tail"]
         self.query_type_combo = ttk.Combobox(self, textvariable=self.query_type, values=self.query_types, state="readonly")
         self.query_type_combo.grid(row=10, column=1, sticky="ew", padx=5, pady=5)
         self.query_type_combo.bind("<<ComboboxSelected>>", self.on_query_type_change)
@@ -136,15 +170,35 @@ class QueryPanel(ttk.Frame):
         self.interval_label = ttk.Label(self, text="Interval (days):")
         self.interval_entry = ttk.Entry(self, textvariable=self.interval_var)
 
+        # Add fields for Price Candles query
+        self.resolution_var = tk.StringVar(value="1h")
+        self.resolution_label = ttk.Label(self, text="Resolution:")
+        self.resolution_combo = ttk.Combobox(self, textvariable=self.resolution_var, values=list(CANDLE_RESOLUTIONS.keys()), state="readonly")
+        CreateToolTip(self.resolution_combo, "Select the candle width")
+
+        # Add fields for Live Tail
+        self.poll_var = tk.StringVar(value=str(LIVE_TAIL_INTERVAL))
+        self.poll_label = ttk.Label(self, text="Poll every (s):")
+        self.poll_entry = ttk.Entry(self, textvariable=self.poll_var)
+        CreateToolTip(self.poll_entry, "Seconds between checks for new swaps")
+
         # Initially hide these fields
         self.days_label.grid(row=11, column=0, padx=5, pady=5)
         self.days_entry.grid(row=11, column=1, padx=5, pady=5)
         self.interval_label.grid(row=12, column=0, padx=5, pady=5)
         self.interval_entry.grid(row=12, column=1, padx=5, pady=5)
+        self.resolution_label.grid(row=12, column=0, padx=5, pady=5)
+        self.resolution_combo.grid(row=12, column=1, padx=5, pady=5)
+        self.poll_label.grid(row=11, column=0, padx=5, pady=5)
+        self.poll_entry.grid(row=11, column=1, padx=5, pady=5)
         self.days_label.grid_remove()
         self.days_entry.grid_remove()
         self.interval_label.grid_remove()
         self.interval_entry.grid_remove()
+        self.resolution_label.grid_remove()
+        self.resolution_combo.grid_remove()
+        self.poll_label.grid_remove()
+        self.poll_entry.grid_remove()
 
         # Advanced Options Frame
         self.advanced_frame = ttk.LabelFrame(self, text="Advanced Options")
@@ -186,7 +240,7 @@ class QueryPanel(ttk.Frame):
         self.search_var = tk.StringVar()
         self.search_entry = ttk.Entry(self, textvariable=self.search_var)
         self.search_entry.grid(row=14, column=1, sticky="ew", padx=5, pady=5)
-        self.search_entry.bind("<KeyRelease>", self.filter_lists)
+        self.search_entry.bind("<KeyRelease>", self.schedule_filter)
 
         # Favorites
         ttk.Button(self, text="Add to Favorites", command=self.add_to_favorites).grid(row=15, column=0, padx=5, pady=5)
@@ -195,8 +249,21 @@ class QueryPanel(ttk.Frame):
         # User dictionary upload
         ttk.Button(self, text="Upload Custom Dictionary", command=self.upload_custom_dictionary).grid(row=16, column=0, columnspan=2, padx=5, pady=5)
 
-        # Query button
-        ttk.Button(self, text="Run Query", command=self.run_query).grid(row=17, column=0, columnspan=2, pady=10)
+        # Query buttons
+        run_frame = ttk.Frame(self)
+        run_frame.grid(row=17, column=0, columnspan=2, pady=10)
+        ttk.Button(run_frame, text="Run Query", command=self.run_query).pack(side="left", padx=5)
+        self.stop_live_button = ttk.Button(run_frame, text="Stop Live Tail", command=self.stop_live_tail, state="disabled")
+        self.stop_live_button.pack(side="left", padx=5)
+        self.stream_button = ttk.Button(run_frame, text="Stream to CSV", command=self.stream_to_csv)
+        self.stream_button.pack(side="left", padx=5)
+        CreateToolTip(self.stream_button, "Write every row matching the entity query straight to a CSV file, page by page")
+        self.keep_fresh_var = tk.BooleanVar(value=False)
+        keep_fresh_check = ttk.Checkbutton(run_frame, text="Keep fresh", variable=self.keep_fresh_var,
+                                           state="normal" if self.scheduler is not None else "disabled")
+        keep_fresh_check.pack(side="left", padx=5)
+        CreateToolTip(keep_fresh_check, "Rerun the Standard query, with its limit and sort, whenever the subgraph indexes a new block")
+        self.keep_fresh_var.trace_add("write", lambda *args: self.keep_fresh_var.get() or self.cancel_refresh())
 
         # Help button
         ttk.Button(self, text="Help", command=self.show_help).grid(row=18, column=0, columnspan=2, pady=10)
@@ -219,6 +286,9 @@ class QueryPanel(ttk.Frame):
     def on_subgraph_selected(self, event=None):
         selected_subgraph = self.subgraph_var.get()
         self.subgraph_connector.set_current_subgraph(selected_subgraph)
+        self.cancel_refresh()
+        # Block numbers belong to one chain; the next snapshot pins the new subgraph's head
+        self.snapshot_block_var.set("")
         self.update_entity_list()
 
     def update_entity_list(self):
@@ -312,13 +382,28 @@ class QueryPanel(ttk.Frame):
         print(f"Updated pools: {self.pool_combo['values']}")
         print(f"Updated tokens: {self.token_combo['values']}")
 
+    def get_search_index(self, blockchain, kind):
+        # Built once per dictionary load; upload_custom_dictionary keeps it current
+        key = (blockchain, kind)
+        if key not in self.search_indexes:
+            entries = self.get_pools(blockchain) if kind == 'pools' else self.get_tokens(blockchain)
+            self.search_indexes[key] = SearchIndex(entries)
+        return self.search_indexes[key]
+
+    def schedule_filter(self, event=None):
+        # Debounced so a burst of keystrokes runs one search
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(150, self.filter_lists)
+
     def filter_lists(self, event=None):
-        search_term = self.search_var.get().lower()
+        self.search_job = None
+        search_term = self.search_var.get()
         blockchain = self.blockchain_var.get()
-        
-        pools = [pool['name'] for pool in self.get_pools(blockchain) if search_term in pool['name'].lower()]
-        tokens = [token['name'] for token in self.get_tokens(blockchain) if search_term in token['name'].lower()]
-        
+
+        pools = [pool['name'] for pool in self.get_search_index(blockchain, 'pools').search(search_term, SEARCH_RESULT_LIMIT)]
+        tokens = [token['name'] for token in self.get_search_index(blockchain, 'tokens').search(search_term, SEARCH_RESULT_LIMIT)]
+
         self.pool_combo['values'] = pools
         self.token_combo['values'] = tokens
 
@@ -363,6 +448,7 @@ class QueryPanel(ttk.Frame):
                     custom_dict = json.load(file)
                     blockchain = custom_dict.get("blockchain")
                     if blockchain:
+                        self.update_search_indexes(blockchain, custom_dict)
                         self.user_dictionaries[blockchain] = custom_dict
                         new_file_path = os.path.join(USER_DICTIONARIES_DIR, f"{blockchain.lower()}_custom.json")
                         with open(new_file_path, 'w') as new_file:
@@ -377,6 +463,17 @@ class QueryPanel(ttk.Frame):
             except Exception as e:
                 messagebox.showerror("Custom Dictionary", f"Error loading dictionary: {str(e)}")
 
+    def update_search_indexes(self, blockchain, custom_dict):
+        if blockchain in self.user_dictionaries:
+            # Replacing a dictionary drops its old entries, so rebuild on next search
+            self.search_indexes.pop((blockchain, 'pools'), None)
+            self.search_indexes.pop((blockchain, 'tokens'), None)
+            return
+        for kind in ('pools', 'tokens'):
+            index = self.search_indexes.get((blockchain, kind))
+            if index is not None:
+                index.add(custom_dict.get(kind, []))
+
     def toggle_query_options(self):
         query_type = self.query_type.get()
         if query_type == "Standard":
@@ -408,20 +505,46 @@ class QueryPanel(ttk.Frame):
 
     def on_query_type_change(self, event):
         selected_query_type = self.query_type.get()
+        self.poll_label.grid_remove()
+        self.poll_entry.grid_remove()
         if selected_query_type == "Unique Traders Over Time":
             self.days_label.grid()
             self.days_entry.grid()
             self.interval_label.grid()
             self.interval_entry.grid()
+            self.resolution_label.grid_remove()
+            self.resolution_combo.grid_remove()
             # Hide or disable other advanced options
             self.time_filter_var.set("")
             self.time_filter_combo.config(state="disabled")
             # Hide or disable other advanced options as needed
+        elif selected_query_type == "Price Candles":
+            self.days_label.grid()
+            self.days_entry.grid()
+            self.interval_label.grid_remove()
+            self.interval_entry.grid_remove()
+            self.resolution_label.grid()
+            self.resolution_combo.grid()
+            self.time_filter_var.set("")
+            self.time_filter_combo.config(state="disabled")
+        elif selected_query_type == "Live Tail":
+            self.days_label.grid_remove()
+            self.days_entry.grid_remove()
+            self.interval_label.grid_remove()
+            self.interval_entry.grid_remove()
+            self.poll_label.grid()
+            self.poll_entry.grid()
+            self.resolution_label.grid()
+            self.resolution_combo.grid()
+            self.time_filter_var.set("")
+            self.time_filter_combo.config(state="disabled")
         else:
             self.days_label.grid_remove()
             self.days_entry.grid_remove()
             self.interval_label.grid_remove()
             self.interval_entry.grid_remove()
+            self.resolution_label.grid_remove()
+            self.resolution_combo.grid_remove()
             # Show or enable other advanced options
             self.time_filter_combo.config(state="normal")
             # Show or enable other advanced options as needed
@@ -449,15 +572,39 @@ class QueryPanel(ttk.Frame):
             messagebox.showerror("Invalid Input", f"Limit must be a positive integer not exceeding {MAX_QUERY_LIMIT}.")
             return
 
+        self.cancel_refresh()
+        if query_type == "Live Tail":
+            self.start_live_tail(address)
+            return
+
+        refresh = None
+        query = None
         try:
+            snapshot = self.resolve_snapshot()
             if query_type == "Unique Traders Over Time":
                 if not address:
                     messagebox.showerror("Invalid Input", "Please provide a pool address for Unique Traders query.")
                     return
                 days = int(self.days_var.get())
                 interval = int(self.interval_var.get())
-                results = self.subgraph_connector.query_unique_traders(address, days, interval)
+                def fetch_traders(endpoint=None):
+                    block, now = self.get_snapshot(endpoint)
+                    return self.subgraph_connector.query_unique_traders(address, days, interval, endpoint, block, now)
+
+                if self.federated_var.get():
+                    results = self.subgraph_connector.federate(fetch_traders)
+                    # Traders active on several subgraphs count once; per-subgraph figures are kept alongside
+                    results = self.subgraph_connector.merge_unique_traders(results, interval)
+                else:
+                    results = fetch_traders()
                 entity = "UniqueTraders"  # Use a custom entity name for this query type
+            elif query_type == "Price Candles":
+                if not address:
+                    messagebox.showerror("Invalid Input", "Please provide a pool address for Price Candles query.")
+                    return
+                days = int(self.days_var.get())
+                results = self.subgraph_connector.query_price_candles(address, self.resolution_var.get(), days)
+                entity = "PriceCandles"
             else:
                 entity = self.entity_var.get()
                 fields = [field for field, var in self.field_vars.items() if var.get()]
@@ -470,19 +617,206 @@ class QueryPanel(ttk.Frame):
                 time_filter = self.time_filter_var.get()
                 custom_filter = self.validate_custom_filter(self.custom_filter_var.get())
 
-                query = self.subgraph_connector.build_query(
-                    entity, fields, address, limit, order_by, order_direction,
-                    time_filter=time_filter, custom_filter=custom_filter
-                )
-                results = self.subgraph_connector.query_subgraph(query)
-            
-            print(f"Query results: {results}")
-            self.query_callback(entity, results)
+                keep_fresh = self.keep_fresh_var.get() and self.scheduler is not None
+                if keep_fresh and snapshot:
+                    messagebox.showerror("Invalid Query", "Keep fresh follows the latest block; switch off Snapshot to use it.")
+                    return
+                def fetch(endpoint=None, use_cache=True):
+                    block, now = self.get_snapshot(endpoint)
+                    where_conditions = self.subgraph_connector.build_where_conditions(
+                        entity, address, time_filter=time_filter, custom_filter=custom_filter, now=now
+                    )
+                    frame = DataProcessor.lazy(self.subgraph_connector, entity, where_conditions, endpoint,
+                                               block, use_cache).select(*fields)
+                    if order_by:
+                        frame = frame.sort(order_by, ascending=(order_direction == "asc"))
+                    return frame.head(limit).to_results()
+
+                def fetch_uncached(endpoint=None):
+                    return fetch(endpoint, use_cache=False)
+
+                read_at = time.time()
+                if self.federated_var.get():
+                    results = self.subgraph_connector.federate(fetch)
+                else:
+                    results = fetch()
+                # Tells the alert rules and the anomaly detector whether the rows are whole series
+                query = {'snapshot': snapshot, 'custom_filter': custom_filter, 'order_by': order_by, 'limit': limit,
+                         'read_at': read_at}
+                if keep_fresh:
+                    # Reruns happen only after the head moved, so they skip the cached responses
+                    if self.federated_var.get():
+                        refresh = lambda: self.subgraph_connector.federate(fetch_uncached)
+                    else:
+                        refresh = fetch_uncached
+
+            self.deliver_results(entity, results, query)
+            if refresh is not None:
+                self.schedule_refresh(entity, refresh, query)
         except Exception as e:
             error_message = f"An error occurred while querying the subgraph: {str(e)}"
             print(f"Error: {error_message}")
             self.show_error("Query Error", error_message)
 
+    def deliver_results(self, entity, results, query=None):
+        failed = results.pop('_errors', None)
+        if failed:
+            messagebox.showwarning("Partial Results", "Some subgraphs failed and are missing from the results:\n"
+                                   + "\n".join(f"{name}: {error}" for name, error in failed.items()))
+        
+        try:
+            # Label token references with symbols and decimals before display and export
+            results = self.token_cache.enrich_results(results, self.subgraph_connector)
+        except Exception as e:
+            print(f"Token metadata lookup failed: {str(e)}")
+
+        print(f"Query results: {results}")
+        self.query_callback(entity, results, query)
+
+    def schedule_refresh(self, entity, refresh, query=None):
+        """
+        Rerun a Keep fresh query on the scheduler whenever the subgraph has indexed a new
+        block, and show the new results. Federated queries rerun when any subgraph has moved.
+        """
+        def job():
+            # A rerun that finishes after a newer one must not pass for the newer TVL reading
+            read_at = time.time()
+            try:
+                results = refresh()
+            except Exception as e:
+                print(f"Refreshing {entity} failed: {str(e)}")
+                return
+            self.after(0, self.deliver_results, entity, results, query and dict(query, read_at=read_at))
+
+        if self.federated_var.get():
+            self.refresh_job = self.scheduler.add_refresh_job(
+                job, FRESH_REFRESH_INTERVAL, self.subgraph_connector,
+                endpoints=self.subgraph_connector.get_federation_endpoints())
+        else:
+            self.refresh_job = self.scheduler.add_refresh_job(job, FRESH_REFRESH_INTERVAL, self.subgraph_connector,
+                                                              self.subgraph_connector.current_subgraph)
+
+    def cancel_refresh(self):
+        if self.refresh_job is not None:
+            self.scheduler.cancel_job(self.refresh_job)
+            self.refresh_job = None
+
+    def stream_to_csv(self):
+        """Export all rows of the entity query to CSV as the pages arrive, without the Results view."""
+        if self.query_type.get() in ("Unique Traders Over Time", "Price Candles", "Live Tail"):
+            messagebox.showerror("Invalid Query", "Stream to CSV is only available for Standard and Wallet Overview queries.")
+            return
+        try:
+            address = self.get_sanitized_address()
+            custom_filter = self.validate_custom_filter(self.custom_filter_var.get())
+            self.resolve_snapshot()
+        except ValueError as e:
+            messagebox.showerror("Invalid Input", str(e))
+            return
+        entity = self.entity_var.get()
+        fields = [field for field, var in self.field_vars.items() if var.get()]
+        if not fields:
+            messagebox.showerror("Invalid Query", "Please select at least one field.")
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=".csv",
+                                                 filetypes=[("CSV files", "*.csv"), ("Gzipped CSV", "*.csv.gz")])
+        if not file_path:
+            return
+        time_filter = self.time_filter_var.get()
+        self.stream_button.config(state="disabled")
+
+        def run():
+            try:
+                block, now = self.get_snapshot()
+                where_conditions = self.subgraph_connector.build_where_conditions(
+                    entity, address, time_filter=time_filter, custom_filter=custom_filter, now=now)
+                pages = self.subgraph_connector.iter_pages(entity, fields, where_conditions, block=block)
+                rows = DataExporter.export_csv_stream(pages, file_path)
+                self.after(0, messagebox.showinfo, "Export Successful", f"{rows} rows exported to {file_path}")
+            except Exception as e:
+                self.after(0, self.show_error, "Export Error", f"An error occurred during export: {str(e)}")
+            finally:
+                self.after(0, lambda: self.stream_button.config(state="normal"))
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def start_live_tail(self, address):
+        if not address:
+            messagebox.showerror("Invalid Input", "Please provide a pool address for Live Tail.")
+            return
+        try:
+            interval = float(self.poll_var.get())
+            if interval <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Invalid Input", "Poll interval must be a positive number of seconds.")
+            return
+        if self.live_callback is None:
+            return
+        self.live_callback(address, self.resolution_var.get(), interval)
+        self.stop_live_button.config(state="normal")
+
+    def stop_live_tail(self):
+        if self.stop_live_callback is not None:
+            self.stop_live_callback()
+        self.stop_live_button.config(state="disabled")
+
+    def resolve_snapshot(self):
+        """
+        Take the Snapshot settings for this run; call on the Tk thread before fetching.
+        Nothing is sent here, get_snapshot() pins the block on the thread that fetches.
+
+        :return: True when Snapshot is on
+        :raises ValueError: The block field does not hold a block number
+        """
+        if not self.snapshot_var.get():
+            key = None
+        elif self.federated_var.get():
+            key = ('federated',)
+        else:
+            text = self.snapshot_block_var.get().strip()
+            if text and not text.isdigit():
+                raise ValueError("Snapshot block must be a block number.")
+            key = (self.subgraph_connector.current_subgraph, int(text) if text else None)
+        with self.snapshot_lock:
+            if key != self.snapshot_key:
+                self.snapshot_key = key
+                self.snapshot_pins = {}
+        return key is not None
+
+    def get_snapshot(self, endpoint=None):
+        """
+        Block to read at and the time that time filters count back from, for the run
+        prepared by resolve_snapshot(); (None, None) when Snapshot is off. Runs on the
+        fetching thread, since pinning asks the endpoint.
+
+        The time is that of the block itself, so a historical block gets the window that
+        ended at it, and reruns send the same query and are served from the pinned cache.
+        An empty block field pins the latest indexed block and writes it into the field,
+        so the next run reads the same block. Federated queries pin each subgraph's head
+        once per snapshot, since block numbers differ between chains.
+        """
+        with self.snapshot_lock:
+            key = self.snapshot_key
+            pin = self.snapshot_pins.get(endpoint)
+        if key is None:
+            return None, None
+        if pin is None:
+            number = key[1] if len(key) == 2 else None
+            block = self.subgraph_connector.probe_block(endpoint, number)
+            # Without a block time (older graph-node) time filters count back from the pinning
+            pin = {'number': block['number'], 'timestamp': block['timestamp'] or int(time.time())}
+            with self.snapshot_lock:
+                if self.snapshot_key == key:
+                    pin = self.snapshot_pins.setdefault(endpoint, pin)
+                    if len(key) == 2 and number is None:
+                        # The next run finds this block in the field and keeps the pin
+                        self.snapshot_key = (key[0], pin['number'])
+                        self.snapshot_pins = {endpoint: pin}
+                        self.after(0, self.snapshot_block_var.set, str(pin['number']))
+        print(f"Reading {endpoint or self.subgraph_connector.current_subgraph} at block {pin['number']}")
+        return pin['number'], pin['timestamp']
+
     def get_sanitized_address(self):
         address = self.address_entry.get().strip()
         if not address:
@@ -534,12 +868,18 @@ class QueryPanel(ttk.Frame):
 
         help_content = """
         Subgraph: Select the subgraph you want to query.
+        Query all subgraphs: Run Standard and Unique Traders queries against every configured subgraph in parallel; rows are tagged with their source. Unique traders are counted once across subgraphs, with per-subgraph counts shown alongside.
+        Keep fresh: Standard queries are rerun, with the same limit and sort, whenever the subgraph indexes a new block. Time filters count from when the query was run. Running another query stops the refresh.
+        Snapshot: Read every page at one block, so multi-page results are consistent and reruns are served from cache. Enter a block number to read history, or leave Block empty to pin the latest indexed block; it is filled in and reused until you change it. Time filters count back from the block's timestamp.
         Blockchain: Choose the blockchain you're interested in.
         Entity: Select the type of data you want to query (e.g., Pool, Token, Swap).
         Fields: Choose the specific data fields you want to retrieve.
         Query Target: Select whether you're querying a specific pool, token, or using a custom address.
         Limit: Set the maximum number of results to return.
-        Query Type: Choose between Standard query or Unique Traders query.
+        Query Type: Choose between Standard query, Unique Traders query, Price Candles or Live Tail.
+        Price Candles: Build OHLCV candles for the selected pool at the chosen resolution.
+        Live Tail: Follow new swaps of the selected pool; unique traders, volume and candles update as they arrive. Stop it with Stop Live Tail.
+        Stream to CSV: Write every row matching a Standard or Wallet Overview query to a CSV file (.csv.gz is compressed) as the pages arrive, without a row limit.
         Advanced Options:
             - Time Filter: Filter results by time range.
             - Custom Filter: Add any custom filtering conditions.
@@ -4,25 +4,40 @@ import json
 import csv
 import pandas as pd
 from .ui_utils import CreateToolTip
+from .table_view import VirtualTable
 from google_sheets_exporter import GoogleSheetsExporter
+from data_exporter import DataExporter
+from activity_grid import HourOfWeekGrid, TickTimeGrid
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from datetime import datetime
 
 class ResultsPanel(ttk.Frame):
-    def __init__(self, parent, visualization_panel):
+    def __init__(self, parent, visualization_panel, pipeline=None):
         super().__init__(parent)
         self.google_sheets_exporter = GoogleSheetsExporter()
         self.visualization_panel = visualization_panel
+        # PluginManager whose post_process and pre_export stages apply to shown and exported rows
+        self.pipeline = pipeline
+        self.table_frames = {}
         self.setup_ui()
 
     def setup_ui(self):
-        self.results_text = tk.Text(self, wrap=tk.WORD, width=80, height=20)
-        self.results_text.pack(expand=True, fill='both', padx=10, pady=10)
-
-        scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.results_text.yview)
-        scrollbar.pack(side="right", fill="y")
-        self.results_text.configure(yscrollcommand=scrollbar.set)
+        # Scalar values of a result (totals, timestamps) are shown as text,
+        # row lists are shown in the virtualized table below
+        self.results_text = tk.Text(self, wrap=tk.WORD, width=80, height=6)
+        self.results_text.pack(fill='x', padx=10, pady=(10, 0))
+
+        table_select_frame = ttk.Frame(self)
+        table_select_frame.pack(fill='x', padx=10, pady=5)
+        ttk.Label(table_select_frame, text="Table:").pack(side="left")
+        self.table_var = tk.StringVar()
+        self.table_combo = ttk.Combobox(table_select_frame, textvariable=self.table_var, state="readonly")
+        self.table_combo.pack(side="left", padx=5)
+        self.table_combo.bind("<<ComboboxSelected>>", self.on_table_selected)
+        CreateToolTip(self.table_combo, "Select which list in the results to show")
+
+        self.table = VirtualTable(self)
+        self.table.pack(expand=True, fill='both', padx=10, pady=(0, 10))
 
         export_frame = ttk.Frame(self)
         export_frame.pack(pady=10)
@@ -51,6 +66,11 @@ class ResultsPanel(ttk.Frame):
         self.credentials_entry.grid(row=1, column=1, padx=5, pady=5, sticky='ew')
         ttk.Button(gs_frame, text="Browse", command=self.browse_credentials).grid(row=1, column=2, padx=5, pady=5)
 
+        self.sheet_sync_var = tk.BooleanVar(value=True)
+        sheet_sync_check = ttk.Checkbutton(gs_frame, text="Only send changed rows", variable=self.sheet_sync_var)
+        sheet_sync_check.grid(row=2, column=1, padx=5, pady=5, sticky='w')
+        CreateToolTip(sheet_sync_check, "Update only the rows that changed since the last export to this sheet")
+
         gs_frame.columnconfigure(1, weight=1)
 
         # Add a frame for the matplotlib figure
@@ -79,17 +99,98 @@ class ResultsPanel(ttk.Frame):
     def display_results(self, entity, results):
         self.results_text.delete('1.0', tk.END)
         self.results = results
+        self.table_frames = {}
 
         if not results:
             self.results_text.insert(tk.END, "No results found.")
+            self.table_combo['values'] = []
+            self.table_var.set("")
+            self.table.clear()
             return
 
-        self.results_text.insert(tk.END, json.dumps(results, indent=2))
+        scalars = {key: value for key, value in results.items() if not isinstance(value, list)}
+        table_keys = [key for key, value in results.items() if isinstance(value, list)]
+        self.results_text.insert(tk.END, f"{entity}\n")
+        for key, value in scalars.items():
+            self.results_text.insert(tk.END, f"{key}: {value}\n")
+        for key in table_keys:
+            self.results_text.insert(tk.END, f"{key}: {len(results[key])} rows\n")
+
+        self.table_combo['values'] = table_keys
+        if table_keys:
+            self.table_var.set(table_keys[0])
+            self.on_table_selected()
+        else:
+            self.table_var.set("")
+            self.table.clear()
+
+        self.prepare_heatmap(results)
 
         # Prepare data for visualization
         if 'interval_data' in results:
             df = pd.DataFrame(results['interval_data'])
             self.visualization_panel.update_data(df, 'start_date', 'unique_traders', 'Unique Traders Over Time')
+        elif 'candles' in results and results['candles']:
+            df = pd.DataFrame(results['candles'])
+            df['start_date'] = pd.to_datetime(df['timestamp'], unit='s')
+            self.visualization_panel.update_data(df, 'start_date', 'close', f"Close Price ({results['resolution']})")
+
+    def start_live(self, title):
+        """Prepare the panel for a live tail; rows then arrive through update_live()."""
+        self.results = {}
+        self.table_frames = {}
+        self.live_title = title
+        self.results_text.delete('1.0', tk.END)
+        self.results_text.insert(tk.END, f"{title}\nWaiting for swaps...\n")
+        self.table_combo['values'] = ['swaps']
+        self.table_var.set('swaps')
+        self.table.clear()
+
+    def update_live(self, new_rows, stats, rows=None):
+        """
+        Show the latest live tail aggregates and add the new swaps to the table.
+
+        :param rows: Every buffered swap; when given the table is rebuilt from it instead
+                     of appended to, which drops the swaps the buffer no longer holds
+        """
+        self.results_text.delete('1.0', tk.END)
+        self.results_text.insert(tk.END, f"{self.live_title}\n")
+        for key, value in stats.items():
+            self.results_text.insert(tk.END, f"{key}: {value}\n")
+        if rows is not None:
+            self.table.set_data(pd.DataFrame(rows))
+        elif new_rows:
+            self.table.append_rows(pd.DataFrame(new_rows))
+
+    def prepare_heatmap(self, results):
+        heatmap = HourOfWeekGrid()
+        for key in ('swaps', 'processed_swaps'):
+            if results.get(key) and 'timestamp' in results[key][0]:
+                heatmap.add_swaps(results[key])
+        if results.get('poolHourDatas') and 'periodStartUnix' in results['poolHourDatas'][0]:
+            heatmap.add_pool_hours(results['poolHourDatas'])
+        if heatmap.grid.size:
+            self.visualization_panel.update_heatmap(heatmap, 'Activity by Hour of Week (UTC)')
+
+        # Ticks of different pools are not comparable, so the tick grid is only built for one pool
+        swaps = [row for key in ('swaps', 'processed_swaps') for row in results.get(key) or []
+                 if isinstance(row, dict) and row.get('tick') is not None and 'timestamp' in row]
+        pools = {row['pool'].get('id') if isinstance(row.get('pool'), dict) else row.get('pool') for row in swaps}
+        tick_heatmap = TickTimeGrid().add_swaps(swaps) if swaps and len(pools) == 1 else None
+        if tick_heatmap is not None and tick_heatmap.grid.size:
+            self.visualization_panel.update_heatmap(tick_heatmap, 'Swaps by Tick and Hour (UTC)', "Tick Heatmap")
+        else:
+            self.visualization_panel.update_heatmap(None, None, "Tick Heatmap")
+
+    def on_table_selected(self, event=None):
+        key = self.table_var.get()
+        if key not in self.table_frames:
+            # Frames are only built for the lists that are actually opened
+            frame = pd.DataFrame(self.results.get(key, []))
+            if self.pipeline is not None:
+                frame = self.pipeline.transform_frame('post_process', frame, {'collection': key})
+            self.table_frames[key] = frame
+        self.table.set_data(self.table_frames[key])
 
     def display_unique_traders(self, results):
         unique_traders = results['uniqueTraders']
@@ -150,6 +251,13 @@ class ResultsPanel(ttk.Frame):
             except Exception as e:
                 tk.messagebox.showerror("Export Error", f"An error occurred during export: {str(e)}")
 
+    def export_batches(self, key):
+        """Chunks of a result list on their way to an export, through the pre_export stage."""
+        batches = DataExporter.iter_chunks(self.results.get(key, []))
+        if self.pipeline is None:
+            return batches
+        return self.pipeline.run_stage('pre_export', batches, {'collection': key})
+
     def export_to_csv(self, file_path):
         if isinstance(self.results, dict) and 'interval_data' in self.results:
             with open(file_path, 'w', newline='') as csvfile:
@@ -174,46 +282,72 @@ class ResultsPanel(ttk.Frame):
                 writer.writerow(["End Timestamp", self.results.get('end_timestamp', 'N/A')])
                 writer.writerow([])
 
-                # Write individual swap information
+                # Write individual swap information, formatted in vectorized chunks
                 writer.writerow(["Individual Swaps"])
                 writer.writerow(["Trader", "Timestamp", "Human Readable Time"])
-                for swap in self.results.get('processed_swaps', []):
-                    human_readable_time = datetime.fromtimestamp(swap['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
-                    writer.writerow([swap['trader'], swap['timestamp'], human_readable_time])
+                DataExporter.write_csv_batches(
+                    csvfile, self.export_batches('processed_swaps'),
+                    header=False, columns=['trader', 'timestamp', 'human_readable_time'])
+
+        elif isinstance(self.results, dict):
+            # Entity and live tail results: the scalar values, then every list under its own heading
+            with open(file_path, 'w', newline='') as csvfile:
+                writer = csv.writer(csvfile)
+                scalars = self.summary_values()
+                if scalars:
+                    writer.writerow(["Summary"])
+                    for key, value in scalars.items():
+                        writer.writerow([key, value])
+                    writer.writerow([])
+                for key, value in self.results.items():
+                    if isinstance(value, list) and value:
+                        writer.writerow([key])
+                        DataExporter.write_csv_batches(csvfile, self.export_batches(key))
+                        writer.writerow([])
 
         else:
             # Handle other data formats or show an error message
             print("Unsupported data format for CSV export")
 
+    def summary_values(self):
+        """Non-list values of the results, with nested ones (per-source figures) as JSON text."""
+        return {key: json.dumps(value) if isinstance(value, (dict, tuple)) else value
+                for key, value in self.results.items() if not isinstance(value, list)}
+
     def export_to_json(self, file_path):
         with open(file_path, 'w') as jsonfile:
             json.dump(self.results, jsonfile, indent=2)
 
     def export_to_excel(self, file_path):
         if isinstance(self.results, dict):
-            with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                # Summary sheet
+            if 'interval_data' in self.results:
                 summary_data = {
                     'Total Unique Traders': [self.results.get('total_unique_traders', 'N/A')],
                     'Total Swaps': [self.results.get('total_swaps', 'N/A')],
                     'Start Timestamp': [self.results.get('start_timestamp', 'N/A')],
                     'End Timestamp': [self.results.get('end_timestamp', 'N/A')]
                 }
-                pd.DataFrame(summary_data).to_excel(writer, sheet_name='Summary', index=False)
+            else:
+                summary_data = {key: [value] for key, value in self.summary_values().items()}
+            sheets = {'Summary': [pd.DataFrame(summary_data)]}
+
+            # Interval data
+            if 'interval_data' in self.results:
+                sheets['Interval Data'] = self.export_batches('interval_data')
+
+            # Processed swaps; large lists continue on 'Processed Swaps (2)', ...
+            if 'processed_swaps' in self.results:
+                sheets['Processed Swaps'] = self.export_batches('processed_swaps')
 
-                # Interval data
-                if 'interval_data' in self.results:
-                    df_interval = pd.DataFrame(self.results['interval_data'])
-                    df_interval.to_excel(writer, sheet_name='Interval Data', index=False)
+            # Every other list (entity rows, live tail swaps and candles) gets a sheet of its own
+            for key, value in self.results.items():
+                if isinstance(value, list) and value and key not in ('interval_data', 'processed_swaps'):
+                    sheets[key.replace('_', ' ').title()[:31]] = self.export_batches(key)
 
-                # Processed swaps
-                if 'processed_swaps' in self.results:
-                    df_swaps = pd.DataFrame(self.results['processed_swaps'])
-                    df_swaps['human_readable_time'] = pd.to_datetime(df_swaps['timestamp'], unit='s').dt.strftime('%Y-%m-%d %H:%M:%S')
-                    df_swaps.to_excel(writer, sheet_name='Processed Swaps', index=False)
+            DataExporter.export_excel_stream(sheets, file_path)
 
         else:
-            pd.DataFrame(self.results).to_excel(file_path, index=False)
+            DataExporter.export_excel_stream({'Sheet1': DataExporter.iter_chunks(self.results)}, file_path)
 
     def export_to_google_sheets(self):
         sheet_id = self.sheet_id_entry.get()
@@ -229,7 +363,7 @@ class ResultsPanel(ttk.Frame):
 
         try:
             updated_cells = self.google_sheets_exporter.export_to_sheets(
-                credentials_path, sheet_id, sheet_name, self.results)
+                credentials_path, sheet_id, sheet_name, self.results, sync=self.sheet_sync_var.get())
             tk.messagebox.showinfo("Export Successful", f"{updated_cells} cells updated in Google Sheets.")
         except Exception as e:
             tk.messagebox.showerror("Export Error", f"An error occurred: {str(e)}")
@@ -0,0 +1,81 @@
+import sqlite3
+import time
+import tkinter as tk
+from tkinter import ttk
+from .ui_utils import CreateToolTip
+from .table_view import VirtualTable
+
+class SqlConsolePanel(ttk.Frame):
+    """Runs SQL against the local store of fetched entities and shows the rows in a VirtualTable."""
+
+    def __init__(self, parent, local_store):
+        super().__init__(parent)
+        self.local_store = local_store
+        self.setup_ui()
+
+    def setup_ui(self):
+        top_frame = ttk.Frame(self)
+        top_frame.pack(fill='x', padx=10, pady=(10, 5))
+
+        ttk.Label(top_frame, text="Tables:").pack(side='left')
+        self.tables_var = tk.StringVar()
+        self.tables_combo = ttk.Combobox(top_frame, textvariable=self.tables_var, state="readonly", width=25)
+        self.tables_combo.pack(side='left', padx=5)
+        self.tables_combo.bind("<<ComboboxSelected>>", self.on_table_selected)
+        self.tables_combo.bind("<Button-1>", lambda event: self.refresh_tables(), add="+")
+        CreateToolTip(self.tables_combo, "Tables of fetched entities; selecting one previews it")
+
+        self.columns_label = ttk.Label(top_frame, text="")
+        self.columns_label.pack(side='left', padx=5, fill='x', expand=True)
+
+        self.sql_text = tk.Text(self, height=6, wrap='word')
+        self.sql_text.pack(fill='x', padx=10)
+        self.sql_text.bind("<Control-Return>", self.run_sql)
+        CreateToolTip(self.sql_text, "SQL to run against the local store (Ctrl+Enter to run)")
+
+        button_frame = ttk.Frame(self)
+        button_frame.pack(fill='x', padx=10, pady=5)
+        ttk.Button(button_frame, text="Run", command=self.run_sql).pack(side='left')
+        self.status_label = ttk.Label(button_frame, text="")
+        self.status_label.pack(side='left', padx=10)
+
+        self.table = VirtualTable(self)
+        self.table.pack(expand=True, fill='both', padx=10, pady=(0, 10))
+
+        self.refresh_tables()
+
+    def refresh_tables(self):
+        self.tables_combo['values'] = self.local_store.tables()
+
+    def report_load_error(self, message):
+        """Say that the latest results are missing from the store, so its tables may be stale."""
+        self.status_label.config(text=f"Latest results were not stored: {message}")
+
+    def on_table_selected(self, event=None):
+        table = self.tables_var.get()
+        if not table:
+            return
+        self.columns_label.config(text=", ".join(self.local_store.columns(table)))
+        self.sql_text.delete('1.0', tk.END)
+        self.sql_text.insert('1.0', f'SELECT * FROM "{table}" LIMIT 1000')
+        self.run_sql()
+
+    def run_sql(self, event=None):
+        sql = self.sql_text.get('1.0', tk.END).strip()
+        if not sql:
+            return "break"
+        start = time.perf_counter()
+        try:
+            df = self.local_store.execute(sql)
+        except sqlite3.Error as e:
+            self.status_label.config(text=f"Error: {e}")
+            return "break"
+        elapsed = (time.perf_counter() - start) * 1000
+        if df is None:
+            self.table.clear()
+            self.status_label.config(text=f"OK ({elapsed:.1f} ms)")
+            self.refresh_tables()
+        else:
+            self.table.set_data(df)
+            self.status_label.config(text=f"{len(df)} rows ({elapsed:.1f} ms)")
+        return "break"
@@ -0,0 +1,218 @@
+import tkinter as tk
+from tkinter import ttk
+import numpy as np
+import pandas as pd
+from .ui_utils import CreateToolTip
+
+class VirtualTable(ttk.Frame):
+    """
+    A column-aware table that only materializes the rows currently on screen.
+
+    Rows are addressed through an index array over the columnar data, so sorting and
+    filtering reorder integers instead of widgets and any result size opens instantly.
+    """
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        self.columns = []
+        self.data = {}
+        self.row_count = 0
+        self.index = np.arange(0)
+        self.offset = 0
+        self.visible_rows = 0
+        self.sort_column = None
+        self.sort_ascending = True
+        self.sort_cache = {}
+        self.filter_mask = None
+        self.setup_ui()
+
+    def setup_ui(self):
+        filter_frame = ttk.Frame(self)
+        filter_frame.pack(fill='x', pady=(0, 5))
+
+        ttk.Label(filter_frame, text="Filter:").pack(side='left')
+        self.filter_column_var = tk.StringVar()
+        self.filter_column_combo = ttk.Combobox(filter_frame, textvariable=self.filter_column_var, state="readonly", width=20)
+        self.filter_column_combo.pack(side='left', padx=5)
+        self.filter_var = tk.StringVar()
+        self.filter_entry = ttk.Entry(filter_frame, textvariable=self.filter_var)
+        self.filter_entry.pack(side='left', fill='x', expand=True, padx=5)
+        self.filter_entry.bind("<Return>", self.apply_filter)
+        self.filter_column_combo.bind("<<ComboboxSelected>>", self.apply_filter)
+        ttk.Button(filter_frame, text="Apply", command=self.apply_filter).pack(side='left')
+        self.row_count_label = ttk.Label(filter_frame, text="")
+        self.row_count_label.pack(side='right', padx=5)
+        CreateToolTip(self.filter_entry, "Show rows whose selected column contains this text")
+
+        table_frame = ttk.Frame(self)
+        table_frame.pack(expand=True, fill='both')
+
+        self.tree = ttk.Treeview(table_frame, show='headings', selectmode='browse')
+        self.tree.pack(side='left', expand=True, fill='both')
+
+        self.scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.pack(side='right', fill='y')
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll_to(self.offset - 3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_to(self.offset + 3))
+        self.tree.bind("<Prior>", lambda event: self.scroll_to(self.offset - self.visible_rows))
+        self.tree.bind("<Next>", lambda event: self.scroll_to(self.offset + self.visible_rows))
+
+    def set_data(self, df):
+        """Show a DataFrame (or anything pandas can turn into one)."""
+        if not isinstance(df, pd.DataFrame):
+            df = pd.DataFrame(df)
+        self.columns = [str(column) for column in df.columns]
+        self.data = {str(column): df[column].to_numpy() for column in df.columns}
+        self.row_count = len(df)
+        self.index = np.arange(self.row_count)
+        self.offset = 0
+        self.sort_column = None
+        self.sort_ascending = True
+        self.sort_cache = {}
+        self.filter_mask = None
+        self.filter_var.set("")
+
+        self.tree['columns'] = self.columns
+        for column in self.columns:
+            self.tree.heading(column, text=column, command=lambda c=column: self.sort_by(c))
+            self.tree.column(column, width=120, stretch=True)
+        self.filter_column_combo['values'] = self.columns
+        if self.columns:
+            self.filter_column_combo.set(self.columns[0])
+
+        self.resize_rows()
+
+    def clear(self):
+        self.set_data(pd.DataFrame())
+
+    def sorted_order(self, column):
+        # argsort over the full column is computed once per column and reused for both directions
+        if column not in self.sort_cache:
+            values = self.data[column]
+            numeric = pd.to_numeric(pd.Series(values), errors='coerce')
+            if numeric.notna().sum() == pd.Series(values).notna().sum():
+                keys = numeric.to_numpy()
+            else:
+                keys = pd.Series(values).astype(str).to_numpy()
+            self.sort_cache[column] = np.argsort(keys, kind='stable')
+        return self.sort_cache[column]
+
+    def sort_by(self, column):
+        if self.sort_column == column:
+            self.sort_ascending = not self.sort_ascending
+        else:
+            self.sort_column = column
+            self.sort_ascending = True
+        for name in self.columns:
+            arrow = ''
+            if name == column:
+                arrow = ' ▲' if self.sort_ascending else ' ▼'
+            self.tree.heading(name, text=name + arrow)
+        self.rebuild_index()
+
+    def apply_filter(self, event=None):
+        column = self.filter_column_var.get()
+        text = self.filter_var.get()
+        if not text or column not in self.data:
+            self.filter_mask = None
+        else:
+            series = pd.Series(self.data[column]).astype(str)
+            self.filter_mask = series.str.contains(text, case=False, regex=False).to_numpy()
+        self.rebuild_index()
+
+    def rebuild_index(self):
+        if self.sort_column is not None:
+            order = self.sorted_order(self.sort_column)
+            if not self.sort_ascending:
+                order = order[::-1]
+        else:
+            order = np.arange(self.row_count)
+        if self.filter_mask is not None:
+            order = order[self.filter_mask[order]]
+        self.index = order
+        self.offset = 0
+        self.refresh()
+
+    def append_rows(self, df):
+        """Append rows without resetting the view; used for incrementally growing results."""
+        if not isinstance(df, pd.DataFrame):
+            df = pd.DataFrame(df)
+        if df.empty:
+            return
+        if not self.columns:
+            self.set_data(df)
+            return
+        for column in self.columns:
+            new_values = df[column].to_numpy() if column in df else np.full(len(df), None, dtype=object)
+            self.data[column] = np.concatenate([self.data[column], new_values])
+        start = self.row_count
+        self.row_count += len(df)
+        self.sort_cache = {}
+        if self.sort_column is None and self.filter_mask is None:
+            self.index = np.concatenate([self.index, np.arange(start, self.row_count)])
+            self.refresh()
+        else:
+            if self.filter_mask is not None:
+                self.apply_filter()
+            else:
+                self.rebuild_index()
+
+    def on_resize(self, event=None):
+        self.resize_rows()
+
+    def resize_rows(self):
+        # Keep exactly one Treeview item per visible row
+        height = max(self.tree.winfo_height(), self.row_height)
+        self.visible_rows = max(1, height // self.row_height - 1)
+        self.refresh()
+
+    def refresh(self):
+        total = len(self.index)
+        self.offset = max(0, min(self.offset, total - self.visible_rows))
+        window = self.index[self.offset:self.offset + self.visible_rows]
+
+        children = self.tree.get_children()
+        if len(children) > len(window):
+            self.tree.delete(*children[len(window):])
+            children = children[:len(window)]
+        for position, row in enumerate(window):
+            values = [self.format_value(self.data[column][row]) for column in self.columns]
+            if position < len(children):
+                self.tree.item(children[position], values=values)
+            else:
+                self.tree.insert('', 'end', values=values)
+
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + len(window)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        self.row_count_label.config(text=f"{total} of {self.row_count} rows")
+
+    @staticmethod
+    def format_value(value):
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return ''
+        if isinstance(value, dict):
+            return value.get('id', str(value))
+        return str(value)
+
+    def scroll_to(self, offset):
+        self.offset = int(offset)
+        self.refresh()
+
+    def on_scrollbar(self, *args):
+        total = len(self.index)
+        if args[0] == 'moveto':
+            self.scroll_to(float(args[1]) * total)
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= self.visible_rows
+            self.scroll_to(self.offset + step)
+
+    def on_mousewheel(self, event):
+        self.scroll_to(self.offset - int(event.delta / 120) * 3)
@@ -1,12 +1,51 @@
 import tkinter as tk
 from tkinter import ttk
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import pandas as pd
-import seaborn as sns
 from .ui_utils import CreateToolTip
 import matplotlib.dates as mdates
 
+# Chart types drawn from an activity_grid grid instead of the x/y columns
+HEATMAP_TYPES = ('Heatmap', 'Tick Heatmap')
+
+def minmax_downsample(y, n_bins):
+    """
+    Reduce a series sorted by x to at most 2 * n_bins points.
+
+    The points are split into n_bins equal-count bins and the positions of the minimum
+    and maximum of each bin are kept, so spikes survive at screen resolution.
+
+    :return: Sorted indices of the points to draw
+    """
+    n = len(y)
+    if n <= 2 * n_bins or n_bins < 1:
+        return np.arange(n)
+
+    per_bin = int(np.ceil(n / n_bins))
+    low = np.full(per_bin * n_bins, np.inf)
+    high = np.full(per_bin * n_bins, -np.inf)
+    low[:n] = np.where(np.isnan(y), np.inf, y)
+    high[:n] = np.where(np.isnan(y), -np.inf, y)
+
+    base = np.arange(n_bins) * per_bin
+    min_index = base + low.reshape(n_bins, per_bin).argmin(axis=1)
+    max_index = base + high.reshape(n_bins, per_bin).argmax(axis=1)
+    indices = np.unique(np.concatenate([min_index, max_index]))
+    return indices[indices < n]
+
+def binned_max(x, y, n_bins):
+    """Collapse a sorted series into at most n_bins bars holding the maximum y of each bin."""
+    n = len(y)
+    if n <= n_bins or n_bins < 1:
+        return x, y
+    per_bin = int(np.ceil(n / n_bins))
+    n_bins = int(np.ceil(n / per_bin))
+    high = np.full(per_bin * n_bins, -np.inf)
+    high[:n] = np.where(np.isnan(y), -np.inf, y)
+    return x[::per_bin], high.reshape(n_bins, per_bin).max(axis=1)
+
 class VisualizationPanel(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent)
@@ -15,6 +54,17 @@ class VisualizationPanel(ttk.Frame):
         self.x_column = None
         self.y_column = None
         self.title = None
+        self.x_values = None
+        self.y_values = None
+        self.x_is_date = False
+        self.artist = None
+        self.artist_type = None
+        self.scatter_offsets = None
+        self.background = None
+        self.resize_job = None
+        self.heatmap = None
+        self.heatmap_title = None
+        self.heatmaps = {}  # chart type -> (grid, title)
         self.setup_ui()
 
     def setup_ui(self):
@@ -22,6 +72,8 @@ class VisualizationPanel(ttk.Frame):
         self.canvas = FigureCanvasTkAgg(self.figure, master=self)
         self.canvas_widget = self.canvas.get_tk_widget()
         self.canvas_widget.pack(expand=True, fill='both')
+        self.canvas_widget.bind("<Configure>", self.on_resize, add="+")
+        self.canvas.mpl_connect('draw_event', self.on_draw)
 
         control_frame = ttk.Frame(self)
         control_frame.pack(pady=10)
@@ -29,29 +81,109 @@ class VisualizationPanel(ttk.Frame):
         ttk.Label(control_frame, text="Chart Type:").grid(row=0, column=0, padx=5)
         self.chart_type_var = tk.StringVar(value="Bar")
         self.chart_type = ttk.Combobox(control_frame, textvariable=self.chart_type_var)
-        self.chart_type['values'] = ['Bar', 'Line', 'Scatter', 'Pie', 'Heatmap']
+        self.chart_type['values'] = ['Bar', 'Line', 'Scatter', 'Pie', 'Heatmap', 'Tick Heatmap']
         self.chart_type.grid(row=0, column=1, padx=5)
         self.chart_type.bind("<<ComboboxSelected>>", self.update_visualization)
+        CreateToolTip(self.chart_type, "Select how the current results are drawn")
 
     def update_data(self, df, x_column, y_column, title):
         self.df = df
         self.x_column = x_column
         self.y_column = y_column
         self.title = title
+        was_date = self.x_is_date
+        self.prepare_series()
+        if self.x_is_date != was_date:
+            # Axis formatting depends on the x type, so start from a clean chart
+            self.artist_type = None
         self.update_visualization()
 
-    def update_visualization(self, event=None):
+    def update_tail(self, df):
+        """
+        Merge the newest points of a growing series and redraw incrementally.
+
+        Points of `df` replace every current point at or after its first x (so a bar that
+        is still open is updated in place) and the rest are appended. Only the data artist
+        is redrawn unless the new points leave the current axis limits.
+
+        :param df: New points with the x and y columns of the last update_data() call
+        """
+        if self.df is None or self.x_values is None or df.empty:
+            return
+        x = df[self.x_column]
+        if self.x_is_date:
+            x_new = mdates.date2num(pd.to_datetime(x).to_numpy())
+        else:
+            x_new = x.to_numpy(dtype=float)
+        y_new = pd.to_numeric(df[self.y_column], errors='coerce').to_numpy(dtype=float)
+        order = np.argsort(x_new, kind='stable')
+        x_new, y_new = x_new[order], y_new[order]
+
+        keep = np.searchsorted(self.x_values, x_new[0], side='left')
+        self.x_values = np.concatenate([self.x_values[:keep], x_new])
+        self.y_values = np.concatenate([self.y_values[:keep], y_new])
+        if self.chart_type_var.get() not in HEATMAP_TYPES:
+            self.fast_redraw()
+
+    def update_heatmap(self, heatmap, title, chart_type="Heatmap"):
+        """
+        Set the activity grid drawn by a heatmap chart type.
+
+        :param heatmap: An activity_grid grid; later add() calls show up on the next redraw.
+                        None removes the grid of that chart type.
+        :param title: Chart title
+        :param chart_type: 'Heatmap' (pool x hour of week) or 'Tick Heatmap' (tick x time)
+        """
+        if heatmap is None:
+            self.heatmaps.pop(chart_type, None)
+        else:
+            self.heatmaps[chart_type] = (heatmap, title)
+        if self.chart_type_var.get() == chart_type:
+            self.update_visualization()
+
+    def prepare_series(self):
+        # Parse dates and sort once per data update; redraws reuse the float arrays
         if self.df is None or self.df.empty:
-            self.clear_visualization()
+            self.x_values = self.y_values = None
             return
 
+        x = self.df[self.x_column]
+        if pd.api.types.is_datetime64_any_dtype(x) or x.dtype == object or pd.api.types.is_string_dtype(x):
+            x = pd.to_datetime(x)
+            self.x_values = mdates.date2num(x.to_numpy())
+            self.x_is_date = True
+        else:
+            self.x_values = x.to_numpy(dtype=float)
+            self.x_is_date = False
+        self.y_values = pd.to_numeric(self.df[self.y_column], errors='coerce').to_numpy(dtype=float)
+
+        if len(self.x_values) > 1 and np.any(np.diff(self.x_values) < 0):
+            order = np.argsort(self.x_values, kind='stable')
+            self.x_values = self.x_values[order]
+            self.y_values = self.y_values[order]
+
+    def screen_bins(self):
+        width = int(self.ax.bbox.width) if self.ax.bbox.width > 1 else 800
+        return max(width, 1)
+
+    def update_visualization(self, event=None):
         chart_type = self.chart_type_var.get()
 
-        try:
-            self.ax.clear()
+        if chart_type in HEATMAP_TYPES:
+            self.draw_heatmap(chart_type)
+            return
+
+        if self.df is None or self.df.empty or self.x_values is None:
+            self.clear_visualization()
+            return
 
-            # Convert 'start_date' to datetime
-            self.df['start_date'] = pd.to_datetime(self.df['start_date'])
+        try:
+            if chart_type != self.artist_type or self.artist is None:
+                self.ax.clear()
+                self.artist = None
+                self.artist_type = chart_type
+                self.set_axis_format()
+            self.set_labels()
 
             if chart_type == "Bar":
                 self.create_bar_chart()
@@ -62,46 +194,170 @@ class VisualizationPanel(ttk.Frame):
             else:
                 raise ValueError(f"Unsupported chart type: {chart_type}")
 
-            self.ax.set_title(self.title)
-            self.ax.set_xlabel(self.x_column)
-            self.ax.set_ylabel(self.y_column)
-            
-            # Format x-axis to show dates nicely
-            self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-            self.ax.xaxis.set_major_locator(mdates.DayLocator())
-            plt.xticks(rotation=45, ha='right')
-
-            plt.tight_layout()
+            self.rescale()
+            self.figure.tight_layout()
             self.canvas.draw()
 
         except Exception as e:
+            self.artist_type = None
             self.show_error("Visualization Error", str(e))
 
+    def set_labels(self):
+        self.ax.set_title(self.title)
+        self.ax.set_xlabel(self.x_column)
+        self.ax.set_ylabel(self.y_column)
+
+    def set_axis_format(self):
+        if self.x_is_date:
+            # Let matplotlib pick a tick density that fits the range instead of one tick per day
+            locator = mdates.AutoDateLocator()
+            self.ax.xaxis.set_major_locator(locator)
+            self.ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+
     def create_bar_chart(self):
-        self.ax.bar(self.df['start_date'], self.df[self.y_column])
+        x, y = binned_max(self.x_values, self.y_values, self.screen_bins() // 2)
+        steps = np.diff(x)
+        steps = steps[steps > 0]
+        width = steps.min() * 0.8 if len(steps) else 0.8
+        # Bar containers cannot be updated in place, so they are replaced
+        if self.artist is not None:
+            self.artist.remove()
+        self.artist = self.ax.bar(x, y, width=width)
 
     def create_line_chart(self):
-        self.ax.plot(self.df['start_date'], self.df[self.y_column], marker='o')
+        index = minmax_downsample(self.y_values, self.screen_bins())
+        x, y = self.x_values[index], self.y_values[index]
+        if self.artist is None:
+            self.artist, = self.ax.plot(x, y, marker='o' if len(x) <= 100 else '', animated=True)
+        else:
+            self.artist.set_data(x, y)
+            self.artist.set_marker('o' if len(x) <= 100 else '')
 
     def create_scatter_plot(self):
-        self.ax.scatter(self.df['start_date'], self.df[self.y_column])
+        index = minmax_downsample(self.y_values, self.screen_bins())
+        offsets = np.column_stack([self.x_values[index], self.y_values[index]])
+        if self.artist is None:
+            self.artist = self.ax.scatter(offsets[:, 0], offsets[:, 1], animated=True)
+        else:
+            self.artist.set_offsets(offsets)
+        self.scatter_offsets = offsets
+
+    def rescale(self):
+        self.ax.relim()
+        if self.artist_type == "Scatter" and self.scatter_offsets is not None:
+            # relim ignores collections, so scatter limits are added explicitly
+            finite = self.scatter_offsets[np.isfinite(self.scatter_offsets).all(axis=1)]
+            self.ax.update_datalim(finite)
+        self.ax.autoscale_view()
+
+    def on_draw(self, event=None):
+        # Animated artists are left out of full draws; cache the background and draw them on top
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.blit_artist()
+
+    def blit_artist(self):
+        if self.artist is None or self.background is None:
+            return
+        if self.artist_type in ("Line", "Scatter"):
+            self.canvas.restore_region(self.background)
+            self.ax.draw_artist(self.artist)
+            self.canvas.blit(self.figure.bbox)
+
+    def fast_redraw(self):
+        """
+        Redraw only the data artist on top of the cached background.
+
+        Falls back to a full redraw when the data no longer fits the current axis limits.
+        """
+        if self.artist is None or self.background is None or self.artist_type not in ("Line", "Scatter"):
+            self.update_visualization()
+            return
+
+        x_low, x_high = self.ax.get_xlim()
+        y_low, y_high = self.ax.get_ylim()
+        finite = self.y_values[np.isfinite(self.y_values)]
+        if (len(self.x_values) and (self.x_values[0] < x_low or self.x_values[-1] > x_high)) or \
+                (len(finite) and (finite.min() < y_low or finite.max() > y_high)):
+            self.update_visualization()
+            return
+
+        if self.artist_type == "Line":
+            self.create_line_chart()
+        else:
+            self.create_scatter_plot()
+        self.blit_artist()
+
+    def on_resize(self, event=None):
+        # Debounced: resampling to the new width happens once the resize settles
+        if self.resize_job is not None:
+            self.after_cancel(self.resize_job)
+        self.resize_job = self.after(100, self.on_resize_done)
+
+    def on_resize_done(self):
+        self.resize_job = None
+        if self.x_values is not None and self.artist is not None:
+            self.update_visualization()
 
     def create_pie_chart(self):
         self.ax.pie(self.df[self.y_column], labels=self.df[self.x_column], autopct='%1.1f%%')
 
-    def create_heatmap(self):
-        sns.heatmap(self.df.pivot(self.x_column, self.y_column, 'value'), ax=self.ax)
+    def draw_heatmap(self, chart_type="Heatmap"):
+        self.heatmap, self.heatmap_title = self.heatmaps.get(chart_type, (None, None))
+        if self.heatmap is None or self.heatmap.grid.size == 0:
+            if chart_type == "Tick Heatmap":
+                self.show_error("Visualization Error", "Tick heatmaps need swaps of a single pool with the tick field.")
+            else:
+                self.show_error("Visualization Error", "These results have no activity grid to draw as a heatmap.")
+            return
+
+        grid = self.heatmap.grid
+        try:
+            if self.artist_type != chart_type or self.artist is None or self.artist.get_array().shape != grid.shape:
+                self.ax.clear()
+                # One rasterized image regardless of the number of cells
+                self.artist = self.ax.imshow(grid, aspect='auto', interpolation='nearest', origin='lower')
+                self.artist_type = chart_type
+                self.set_heatmap_ticks()
+            else:
+                self.artist.set_data(grid)
+            self.artist.set_clim(grid.min(), grid.max() if grid.max() > grid.min() else grid.min() + 1)
+            self.ax.set_title(self.heatmap_title)
+            self.figure.tight_layout()
+            self.canvas.draw()
+        except Exception as e:
+            self.artist_type = None
+            self.show_error("Visualization Error", str(e))
+
+    def set_heatmap_ticks(self, max_ticks=24):
+        rows, cols = self.heatmap.grid.shape
+        col_labels = self.heatmap.col_labels
+        row_labels = self.heatmap.row_labels
+        col_step = max(1, int(np.ceil(cols / max_ticks)))
+        row_step = max(1, int(np.ceil(rows / max_ticks)))
+        self.ax.set_xticks(range(0, cols, col_step))
+        self.ax.set_xticklabels(col_labels[::col_step], rotation=45, ha='right')
+        self.ax.set_yticks(range(0, rows, row_step))
+        self.ax.set_yticklabels([label[:10] for label in row_labels[::row_step]])
 
     def clear_visualization(self):
         self.df = None
         self.entity = None
+        self.x_values = None
+        self.y_values = None
+        self.artist = None
+        self.artist_type = None
+        self.scatter_offsets = None
+        self.background = None
         self.ax.clear()
+        self.heatmap = None
+        self.heatmaps = {}
         self.ax.text(0.5, 0.5, "No data to visualize", ha='center', va='center')
         self.canvas.draw()
 
     def update_preferences(self, font_size, default_query_limit):
         plt.rcParams.update({'font.size': font_size})
+        self.artist_type = None
         self.update_visualization()
 
     def show_error(self, title, message):
-        tk.messagebox.showerror(title, message)
\ No newline at end of file
+        tk.messagebox.showerror(title, message)
@@ -2,19 +2,34 @@ import tkinter as tk
 from tkinter import ttk, messagebox, colorchooser, font
 import json
 import os
-from config import WINDOW_TITLE, WINDOW_SIZE, THEME, SCHEMA
+import pandas as pd
+from config import WINDOW_TITLE, WINDOW_SIZE, THEME, SCHEMA, LIVE_TAIL_BUFFER
 from subgraph_connector import SubgraphConnector
+from local_store import LocalStore
+from live_tail import LiveTail
 from ui.query_panel import QueryPanel
 from ui.results_panel import ResultsPanel
 from ui.visualization_panel import VisualizationPanel
+from ui.sql_console import SqlConsolePanel
+
+# Sorting on these keeps the rows of a limited query contiguous in time
+TIME_ORDER_FIELDS = ('timestamp', 'periodStartUnix', 'date')
 
 class UIManager:
-    def __init__(self, root):
+    def __init__(self, root, plugin_manager=None, alert_engine=None, anomaly_detector=None, scheduler=None):
         self.root = root
+        self.scheduler = scheduler
+        self.plugin_manager = plugin_manager
+        self.alert_engine = alert_engine
+        self.anomaly_detector = anomaly_detector
+        self.live_alerts = []
         self.root.title(WINDOW_TITLE)
         self.root.geometry(WINDOW_SIZE)
         
         self.subgraph_connector = SubgraphConnector()
+        self.local_store = LocalStore()
+        self.live_tail = None
+        self.live_chart_ready = False
         self.setup_ui()
         self.load_preferences()
         self.apply_theme()
@@ -27,18 +42,132 @@ class UIManager:
         self.visualization_panel = VisualizationPanel(self.notebook)
         
         # Now create query_panel and results_panel, passing the visualization_panel to results_panel
-        self.query_panel = QueryPanel(self.notebook, self.subgraph_connector, self.display_results)
-        self.results_panel = ResultsPanel(self.notebook, self.visualization_panel)
+        self.query_panel = QueryPanel(self.notebook, self.subgraph_connector, self.display_results,
+                                      self.start_live_tail, self.stop_live_tail, self.scheduler)
+        self.results_panel = ResultsPanel(self.notebook, self.visualization_panel, self.plugin_manager)
+        self.sql_console = SqlConsolePanel(self.notebook, self.local_store)
         
         # Add panels to notebook
         self.notebook.add(self.query_panel, text="Query")
         self.notebook.add(self.results_panel, text="Results")
         self.notebook.add(self.visualization_panel, text="Visualization")
+        self.notebook.add(self.sql_console, text="SQL")
 
         self.setup_menu()
 
-    def display_results(self, entity, results):
+    def display_results(self, entity, results, query=None):
+        if self.plugin_manager is not None:
+            try:
+                results = self.plugin_manager.transform_results('post_fetch', results, {'entity': entity})
+            except Exception as e:
+                print(f"post_fetch pipeline failed: {str(e)}")
+        # Keep every fetched entity queryable from the SQL tab
+        if isinstance(results, dict):
+            try:
+                self.local_store.load_results(results)
+                self.sql_console.refresh_tables()
+            except Exception as e:
+                print(f"Failed to store results locally: {str(e)}")
+                self.sql_console.report_load_error(str(e))
+                messagebox.showwarning("Local Store", "The results could not be saved to the local SQL store, "
+                                       f"so the SQL tab does not include them:\n{str(e)}")
+            if entity != "LiveTail":
+                self.evaluate_alerts(entity, results, query)
         self.results_panel.display_results(entity, results)
+        if self.plugin_manager is not None:
+            # Plugins are told in the background; they must treat the results as read-only
+            self.plugin_manager.dispatch_hook('on_results', entity, results)
+
+    def evaluate_alerts(self, entity, results, query=None):
+        """
+        Feed query results to the alert rules and the anomaly detector. Both keep per-pool
+        series, so only whole data at the latest block is taken in: results of a snapshot or
+        a custom filter (amountUSD_gt, origin) are skipped, and so are limited reads not in
+        time order (a top-N by amount), which hold scattered rows of their hours.
+
+        :param query: The Standard query settings the results were fetched with; other
+                      query types pass None and are not evaluated
+        """
+        if query is None or query['snapshot'] or query['custom_filter']:
+            return
+        if entity != 'Pool' and query['order_by'] not in TIME_ORDER_FIELDS and any(
+                isinstance(rows, list) and len(rows) >= query['limit'] for rows in results.values()):
+            return
+        if self.alert_engine is not None:
+            try:
+                self.alert_engine.process_results(results, read_at=query['read_at'])
+            except Exception as e:
+                print(f"Alert evaluation failed: {str(e)}")
+        if self.anomaly_detector is not None:
+            try:
+                # Anomalies are added to the results as their own table
+                anomalies = self.anomaly_detector.process_results(results)
+                if anomalies and self.alert_engine is not None:
+                    self.alert_engine.report(anomalies)
+            except Exception as e:
+                print(f"Anomaly detection failed: {str(e)}")
+
+    def start_live_tail(self, pool_address, resolution, interval):
+        self.stop_live_tail()
+        # Polls run on the tail's thread; widgets are only touched from the Tk loop
+        self.live_tail = LiveTail(
+            self.subgraph_connector, pool_address, resolution, interval, on_update=self.on_live_poll)
+        self.live_chart_ready = False
+        self.live_alerts = []
+        self.results_panel.start_live(f"Live Tail {pool_address} ({resolution})")
+        self.notebook.select(self.results_panel)
+        self.live_tail.start()
+
+    def on_live_poll(self, rows, bars, stats):
+        # Runs on the tail's thread: alert rules are evaluated there, the UI is updated on the Tk loop
+        alerts = []
+        tail = self.live_tail
+        if self.alert_engine is not None and rows and tail is not None:
+            try:
+                alerts = self.alert_engine.process_swaps(rows, pool=tail.pool_address)
+            except Exception as e:
+                print(f"Alert evaluation failed: {str(e)}")
+        if self.anomaly_detector is not None and rows and tail is not None:
+            try:
+                anomalies = self.anomaly_detector.process_swaps(rows, pool=tail.pool_address, stream=True)
+                self.anomaly_detector.save()
+                if anomalies and self.alert_engine is not None:
+                    self.alert_engine.report(anomalies)
+                alerts.extend(anomalies)
+            except Exception as e:
+                print(f"Anomaly detection failed: {str(e)}")
+        self.root.after(0, self.on_live_update, rows, bars, stats, alerts)
+
+    def on_live_update(self, rows, bars, stats, alerts=()):
+        if self.live_tail is None:
+            return
+        self.live_alerts.extend(alerts)
+        if self.live_alerts:
+            stats = dict(stats, alerts=len(self.live_alerts), last_alert=self.live_alerts[-1]['message'])
+        # Appending is O(new rows); once the table holds well past the buffer it is rebuilt from the buffer
+        rebuild = self.results_panel.table.row_count + len(rows) > LIVE_TAIL_BUFFER * 5 // 4
+        self.results_panel.update_live(rows, stats, self.live_tail.rows() if rebuild else None)
+
+        if bars.empty:
+            return
+        if not self.live_chart_ready:
+            candles = self.live_tail.candles.candles
+            candles['start_date'] = pd.to_datetime(candles['timestamp'], unit='s')
+            self.visualization_panel.update_data(candles, 'start_date', 'close',
+                                                 f"Close Price ({self.live_tail.candles.resolution}, live)")
+            self.live_chart_ready = True
+        else:
+            bars = bars.assign(start_date=pd.to_datetime(bars['timestamp'], unit='s'))
+            self.visualization_panel.update_tail(bars)
+
+    def stop_live_tail(self):
+        if self.live_tail is None:
+            return
+        tail = self.live_tail
+        self.live_tail = None
+        tail.stop(wait=False)
+        # Hand the buffer to the regular results view so it can be exported and queried
+        self.display_results("LiveTail", tail.results())
 
     def setup_menu(self):
         menubar = tk.Menu(self.root)